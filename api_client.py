@@ -1,284 +1,596 @@
-import requests
-import json
+import asyncio
 import logging
-from config import SPOONACULAR_API_KEY, THEMEALDB_API_URL
+
+import httpx
+
+from cache import TTLCache
+from catalog import MealCatalog
+from config import (
+    CATALOG_ENABLED,
+    CATALOG_LETTERS_PER_REFRESH,
+    CATALOG_REFRESH_CHECK_INTERVAL,
+    CATALOG_REFRESH_INTERVAL,
+    IMAGE_CHECK_TIMEOUT,
+    IMAGE_CHECK_TTL,
+    MAX_RECIPES_PER_SEARCH,
+    RECIPE_CACHE_MAX_BYTES,
+    RECIPE_CACHE_MAX_ENTRIES,
+    RECIPE_CACHE_TTL,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_NEGATIVE_TTL,
+    SEARCH_CACHE_TTL,
+    SEARCH_DEADLINE,
+    SPOONACULAR_API_KEY,
+    SPOONACULAR_RATE_BURST,
+    SPOONACULAR_RATE_LIMIT,
+    SPOONACULAR_RATE_WAIT,
+    THEMEALDB_API_URL,
+    UPSTREAM_SETTINGS,
+)
+from glossary import Glossary
+from http_client import HttpClientPool
+from models import Recipe
+from quota import RateLimitedError, SpoonacularBudget, TokenBucket
+from resilience import Upstream
+from singleflight import SingleFlight
 from translator import TranslatorService
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Язык, на котором пользователь получает рецепты
+TARGET_LANGUAGE = 'ru'
+
+
+def normalize_query(query):
+    """Нормализация поискового запроса для ключа кэша"""
+    return ' '.join(query.lower().replace('ё', 'е').split()).strip('.,!?;:"\'')
+
+
+def _is_retryable_http_error(error):
+    """Сетевые ошибки, таймауты, 429, 5xx и битый JSON стоит повторить; прочие 4xx — нет"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TransportError, ValueError))
+
 class RecipeAPI:
-    def __init__(self):
+    def __init__(self, catalog=None, translator=None):
         self.spoonacular_api_key = SPOONACULAR_API_KEY
         self.themealdb_url = THEMEALDB_API_URL
-        self.translator = TranslatorService()
+        self.translator = translator if translator is not None else TranslatorService()
+        # Словарь ингредиентов и частых слов запросов: переводится без обращения к переводчику
+        self.glossary = Glossary.load()
+        self.http = HttpClientPool()
+        # Таймауты, повторы и circuit breaker для каждого источника рецептов
+        self.upstreams = {
+            name: Upstream(name, **UPSTREAM_SETTINGS[name]) for name in ('themealdb', 'spoonacular')
+        }
+        # Дневной бюджет очков Spoonacular и ограничение частоты запросов к нему
+        self.spoonacular_budget = SpoonacularBudget()
+        self.spoonacular_limiter = TokenBucket(SPOONACULAR_RATE_LIMIT, SPOONACULAR_RATE_BURST)
+        # Кэш рецептов по (source, recipe_id): повторные нажатия кнопок не ходят в сеть
+        self.recipe_cache = TTLCache(
+            max_entries=RECIPE_CACHE_MAX_ENTRIES,
+            ttl=RECIPE_CACHE_TTL,
+            max_bytes=RECIPE_CACHE_MAX_BYTES,
+        )
+        # Переведенные полные рецепты по (source, recipe_id, язык): перевод деталей делается один раз
+        self.hydrated_cache = TTLCache(
+            max_entries=RECIPE_CACHE_MAX_ENTRIES,
+            ttl=RECIPE_CACHE_TTL,
+            max_bytes=RECIPE_CACHE_MAX_BYTES,
+        )
+        # Результаты проверки ссылок на фото: {url: True/False}
+        self.image_cache = TTLCache(max_entries=RECIPE_CACHE_MAX_ENTRIES, ttl=IMAGE_CHECK_TTL)
+        # Кэш итоговой выдачи (краткие карточки с переведенными названиями) по (нормализованный запрос, язык)
+        self.search_cache = TTLCache(max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl=SEARCH_CACHE_TTL)
+        # Локальное зеркало TheMealDB: пока оно актуально, TheMealDB не опрашивается
+        if catalog is None and CATALOG_ENABLED:
+            catalog = MealCatalog()
+        self.catalog = catalog
+        # Одинаковые одновременные запросы к источникам выполняются один раз
+        self.flights = SingleFlight()
+    
+    async def _get_json(self, url, params=None, upstream='themealdb', on_response=None, before_request=None):
+        """Асинхронный GET-запрос к API с разбором JSON-ответа через политику источника.
+
+        before_request вызывается перед каждой попыткой, включая повторы, до circuit breaker.
+        """
+        policy = self.upstreams[upstream]
+        timeout = httpx.Timeout(policy.read_timeout, connect=policy.connect_timeout)
+        
+        async def request():
+            response = await self.http.get(url, params=params, timeout=timeout)
+            if on_response is not None:
+                on_response(response)
+            response.raise_for_status()
+            return response.json()
+        
+        return await policy.call(request, retryable=_is_retryable_http_error, before_attempt=before_request)
+    
+    async def _get_spoonacular_json(self, url, params, points):
+        """Запрос к Spoonacular с ограничением частоты и учетом потраченных очков"""
+        async def acquire_token():
+            # Токен берет каждая попытка: повтор после 429 тоже не должен обходить лимит
+            if not await self.spoonacular_limiter.acquire(SPOONACULAR_RATE_WAIT):
+                raise RateLimitedError("Spoonacular: превышена частота запросов")
+        
+        def on_response(response):
+            if response.status_code == 402:
+                self.spoonacular_budget.exhaust()
+            else:
+                self.spoonacular_budget.record(points, response.headers)
+        
+        return await self._get_json(url, params, 'spoonacular', on_response=on_response, before_request=acquire_token)
+    
+    def get_upstream_status(self):
+        """Состояние circuit breaker каждого внешнего сервиса"""
+        status = {name: upstream.breaker.snapshot() for name, upstream in self.upstreams.items()}
+        status['translate'] = self.translator.upstream.breaker.snapshot()
+        return status
+    
+    def _catalog_ready(self):
+        """Можно ли отвечать из локального каталога вместо TheMealDB"""
+        return self.catalog is not None and self.catalog.is_fresh()
     
-    def search_recipes_themedb(self, query):
+    def _cache_recipe(self, recipe):
+        """Сохранение непереведенного рецепта в кэш (Recipe неизменяем, копии не нужны)"""
+        self.recipe_cache.set((recipe.source, recipe.id), recipe)
+    
+    def _get_cached_search(self, query, allow_expired=False):
+        """Выдача из кэша поиска или None"""
+        cached = self.search_cache.get((normalize_query(query), TARGET_LANGUAGE), allow_expired=allow_expired)
+        if cached is None:
+            return None
+        return list(cached)
+    
+    def _cache_search(self, queries, recipes):
+        """Сохранение выдачи под всеми вариантами запроса; пустая выдача живет меньше"""
+        ttl = SEARCH_CACHE_TTL if recipes else SEARCH_CACHE_NEGATIVE_TTL
+        cached = tuple(recipes)
+        for query in set(queries):
+            self.search_cache.set((normalize_query(query), TARGET_LANGUAGE), cached, ttl=ttl)
+    
+    def invalidate_search_cache(self, query=None):
+        """Сброс кэша поиска: целиком или для одного запроса"""
+        if query is None:
+            self.search_cache.clear()
+        else:
+            self.search_cache.invalidate((normalize_query(query), TARGET_LANGUAGE))
+    
+    async def aclose(self):
+        """Закрытие HTTP-соединений клиента и базы переводов"""
+        await self.http.aclose()
+        self.translator.cache.close()
+    
+    async def search_recipes_themedb(self, query):
         """Поиск рецептов через TheMealDB API"""
-        logger.info(f"🔍 TheMealDB поиск: '{query}'")
         try:
-            url = f"{self.themealdb_url}/search.php"
-            params = {'s': query}
-            
-            logger.info(f"📡 Запрос к TheMealDB: {url} с параметрами {params}")
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            meals = data.get('meals') or []
-            logger.info(f"📥 Получен ответ от TheMealDB: {len(meals)} рецептов")
-            
-            if not meals:
-                logger.warning("⚠️ TheMealDB не вернул рецептов для данного запроса")
-                return []
-            
-            recipes = []
-            for meal in meals:
-                recipe = {
-                    'id': meal['idMeal'],
-                    'name': meal['strMeal'],
-                    'image': meal['strMealThumb'],
-                    'instructions': meal['strInstructions'],
-                    'ingredients': self._extract_ingredients(meal),
-                    'video': meal.get('strYoutube', ''),
-                    'source': 'TheMealDB'
-                }
-                recipes.append(recipe)
-            
-            logger.info(f"✅ TheMealDB найдено {len(recipes)} рецептов")
-            return recipes
-            
+            return await self._search_themedb(query)
         except Exception as e:
             logger.error(f"❌ Ошибка при поиске рецептов (TheMealDB): {e}")
             return []
     
-    def search_recipes_spoonacular(self, query):
-        """Поиск рецептов через Spoonacular API"""
-        if not self.spoonacular_api_key:
+    async def _search_themedb(self, query):
+        """Поиск в TheMealDB или в актуальном локальном каталоге; ошибки пробрасываются"""
+        logger.info(f"🔍 TheMealDB поиск: '{query}'")
+        if self._catalog_ready():
+            recipes = await asyncio.to_thread(self.catalog.search, query)
+            logger.info(f"📚 Локальный каталог TheMealDB: {len(recipes)} рецептов")
+            for recipe in recipes:
+                self._cache_recipe(recipe)
+            return recipes
+        
+        url = f"{self.themealdb_url}/search.php"
+        params = {'s': query}
+        
+        logger.info(f"📡 Запрос к TheMealDB: {url} с параметрами {params}")
+        data = await self._get_json(url, params, 'themealdb')
+        meals = data.get('meals') or []
+        logger.info(f"📥 Получен ответ от TheMealDB: {len(meals)} рецептов")
+        
+        if not meals:
+            logger.warning("⚠️ TheMealDB не вернул рецептов для данного запроса")
             return []
         
+        recipes = [Recipe.from_themealdb(meal) for meal in meals]
+        for recipe in recipes:
+            self._cache_recipe(recipe)
+        
+        logger.info(f"✅ TheMealDB найдено {len(recipes)} рецептов")
+        return recipes
+    
+    async def search_recipes_spoonacular(self, query):
+        """Поиск рецептов через Spoonacular API"""
         try:
-            url = "https://api.spoonacular.com/recipes/complexSearch"
-            params = {
-                'apiKey': self.spoonacular_api_key,
-                'query': query,
-                'number': 10,
-                'addRecipeInformation': True,
-                'fillIngredients': True
-            }
-            
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if 'results' not in data:
-                return []
-            
-            recipes = []
-            for recipe in data['results']:
-                ingredients = []
-                if 'extendedIngredients' in recipe:
-                    for ingredient in recipe['extendedIngredients']:
-                        ingredients.append({
-                            'name': ingredient.get('name', ''),
-                            'amount': ingredient.get('amount', ''),
-                            'unit': ingredient.get('unit', '')
-                        })
-                
-                recipe_data = {
-                    'id': str(recipe['id']),
-                    'name': recipe['title'],
-                    'image': recipe.get('image', ''),
-                    'instructions': recipe.get('instructions', ''),
-                    'ingredients': ingredients,
-                    'video': '',  # Spoonacular не предоставляет видео в базовом поиске
-                    'source': 'Spoonacular'
-                }
-                recipes.append(recipe_data)
-            
-            return recipes
-            
+            return await self._search_spoonacular(query)
         except Exception as e:
-            print(f"Ошибка при поиске рецептов (Spoonacular): {e}")
+            logger.error(f"❌ Ошибка при поиске рецептов (Spoonacular): {e}")
             return []
     
-    def search_recipes(self, query):
-        """Объединенный поиск рецептов с поддержкой перевода ru→en."""
-        logger.info(f"🔍 Начинаем поиск рецептов для запроса: '{query}'")
+    async def _search_spoonacular(self, query):
+        """Поиск в Spoonacular; ошибки пробрасываются"""
+        if not self.spoonacular_api_key:
+            return []
         
-        # Переводим запрос на английский, если он на русском
-        query_en = self.translator.russian_to_english(query)
-        logger.info(f"🔄 Переведенный запрос: '{query}' → '{query_en}'")
+        # Запрашиваем не больше, чем покажем, и урезаем запрос по мере истощения бюджета
+        plan = self.spoonacular_budget.plan_search()
+        if plan is None:
+            return []
+        
+        url = "https://api.spoonacular.com/recipes/complexSearch"
+        params = {
+            'apiKey': self.spoonacular_api_key,
+            'query': query,
+            'number': plan['number'],
+            'addRecipeInformation': plan['addRecipeInformation'],
+            'fillIngredients': plan['fillIngredients']
+        }
+        
+        data = await self._get_spoonacular_json(url, params, plan['cost'])
+        
+        if 'results' not in data:
+            return []
+        
+        recipes = [Recipe.from_spoonacular(recipe) for recipe in data['results']]
+        if not (plan['addRecipeInformation'] and plan['fillIngredients']):
+            # Урезанный ответ — это краткие карточки: полный рецепт загрузит hydrate_recipe
+            return [recipe.summary() for recipe in recipes]
+        # Флаги стоят 0.05 очка за рецепт, а /information при открытии карточки — 1 очко:
+        # полные рецепты из выдачи кладем в кэш, hydrate_recipe возьмет их оттуда
+        for recipe in recipes:
+            self._cache_recipe(recipe)
+        
+        return recipes
+    
+    async def _search_catalog_fallback(self, query):
+        """Поиск в локальном каталоге, даже устаревшем, когда TheMealDB недоступен"""
+        if self.catalog is None or not self.catalog.has_data():
+            return []
+        recipes = await asyncio.to_thread(self.catalog.search, query)
+        logger.warning(f"🔌 TheMealDB недоступен, из локального каталога: {len(recipes)} рецептов")
+        for recipe in recipes:
+            self._cache_recipe(recipe)
+        return recipes
+    
+    def _search_degraded(self):
+        """Ни один источник поиска сейчас не может ответить по-настоящему"""
+        if self._catalog_ready() or self.upstreams['themealdb'].available():
+            return False
+        return not self.spoonacular_api_key or not self.upstreams['spoonacular'].available()
+    
+    async def _produce_search(self, query_en, broadcast):
+        """Опрос TheMealDB, затем Spoonacular, с общим дедлайном и потоковой выдачей.
 
-        recipes = []
-        # Сначала пробуем TheMealDB (бесплатный)
-        themedb_recipes = self.search_recipes_themedb(query_en)
-        recipes.extend(themedb_recipes)
+        Spoonacular запрашивается, только если TheMealDB не заполнил выдачу: его очки платные,
+        а быстрый ответ Spoonacular не должен вытеснять TheMealDB. В broadcast публикуются
+        краткие карточки (Recipe.summary) с переведенным названием, как только ответил их
+        источник; полные рецепты остаются в recipe_cache и переводятся только при показе
+        (hydrate_recipe). Выдача, прерванная дедлайном или ошибкой источника, помечается
+        неполной и в кэш не попадает.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + SEARCH_DEADLINE
 
-        # Если есть API ключ Spoonacular, добавляем и его результаты
+        sources = [('TheMealDB', self._search_themedb)]
         if self.spoonacular_api_key:
-            logger.info("🔑 Используем Spoonacular API")
-            spoonacular_recipes = self.search_recipes_spoonacular(query_en)
-            recipes.extend(spoonacular_recipes)
+            sources.append(('Spoonacular', self._search_spoonacular))
         else:
             logger.info("⚠️ Spoonacular API ключ не настроен")
 
-        # Ограничиваем количество результатов
-        from config import MAX_RECIPES_PER_SEARCH
-        if len(recipes) > MAX_RECIPES_PER_SEARCH:
-            logger.info(f"✂️ Обрезаем результаты до {MAX_RECIPES_PER_SEARCH}")
-            recipes = recipes[:MAX_RECIPES_PER_SEARCH]
+        complete = True
+        for source, search in sources:
+            # Выдача уже заполнена — не тратим квоту Spoonacular на то, что всё равно обрежем
+            if len(broadcast.items) >= MAX_RECIPES_PER_SEARCH:
+                break
+            if source == 'Spoonacular':
+                logger.info("🔑 Используем Spoonacular API")
+            try:
+                recipes = await asyncio.wait_for(search(query_en), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                logger.warning(f"⏱️ Источник {source} не успел до дедлайна, отменяем")
+                complete = False
+                break
+            except Exception as e:
+                logger.error(f"❌ Ошибка источника {source}: {e}")
+                complete = False
+                recipes = await self._search_catalog_fallback(query_en) if source == 'TheMealDB' else []
 
-        logger.info(f"📊 Всего найдено рецептов: {len(recipes)}")
+            # Ограничиваем количество результатов
+            slots = MAX_RECIPES_PER_SEARCH - len(broadcast.items)
+            if len(recipes) > slots:
+                logger.info(f"✂️ {source}: обрезаем результаты до {slots}")
+                recipes = recipes[:slots]
 
-        # Переводим данные рецептов обратно на русский для пользователя
-        if recipes:
-            logger.info("🔄 Начинаем перевод рецептов на русский язык")
-            for i, recipe in enumerate(recipes):
-                logger.info(f"   Перевод рецепта {i+1}: {recipe.get('name', 'Без названия')}")
-                
-                if recipe.get('name'):
-                    original_name = recipe['name']
-                    recipe['name'] = self.translator.english_to_russian(recipe['name'])
-                    logger.info(f"     Название: '{original_name}' → '{recipe['name']}'")
-                
-                if recipe.get('instructions'):
-                    recipe['instructions'] = self.translator.english_to_russian(recipe['instructions'])
-                    logger.info(f"     Инструкции переведены")
-                
-                # Переводим ингредиенты
-                if recipe.get('ingredients'):
-                    translated_ingredients = []
-                    for ing in recipe['ingredients']:
-                        name = ing.get('name', '')
-                        if name:
-                            translated_name = self.translator.english_to_russian(name)
-                            logger.info(f"     Ингредиент: '{name}' → '{translated_name}'")
-                        else:
-                            translated_name = name
-                        translated_ingredients.append({
-                            'name': translated_name,
-                            'amount': ing.get('amount', ''),
-                            'unit': ing.get('unit', '')
-                        })
-                    recipe['ingredients'] = translated_ingredients
+            # Переводим только названия, одним пакетом на источник, и сразу отдаем;
+            # deep-translator синхронный, поэтому в потоке
+            names = await asyncio.to_thread(
+                self.translator.english_to_russian_batch, [recipe.name for recipe in recipes]
+            )
+            for recipe, name in zip(recipes, names):
+                broadcast.publish(recipe.summary().replace(name=name))
 
-        logger.info(f"✅ Поиск завершен. Возвращаем {len(recipes)} рецептов")
-        return recipes
+        # Неполную выдачу (источник не успел к дедлайну или упал) не кэшируем
+        if complete:
+            self._cache_search([query_en], broadcast.items)
+        logger.info(f"✅ Поиск завершен. Найдено рецептов: {len(broadcast.items)}")
+        broadcast.close(complete)
     
-    def get_random_recipe(self):
+    async def iter_search_recipes(self, query):
+        """Потоковый поиск рецептов: краткие карточки отдаются по одному, как только готовы.
+
+        Полный рецепт карточки загружается и переводится через hydrate_recipe().
+        """
+        logger.info(f"🔍 Начинаем поиск рецептов для запроса: '{query}'")
+        
+        cached = self._get_cached_search(query)
+        if cached is not None:
+            logger.info(f"⚡ Выдача из кэша: {len(cached)} рецептов")
+            for recipe in cached:
+                yield recipe
+            return
+        
+        # Источники лежат — лучше устаревшая выдача, чем ожидание мертвого хоста
+        if self._search_degraded():
+            stale = self._get_cached_search(query, allow_expired=True)
+            if stale is not None:
+                logger.warning(f"🔌 Источники недоступны, устаревшая выдача из кэша: {len(stale)} рецептов")
+                for recipe in stale:
+                    yield recipe
+                return
+        
+        # Переводим запрос на английский, если он на русском: сначала по словарю,
+        # иначе через переводчик; одинаковые запросы переводятся один раз
+        query_en = self.glossary.translate_query(query)
+        if query_en is None:
+            query_en = await self.flights.do(
+                ('query_en', normalize_query(query)),
+                lambda: asyncio.to_thread(self.translator.russian_to_english, query)
+            )
+        logger.info(f"🔄 Переведенный запрос: '{query}' → '{query_en}'")
+        
+        # "курица" и "chicken" дают одну и ту же выдачу
+        cached = self._get_cached_search(query_en)
+        if cached is not None:
+            logger.info(f"⚡ Выдача из кэша по переводу: {len(cached)} рецептов")
+            self._cache_search([query], cached)
+            for recipe in cached:
+                yield recipe
+            return
+        
+        # Одинаковые одновременные поиски читают один общий поток результатов
+        key = ('search_en', normalize_query(query_en), TARGET_LANGUAGE)
+        broadcast = self.flights.stream(key, lambda b: self._produce_search(query_en, b))
+        recipes = []
+        async for recipe in broadcast:
+            recipes.append(recipe)
+            yield recipe
+        
+        if broadcast.complete:
+            self._cache_search([query], recipes)
+        elif not recipes:
+            # Источники отказали — отдаем прошлую выдачу, если она была
+            stale = self._get_cached_search(query_en, allow_expired=True)
+            if stale is not None:
+                logger.warning(f"🔌 Поиск не удался, устаревшая выдача из кэша: {len(stale)} рецептов")
+                for recipe in stale:
+                    yield recipe
+    
+    async def search_recipes(self, query):
+        """Объединенный поиск рецептов с поддержкой перевода ru→en (краткие карточки)"""
+        return [recipe async for recipe in self.iter_search_recipes(query)]
+    
+    async def hydrate_recipe(self, recipe_id, source='TheMealDB'):
+        """Полный переведенный рецепт для карточки из выдачи поиска (с мемоизацией)"""
+        key = (source, str(recipe_id), TARGET_LANGUAGE)
+        cached = self.hydrated_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        return await self.flights.do(('hydrate', *key), lambda: self._hydrate(key))
+    
+    def image_status(self, url):
+        """Уже известный результат проверки фото: True, False или None, если не проверялось"""
+        return self.image_cache.get(url)
+    
+    async def check_image(self, url):
+        """Проверка, что по ссылке доступно изображение (HEAD-запрос, результат запоминается).
+
+        None — проверить не удалось (сеть), такой результат не кэшируется.
+        """
+        if not url:
+            return False
+        cached = self.image_cache.get(url)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.http.head(url, timeout=IMAGE_CHECK_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"🖼️ Не удалось проверить фото {url}: {e}")
+            return None
+        
+        ok = response.status_code < 400 and response.headers.get('content-type', '').startswith('image/')
+        if not ok:
+            logger.warning(f"🖼️ Фото недоступно ({response.status_code}): {url}")
+        self.image_cache.set(url, ok)
+        return ok
+    
+    async def _hydrate(self, key):
+        source, recipe_id, _ = key
+        # Обычно это попадание в recipe_cache: поиск уже положил туда непереведенный рецепт
+        recipe = await self.get_recipe_by_id(recipe_id, source)
+        if not recipe:
+            return None
+        recipe = await asyncio.to_thread(self._translate_recipe, recipe)
+        self.hydrated_cache.set(key, recipe)
+        return recipe
+    
+    def _translate_recipe(self, recipe):
+        """Переведенный на русский вариант рецепта: название, инструкции и ингредиенты.
+
+        Возвращает новый Recipe; непереводимые поля (фото, меры, видео) разделяются с исходным.
+        Ингредиенты сначала ищутся в словаре, остальное переводится одним пакетом
+        (TranslatorService.translate_batch).
+        """
+        logger.info(f"   Перевод рецепта: {recipe.name or 'Без названия'}")
+        ingredients = recipe.ingredients or ()
+        ingredient_names = [self.glossary.to_russian(ing.name) if ing.name else ing.name for ing in ingredients]
+        unknown = [ing.name for ing, translated in zip(ingredients, ingredient_names) if translated is None]
+        name, instructions, *unknown_translated = self.translator.english_to_russian_batch(
+            [recipe.name, recipe.instructions] + unknown
+        )
+        logger.info(f"     Название: '{recipe.name}' → '{name}', ингредиентов: {len(ingredients)}, "
+                    f"из них через переводчик: {len(unknown)}")
+        
+        unknown_translated = iter(unknown_translated)
+        translated_ingredients = [
+            ing.replace(name=translated if translated is not None else next(unknown_translated)) if ing.name else ing
+            for ing, translated in zip(ingredients, ingredient_names)
+        ]
+        return recipe.replace(
+            name=name,
+            instructions=instructions,
+            ingredients=translated_ingredients if recipe.ingredients is not None else None
+        )
+    
+    async def get_random_recipe(self):
         """Получение случайного рецепта"""
+        if self._catalog_ready():
+            recipe = await asyncio.to_thread(self.catalog.random)
+            if recipe:
+                self._cache_recipe(recipe)
+                return recipe
+        
         try:
             url = f"{self.themealdb_url}/random.php"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = await self._get_json(url, upstream='themealdb')
             
             if data.get('meals') is None:
                 return None
             
-            meal = data['meals'][0]
-            recipe = {
-                'id': meal['idMeal'],
-                'name': meal['strMeal'],
-                'image': meal['strMealThumb'],
-                'instructions': meal['strInstructions'],
-                'ingredients': self._extract_ingredients(meal),
-                'video': meal.get('strYoutube', ''),
-                'source': 'TheMealDB'
-            }
+            recipe = Recipe.from_themealdb(data['meals'][0])
+            self._cache_recipe(recipe)
             
             return recipe
             
         except Exception as e:
-            print(f"Ошибка при получении случайного рецепта: {e}")
+            logger.error(f"❌ Ошибка при получении случайного рецепта: {e}")
+            # TheMealDB недоступен — берем блюдо из локального каталога, даже устаревшего
+            if self.catalog is not None and self.catalog.has_data():
+                return await asyncio.to_thread(self.catalog.random)
             return None
     
-    def _extract_ingredients(self, meal):
-        """Извлечение ингредиентов из данных TheMealDB"""
-        ingredients = []
+    async def get_recipe_by_id(self, recipe_id, source='TheMealDB'):
+        """Получение рецепта по ID (сначала из кэша)"""
+        cached = self.recipe_cache.get((source, str(recipe_id)))
+        if cached is not None:
+            return cached
         
-        for i in range(1, 21):  # TheMealDB может иметь до 20 ингредиентов
-            ingredient = meal.get(f'strIngredient{i}')
-            measure = meal.get(f'strMeasure{i}')
-            
-            if ingredient and ingredient.strip():
-                ingredients.append({
-                    'name': ingredient.strip(),
-                    'amount': measure.strip() if measure else '',
-                    'unit': ''
-                })
-        
-        return ingredients
+        key = ('recipe', source, str(recipe_id))
+        return await self.flights.do(key, lambda: self._fetch_and_cache_recipe(recipe_id, source))
+    
+    async def _fetch_and_cache_recipe(self, recipe_id, source):
+        recipe = await self._fetch_recipe_by_id(recipe_id, source)
+        if recipe:
+            self._cache_recipe(recipe)
+        return recipe
     
-    def get_recipe_by_id(self, recipe_id, source='TheMealDB'):
-        """Получение рецепта по ID"""
+    async def _fetch_recipe_by_id(self, recipe_id, source):
+        """Загрузка рецепта по ID из API источника"""
         if source == 'TheMealDB':
+            if self._catalog_ready():
+                recipe = await asyncio.to_thread(self.catalog.get, recipe_id)
+                if recipe:
+                    return recipe
+            
             try:
                 url = f"{self.themealdb_url}/lookup.php"
                 params = {'i': recipe_id}
                 
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
+                data = await self._get_json(url, params, 'themealdb')
                 
                 if data.get('meals') is None:
                     return None
                 
                 meal = data['meals'][0]
-                recipe = {
-                    'id': meal['idMeal'],
-                    'name': meal['strMeal'],
-                    'image': meal['strMealThumb'],
-                    'instructions': meal['strInstructions'],
-                    'ingredients': self._extract_ingredients(meal),
-                    'video': meal.get('strYoutube', ''),
-                    'source': 'TheMealDB'
-                }
+                recipe = Recipe.from_themealdb(meal)
+                if self.catalog is not None:
+                    await asyncio.to_thread(
+                        self.catalog.upsert, recipe, meal.get('strCategory') or '', meal.get('strArea') or ''
+                    )
                 
                 return recipe
                 
             except Exception as e:
-                print(f"Ошибка при получении рецепта по ID: {e}")
+                logger.error(f"❌ Ошибка при получении рецепта по ID: {e}")
+                if self.catalog is not None and self.catalog.has_data():
+                    return await asyncio.to_thread(self.catalog.get, recipe_id)
                 return None
         
         elif source == 'Spoonacular' and self.spoonacular_api_key:
             try:
+                points = SpoonacularBudget.INFORMATION_POINTS
+                if not self.spoonacular_budget.can_afford(points):
+                    logger.warning(f"💸 Spoonacular: нет очков на рецепт {recipe_id}")
+                    return None
+                
                 url = f"https://api.spoonacular.com/recipes/{recipe_id}/information"
                 params = {'apiKey': self.spoonacular_api_key}
                 
-                response = requests.get(url, params=params)
-                response.raise_for_status()
-                
-                recipe_data = response.json()
-                
-                ingredients = []
-                if 'extendedIngredients' in recipe_data:
-                    for ingredient in recipe_data['extendedIngredients']:
-                        ingredients.append({
-                            'name': ingredient.get('name', ''),
-                            'amount': ingredient.get('amount', ''),
-                            'unit': ingredient.get('unit', '')
-                        })
-                
-                recipe = {
-                    'id': str(recipe_data['id']),
-                    'name': recipe_data['title'],
-                    'image': recipe_data.get('image', ''),
-                    'instructions': recipe_data.get('instructions', ''),
-                    'ingredients': ingredients,
-                    'video': '',
-                    'source': 'Spoonacular'
-                }
-                
-                return recipe
+                recipe_data = await self._get_spoonacular_json(url, params, points)
+                return Recipe.from_spoonacular(recipe_data)
                 
             except Exception as e:
-                print(f"Ошибка при получении рецепта по ID (Spoonacular): {e}")
+                logger.error(f"❌ Ошибка при получении рецепта по ID (Spoonacular): {e}")
                 return None
         
         return None
+    
+    async def list_ingredient_names(self):
+        """Полный список ингредиентов TheMealDB (для сборки словаря)"""
+        data = await self._get_json(f"{self.themealdb_url}/list.php", {'i': 'list'}, 'themealdb')
+        return [item['strIngredient'].strip() for item in data.get('meals') or [] if item.get('strIngredient')]
+    
+    async def sync_catalog(self, max_letters=None, refresh_interval=0):
+        """Синхронизация локального каталога с TheMealDB по буквам.
+
+        Обновляются буквы старше refresh_interval (0 — все), не больше max_letters за вызов.
+        Возвращает число успешно обновленных букв.
+        """
+        if self.catalog is None:
+            return 0
+        
+        letters = self.catalog.letters_to_refresh(refresh_interval)
+        if max_letters is not None:
+            letters = letters[:max_letters]
+        
+        synced = 0
+        for letter in letters:
+            try:
+                data = await self._get_json(f"{self.themealdb_url}/search.php", {'f': letter})
+            except Exception as e:
+                logger.error(f"❌ Ошибка синхронизации каталога (буква '{letter}'): {e}")
+                continue
+            
+            entries = [
+                (Recipe.from_themealdb(meal), meal.get('strCategory') or '', meal.get('strArea') or '')
+                for meal in data.get('meals') or []
+            ]
+            if await asyncio.to_thread(self.catalog.replace_letter, letter, entries):
+                synced += 1
+        
+        return synced
+    
+    async def run_catalog_refresh(self):
+        """Фоновое инкрементальное обновление каталога небольшими порциями букв"""
+        if self.catalog is None:
+            return
+        
+        while True:
+            synced = await self.sync_catalog(CATALOG_LETTERS_PER_REFRESH, CATALOG_REFRESH_INTERVAL)
+            if synced:
+                logger.info(f"📚 Каталог TheMealDB: обновлено букв {synced}, актуален: {self.catalog.is_fresh()}")
+            await asyncio.sleep(CATALOG_REFRESH_CHECK_INTERVAL)
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import (
+    DATABASE_POOL_SIZE,
+    DB_WRITE_QUEUE_LIMIT,
+    DB_WRITE_QUEUE_TIMEOUT,
+    FAVORITES_MIGRATION_PAUSE,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_INTERVAL,
+    WRITE_BEHIND_MAX_ATTEMPTS,
+)
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+
+def merge_change(previous: dict, change: dict) -> dict:
+    """Итоговое изменение (пользователь, рецепт) после двух подряд.
+
+    Оценка уточняет еще не записанное добавление и не воскрешает удаленный рецепт;
+    добавление и удаление заменяют все, что было до них.
+    """
+    if change['op'] == 'rate':
+        if previous['op'] == 'add':
+            return {**previous, 'rating': change['rating']}
+        if previous['op'] == 'remove':
+            return previous
+    return change
+
+
+class AsyncDatabase:
+    """Неблокирующий доступ к избранному для асинхронных обработчиков бота.
+
+    Изменения (добавление, оценка, удаление) пишутся с отложенной групповой записью:
+    они сразу применяются к представлению в памяти, а в базу уходят пачкой одной
+    транзакцией раз в WRITE_BEHIND_INTERVAL или при WRITE_BEHIND_BATCH_SIZE изменениях.
+    Повторные изменения одного (пользователь, рецепт) сливаются (merge_change), так что
+    серия нажатий на звезды дает одну запись. Пачки пишет один поток-писатель, чтения
+    идут пулом потоков поверх соединений SQLitePool.
+
+    Проверка избранного учитывает представление в памяти; списки избранного сначала
+    дожидаются записи изменений пользователя. Если несохраненных изменений уже
+    DB_WRITE_QUEUE_LIMIT, новое изменение ждет записи пачки не дольше
+    DB_WRITE_QUEUE_TIMEOUT и при перегрузке отклоняется (возвращается False).
+    Откатившаяся пачка дописывается по одному изменению; изменение, которое не записалось
+    WRITE_BEHIND_MAX_ATTEMPTS раз, отбрасывается с ошибкой в логе, чтобы не держать очередь.
+    aclose() записывает все оставшееся.
+    """
+
+    def __init__(self, db: Optional[Database] = None) -> None:
+        self.db = db if db is not None else Database()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        # Одно соединение пула остается писателю
+        self._readers = ThreadPoolExecutor(max_workers=max(1, DATABASE_POOL_SIZE - 1), thread_name_prefix='db-reader')
+        self._pending: Dict[Tuple[Any, str], dict] = {}  # {(user_id, recipe_id): изменение}
+        self._flushing: Dict[Tuple[Any, str], dict] = {}  # пачка, которая записывается сейчас
+        # Примитивы asyncio создаются в цикле событий бота при первом изменении
+        self._flush_lock = None
+        self._wakeup = None
+        self._flusher = None
+        self.max_pending = 0
+        self.merged_changes = 0
+        self.flushed_batches = 0
+        self.flushed_changes = 0
+        self.failed_batches = 0
+        self.dropped_changes = 0
+        self.rejected_writes = 0
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def _run_flusher(self) -> None:
+        """Фоновая запись пачек: по таймеру или раньше, когда набралась полная пачка"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), WRITE_BEHIND_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # shield: остановка бота не прерывает запись уже взятой пачки
+            await asyncio.shield(self.flush())
+
+    async def _write(self, batch: Dict[Tuple[Any, str], dict]) -> bool:
+        changes = [(user_id, recipe_id, change['op'], change.get('recipe'), change.get('rating', 0))
+                   for (user_id, recipe_id), change in batch.items()]
+        return await asyncio.get_running_loop().run_in_executor(self._writer, self.db.apply_changes, changes)
+
+    async def flush(self) -> None:
+        """Запись всех накопленных изменений одной транзакцией"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+            failed = {}
+            try:
+                if await self._write(batch):
+                    self.flushed_batches += 1
+                    self.flushed_changes += len(batch)
+                    return
+                self.failed_batches += 1
+                # Пачка откатилась целиком — пишем изменения по одному, чтобы одно
+                # сломанное изменение не держало записи остальных пользователей
+                for key, change in batch.items():
+                    if len(batch) > 1 and await self._write({key: change}):
+                        self.flushed_changes += 1
+                        continue
+                    attempts = change.get('attempts', 0) + 1
+                    if attempts >= WRITE_BEHIND_MAX_ATTEMPTS:
+                        self.dropped_changes += 1
+                        logger.error(f"❌ Изменение избранного {key} ({change['op']}) не записалось "
+                                     f"{attempts} раз и отброшено")
+                    else:
+                        failed[key] = {**change, 'attempts': attempts}
+            finally:
+                self._flushing = {}
+
+            # Незаписанные изменения возвращаем в очередь перед более новыми
+            newer, self._pending = self._pending, failed
+            for key, change in newer.items():
+                self._pending[key] = merge_change(self._pending[key], change) if key in self._pending else change
+
+    async def _change(self, user_id: Any, recipe_id: str, change: dict) -> bool:
+        self._start_flusher()
+        key = (user_id, recipe_id)
+        if len(self._pending) >= DB_WRITE_QUEUE_LIMIT and key not in self._pending:
+            # Обратное давление: ждем записи пачки, а не копим изменения без предела
+            try:
+                await asyncio.wait_for(asyncio.shield(self.flush()), DB_WRITE_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            if len(self._pending) >= DB_WRITE_QUEUE_LIMIT:
+                self.rejected_writes += 1
+                logger.warning(f"⏳ Очередь записей в базу переполнена, изменение пользователя {user_id} отклонено")
+                return False
+
+        previous = self._pending.get(key)
+        if previous is not None:
+            self.merged_changes += 1
+            change = merge_change(previous, change)
+        self._pending[key] = change
+        self.max_pending = max(self.max_pending, len(self._pending))
+        if len(self._pending) >= WRITE_BEHIND_BATCH_SIZE:
+            self._wakeup.set()
+        return True
+
+    def _unsaved(self, user_id: Any, recipe_id: str) -> Optional[dict]:
+        """Еще не записанное изменение (пользователь, рецепт), если оно есть"""
+        key = (user_id, recipe_id)
+        return self._pending.get(key) or self._flushing.get(key)
+
+    async def _read(self, func: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._readers, func, *args)
+
+    async def _read_saved(self, user_id: Any, func: Callable[..., Any], *args: Any) -> Any:
+        # Списки упорядочены по оценкам, а рецепты читаются целиком из базы,
+        # поэтому сначала записываем изменения пользователя
+        if any(key[0] == user_id for key in (*self._pending, *self._flushing)):
+            await self.flush()
+        return await self._read(func, *args)
+
+    async def add_favorite_recipe(self, user_id, recipe):
+        return await self._change(user_id, recipe.id, {'op': 'add', 'recipe': recipe, 'rating': 0})
+
+    async def update_recipe_rating(self, user_id, recipe_id, rating):
+        if not await self.is_recipe_favorite(user_id, recipe_id):
+            logger.warning(f"Рецепт {recipe_id} не найден для обновления рейтинга")
+            return False
+        return await self._change(user_id, recipe_id, {'op': 'rate', 'rating': rating})
+
+    async def remove_favorite_recipe(self, user_id, recipe_id):
+        if not await self.is_recipe_favorite(user_id, recipe_id):
+            logger.warning(f"Рецепт {recipe_id} не найден в избранном пользователя {user_id}")
+            return False
+        return await self._change(user_id, recipe_id, {'op': 'remove'})
+
+    async def get_favorite_recipes(self, user_id):
+        return await self._read_saved(user_id, self.db.get_favorite_recipes, user_id)
+
+    async def get_favorite_recipe(self, user_id, recipe_id):
+        return await self._read_saved(user_id, self.db.get_favorite_recipe, user_id, recipe_id)
+
+    async def get_favorites_page(self, user_id, after=None, before=None):
+        return await self._read_saved(user_id, self.db.get_favorites_page, user_id, after, before)
+
+    async def is_recipe_favorite(self, user_id, recipe_id):
+        change = self._unsaved(user_id, recipe_id)
+        if change is not None:
+            return change['op'] != 'remove'
+        return await self._read(self.db.is_recipe_favorite, user_id, recipe_id)
+
+    async def migrate_legacy_favorites(self) -> int:
+        """Фоновый перенос старой таблицы избранного порциями через поток-писатель.
+
+        Порции чередуются с пачками изменений пользователей, поэтому бот работает во время переноса.
+        """
+        loop = asyncio.get_running_loop()
+        total = 0
+        while self.db.legacy_pending:
+            moved = await loop.run_in_executor(self._writer, self.db.migrate_legacy_batch)
+            if moved == 0 and self.db.legacy_pending:
+                break  # ошибка переноса уже записана в лог
+            total += moved
+            await asyncio.sleep(FAVORITES_MIGRATION_PAUSE)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            'pending_changes': len(self._pending),
+            'max_pending': self.max_pending,
+            'merged_changes': self.merged_changes,
+            'flushed_batches': self.flushed_batches,
+            'flushed_changes': self.flushed_changes,
+            'failed_batches': self.failed_batches,
+            'dropped_changes': self.dropped_changes,
+            'rejected_writes': self.rejected_writes,
+        }
+
+    async def aclose(self) -> None:
+        """Записывает оставшиеся изменения и закрывает соединения"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        await self.flush()
+        if self._pending:
+            logger.error(f"Не удалось записать изменений избранного при остановке: {len(self._pending)}")
+        await asyncio.to_thread(self._writer.shutdown, True)
+        self._readers.shutdown(wait=True)
+        self.db.close()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Операций в секунду с избранным: соединение на каждый вызов против пула SQLitePool
+
+«До» — прежнее поведение Database: sqlite3.connect на каждый вызов, журнал по умолчанию
+(DELETE, synchronous=FULL). «После» — долгоживущие соединения с WAL и прагмами из config.py.
+Нагрузка повторяет нажатия кнопок: проверка избранного, добавление, оценка, чтение списка
+(целиком и одной страницей) и удаление.
+
+Запуск: python benchmark_database.py [число операций на вид]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from database import Database
+from models import Ingredient, Recipe
+
+
+class PerCallConnections:
+    """Прежний способ: новое соединение на каждый вызов"""
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        pass
+
+
+def make_recipe(i):
+    return Recipe(str(52700 + i), f"Блюдо {i}", f"https://example.com/{i}.jpg", "Нагрейте масло. " * 60,
+                  [Ingredient(f"Ингредиент {n}", f"{n} ст. л.") for n in range(10)], "https://youtu.be/x")
+
+
+def run(db, count):
+    """Операций в секунду для каждого вида операций"""
+    recipes = [make_recipe(i) for i in range(count)]
+    operations = [
+        ("is_recipe_favorite", lambda i: db.is_recipe_favorite(1, recipes[i].id)),
+        ("add_favorite_recipe", lambda i: db.add_favorite_recipe(1, recipes[i])),
+        ("update_recipe_rating", lambda i: db.update_recipe_rating(1, recipes[i].id, i % 5 + 1)),
+        ("get_favorite_recipes", lambda i: db.get_favorite_recipes(1)),
+        ("get_favorites_page", lambda i: db.get_favorites_page(1)),
+        ("remove_favorite_recipe", lambda i: db.remove_favorite_recipe(1, recipes[i].id)),
+    ]
+    result = {}
+    for name, operation in operations:
+        started = time.perf_counter()
+        for i in range(count):
+            operation(i)
+        result[name] = count / (time.perf_counter() - started)
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    with tempfile.TemporaryDirectory() as tmp:
+        # У каждого варианта свой файл: режим WAL сохраняется в файле базы
+        before_name = os.path.join(tmp, 'before.db')
+        before = run(Database(before_name, pool=PerCallConnections(before_name)), count)
+        after_db = Database(os.path.join(tmp, 'after.db'))
+        after = run(after_db, count)
+        after_db.close()
+
+    print(f"🗄️ Операций в секунду, {count} операций каждого вида\n")
+    print(f"{'':<24}{'до':>10}{'после':>10}{'ускорение':>11}")
+    for name in before:
+        print(f"{name:<24}{before[name]:>10.0f}{after[name]:>10.0f}{after[name] / before[name]:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
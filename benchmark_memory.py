@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Замер памяти на рецепт: словари против models.Recipe
+
+Сравниваются структуры, которые бот держит в user_states: карточки выдачи поиска,
+полные (гидратированные) рецепты и избранное. Данные синтетические, но по форме
+повторяют ответы TheMealDB: 10 ингредиентов, инструкции около 1000 символов.
+
+Запуск: python benchmark_memory.py [число рецептов]
+"""
+
+import json
+import sys
+import tracemalloc
+
+from models import Recipe, dump_ingredients_json
+
+INGREDIENTS = ['chicken', 'onion', 'garlic', 'olive oil', 'salt', 'pepper', 'tomato', 'basil', 'butter', 'rice']
+
+
+def make_payload(count):
+    """JSON-ответ в формате TheMealDB; строки создаются заново при каждом json.loads"""
+    meals = []
+    for i in range(count):
+        meal = {
+            'idMeal': str(52700 + i),
+            'strMeal': f'Chicken Dish {i}',
+            'strMealThumb': f'https://www.themealdb.com/images/media/meals/{i}.jpg',
+            'strInstructions': 'Heat the oil in a large pan and cook gently. ' * 22,
+            'strYoutube': f'https://www.youtube.com/watch?v={i:011d}',
+        }
+        for n in range(1, 21):
+            meal[f'strIngredient{n}'] = INGREDIENTS[n - 1] if n <= len(INGREDIENTS) else ''
+            meal[f'strMeasure{n}'] = f'{n} tbsp' if n <= len(INGREDIENTS) else ''
+        meals.append(meal)
+    return json.dumps({'meals': meals})
+
+
+def legacy_recipe(meal):
+    """Прежний формат: рецепт и ингредиенты — словари"""
+    return {
+        'id': meal['idMeal'],
+        'name': meal['strMeal'],
+        'image': meal['strMealThumb'],
+        'instructions': meal['strInstructions'],
+        'ingredients': [
+            {'name': meal[f'strIngredient{n}'], 'amount': meal[f'strMeasure{n}'], 'unit': ''}
+            for n in range(1, 21) if meal[f'strIngredient{n}']
+        ],
+        'video': meal['strYoutube'],
+        'source': 'TheMealDB'
+    }
+
+
+def legacy_summary(meal):
+    return {'id': meal['idMeal'], 'name': meal['strMeal'], 'image': meal['strMealThumb'], 'source': 'TheMealDB'}
+
+
+def legacy_favorite(row):
+    """Прежний Database.get_favorite_recipes: словарь на строку"""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'image': row[2],
+        'instructions': row[3],
+        'ingredients': json.loads(row[4]),
+        'video': row[5],
+        'rating': row[6],
+        'added_date': row[7]
+    }
+
+
+def model_favorite(row):
+    return Recipe.from_row(row, source='', rating=row[6], added_date=row[7])
+
+
+def favorite_rows(payload):
+    rows = []
+    for meal in json.loads(payload)['meals']:
+        recipe = Recipe.from_themealdb(meal)
+        rows.append((recipe.id, recipe.name, recipe.image, recipe.instructions,
+                     dump_ingredients_json(recipe.ingredients), recipe.video, 4, '2024-01-01 12:00:00'))
+    return json.dumps(rows)
+
+
+def measure(build, source):
+    """Байт на рецепт, которые остаются занятыми после построения списка"""
+    items = json.loads(source)
+    if isinstance(items, dict):
+        items = items['meals']
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = [build(item) for item in items]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return (after - before) / len(items)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    payload = make_payload(count)
+    rows = favorite_rows(payload)
+
+    cases = [
+        ("Карточки выдачи поиска", legacy_summary, lambda meal: Recipe.from_themealdb(meal).summary(), payload),
+        ("Полные рецепты", legacy_recipe, Recipe.from_themealdb, payload),
+        ("Избранное", legacy_favorite, model_favorite, rows),
+    ]
+
+    print(f"📏 Память на рецепт, {count} рецептов (байт)\n")
+    print(f"{'':<24}{'dict':>10}{'Recipe':>10}{'экономия':>10}")
+    for title, legacy, model, source in cases:
+        legacy_size = measure(legacy, source)
+        model_size = measure(model, source)
+        saving = 1 - model_size / legacy_size
+        print(f"{title:<24}{legacy_size:>10.0f}{model_size:>10.0f}{saving:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
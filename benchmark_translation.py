@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Время перевода на один поиск для разных движков перевода
+
+Повторяет переводы, которые делает поиск: запрос ru→en, названия карточек выдачи
+en→ru одним пакетом и полный первый рецепт (название, инструкции около 2500 символов,
+ингредиенты не из словаря). Тексты уникальны для каждого поиска, а память переводов
+временная, поэтому замеряется холодный путь без попаданий в кэш.
+
+Запуск: python benchmark_translation.py [число поисков] [движки через запятую]
+Движки: stub, offline, argos, google (по умолчанию stub,offline; google требует сети).
+Задержка заглушки — TRANSLATION_STUB_LATENCY.
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from config import MAX_RECIPES_PER_SEARCH
+from translation_backends import BACKENDS, TranslationBackend
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+STEP = "Heat the oil in a large pan and cook the onion gently until soft and golden. "
+UNKNOWN_INGREDIENTS = ['smoked paprika', 'fenugreek', 'tamarind paste']
+
+
+class CountingBackend(TranslationBackend):
+    """Обертка над движком, считающая запросы к нему"""
+
+    def __init__(self, backend: TranslationBackend) -> None:
+        self.backend = backend
+        self.name = backend.name
+        self.remote = backend.remote
+        self.cacheable = backend.cacheable
+        self.requests = 0
+
+    def supports(self, source, target):
+        return self.backend.supports(source, target)
+
+    def translate(self, text, source, target):
+        self.requests += 1
+        return self.backend.translate(text, source, target)
+
+
+def run_search(service, i):
+    """Переводы одного поиска с первой открытой карточкой"""
+    service.russian_to_english(f"курица с рисом {i}")
+    service.english_to_russian_batch([f"Chicken Dish {i}-{n}" for n in range(MAX_RECIPES_PER_SEARCH)])
+    instructions = f"Recipe {i}.\n" + "\n".join((STEP * 8).strip() for _ in range(4))
+    service.english_to_russian_batch([f"Chicken Dish {i}-0", instructions] +
+                                     [f"{name} {i}" for name in UNKNOWN_INGREDIENTS])
+
+
+def measure(name, searches):
+    """Среднее и 95-й процентиль времени на поиск (мс) и запросов к движку на поиск"""
+    backend = BACKENDS[name]()
+    if not backend.available():
+        return None
+    counting = CountingBackend(backend)
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')), backend=counting)
+        timings = []
+        for i in range(searches):
+            started = time.perf_counter()
+            run_search(service, i)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.mean(timings), p95, counting.requests / searches
+
+
+def main():
+    searches = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    names = sys.argv[2].split(',') if len(sys.argv) > 2 else ['stub', 'offline']
+
+    print(f"⏱️ Перевод на один поиск, {searches} поисков\n")
+    print(f"{'':<10}{'среднее, мс':>14}{'p95, мс':>10}{'запросов':>10}")
+    for name in names:
+        if name not in BACKENDS:
+            print(f"{name:<10}{'неизвестный движок':>34}")
+            continue
+        result = measure(name, searches)
+        if result is None:
+            print(f"{name:<10}{'недоступен':>34}")
+            continue
+        mean, p95, requests = result
+        print(f"{name:<10}{mean:>14.1f}{p95:>10.1f}{requests:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
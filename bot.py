@@ -1,9 +1,10 @@
+import asyncio
 import logging
-from telegram import Update
+from telegram import InputMediaPhoto, Update
 from telegram.constants import ChatAction
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes, ConversationHandler
-from config import TELEGRAM_TOKEN
-from database import Database
+from config import PREFETCH_MAX_PER_USER, PREFETCH_PAGES_AHEAD, TELEGRAM_TOKEN
+from async_database import AsyncDatabase
 from api_client import RecipeAPI
 from keyboards import Keyboards
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
@@ -19,13 +20,22 @@ logger = logging.getLogger(__name__)
 WAITING_FOR_SEARCH_QUERY = 1
 
 class RecipeBot:
-    def __init__(self):
-        self.db = Database()
-        self.api = RecipeAPI()
+    def __init__(self, db=None, api=None):
+        self.db = db if db is not None else AsyncDatabase()
+        self.api = api if api is not None else RecipeAPI()
         self.keyboards = Keyboards()
         
         # Хранилище состояния пользователей
-        self.user_states = {}  # {user_id: {'search_results': [], 'current_page': 0, 'favorites': [], 'fav_page': 0}}
+        self.user_states = {}  # {user_id: {'search_results': [], 'current_page': 0, 'favorites': [], 'fav_keys': [], 'fav_total': 0, 'fav_page': 0}}
+        
+        # Фоновое обновление локального каталога TheMealDB
+        self._catalog_task = None
+        # Фоновый перенос старой таблицы избранного в нормализованную схему
+        self._migration_task = None
+        # Фоновая дозагрузка результатов поиска: {user_id: asyncio.Task}
+        self._search_tasks = {}
+        # Фоновая подготовка следующих страниц выдачи: {user_id: {page: asyncio.Task}}
+        self._prefetch_tasks = {}
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -99,74 +109,188 @@ class RecipeBot:
             await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
         except Exception:
             pass
-        recipes = self.api.search_recipes(query)
+        stream = self.api.iter_search_recipes(query)
+        try:
+            first_recipe = await stream.__anext__()
+        except StopAsyncIteration:
+            first_recipe = None
+        
+        if first_recipe:
+            # В выдаче только краткие карточки; полный рецепт загружаем для показываемой страницы
+            first_recipe = await self._hydrate_search_result([first_recipe], 0)
         
-        if not recipes:
+        if not first_recipe:
             await update.message.reply_text(
                 f"😔 По запросу '{query}' ничего не найдено.\nПопробуйте другой запрос:",
                 reply_markup=self.keyboards.get_cancel_keyboard()
             )
             return WAITING_FOR_SEARCH_QUERY
         
-        # Сохраняем результаты поиска
+        # Сохраняем результаты поиска; список пополняется в фоне по мере готовности карточек
+        self._leave_search_results(user_id)
+        recipes = [first_recipe]
         self.user_states[user_id] = {
             'search_results': recipes,
+            'search_loading': True,
             'current_page': 0,
             'favorites': [],
             'fav_page': 0
         }
         
-        # Показываем первый рецепт
-        await self.show_recipe(update, context, recipes[0], is_search=True)
+        # Показываем первый рецепт сразу, не дожидаясь остальных
+        message = await self.show_recipe(update, context, first_recipe, is_search=True)
+        self._search_tasks[user_id] = asyncio.create_task(
+            self._collect_search_results(user_id, stream, recipes, message)
+        )
+        self._schedule_prefetch(user_id)
         return ConversationHandler.END
     
+    async def _hydrate_search_result(self, search_results, page):
+        """Полный рецепт для страницы выдачи; загруженный рецепт заменяет краткую карточку в списке"""
+        recipe = search_results[page]
+        if not recipe.is_summary:
+            return recipe
+        
+        hydrated = await self.api.hydrate_recipe(recipe.id, recipe.source)
+        if hydrated is None:
+            logger.warning(f"Не удалось загрузить рецепт {recipe.source}:{recipe.id}, показываем карточку")
+            return recipe
+        search_results[page] = hydrated
+        return hydrated
+    
+    def _schedule_prefetch(self, user_id):
+        """Подготовить в фоне следующие страницы выдачи, пока пользователь читает текущую"""
+        user_state = self.user_states.get(user_id, {})
+        search_results = user_state.get('search_results')
+        if not search_results:
+            return
+        
+        current_page = user_state.get('current_page', 0)
+        wanted = range(current_page + 1, min(current_page + 1 + PREFETCH_PAGES_AHEAD, len(search_results)))
+        tasks = self._prefetch_tasks.setdefault(user_id, {})
+        
+        # Пользователь ушел с этих страниц — их подготовка больше не нужна
+        for page in [page for page in tasks if page not in wanted]:
+            tasks.pop(page).cancel()
+        
+        for page in wanted:
+            if page in tasks or len(tasks) >= PREFETCH_MAX_PER_USER:
+                continue
+            recipe = search_results[page]
+            image = recipe.image
+            if not recipe.is_summary and (not image or self.api.image_status(image) is not None):
+                continue  # Страница уже готова
+            tasks[page] = asyncio.create_task(self._prefetch_search_page(user_id, search_results, page))
+    
+    async def _prefetch_search_page(self, user_id, search_results, page):
+        """Загрузка, перевод и проверка фото одной страницы выдачи"""
+        try:
+            recipe = await self._hydrate_search_result(search_results, page)
+            if recipe.image:
+                await self.api.check_image(recipe.image)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при подготовке страницы {page + 1} выдачи: {e}")
+        finally:
+            tasks = self._prefetch_tasks.get(user_id, {})
+            if tasks.get(page) is asyncio.current_task():
+                del tasks[page]
+    
+    def _leave_search_results(self, user_id):
+        """Пользователь ушел из выдачи: останавливаем ее дозагрузку и подготовку страниц"""
+        self._cancel_search_stream(user_id)
+        for task in self._prefetch_tasks.pop(user_id, {}).values():
+            task.cancel()
+    
+    def _cancel_search_stream(self, user_id):
+        """Остановить дозагрузку результатов предыдущего поиска пользователя"""
+        task = self._search_tasks.pop(user_id, None)
+        if task is not None:
+            task.cancel()
+    
+    async def _collect_search_results(self, user_id, stream, recipes, message):
+        """Дозагрузка результатов поиска с обновлением счетчика страниц"""
+        try:
+            async for recipe in stream:
+                recipes.append(recipe)
+                await self._refresh_search_keyboard(user_id, recipes, message)
+                if self.user_states.get(user_id, {}).get('search_results') is recipes:
+                    self._schedule_prefetch(user_id)
+        except Exception as e:
+            logger.error(f"Ошибка при дозагрузке результатов поиска: {e}")
+        
+        user_state = self.user_states.get(user_id, {})
+        if user_state.get('search_results') is recipes:
+            user_state['search_loading'] = False
+            await self._refresh_search_keyboard(user_id, recipes, message)
+        self._search_tasks.pop(user_id, None)
+    
+    async def _refresh_search_keyboard(self, user_id, recipes, message):
+        """Обновить навигацию под карточкой поиска, если пользователь все еще в этой выдаче"""
+        user_state = self.user_states.get(user_id, {})
+        if message is None or user_state.get('search_results') is not recipes:
+            return
+        
+        current_page = user_state.get('current_page', 0)
+        keyboard = self.keyboards.get_search_results_navigation(
+            current_page, len(recipes), recipes[current_page].id, loading=user_state.get('search_loading', False)
+        )
+        try:
+            await message.edit_reply_markup(reply_markup=keyboard)
+        except Exception as e:
+            if "message is not modified" not in str(e):
+                logger.error(f"Ошибка при обновлении навигации: {e}")
+    
     async def show_recipe(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe, is_search=False, is_favorite=False):
         """Показать рецепт"""
         user_id = update.effective_user.id
 
         # Формируем текст рецепта
         recipe_text = f"""
-    🍽️ **{recipe['name']}**
+    🍽️ **{recipe.name}**
 
     📝 **Ингредиенты:**
     """
 
-        for ingredient in recipe['ingredients']:
-            if ingredient.get('amount') and ingredient.get('unit'):
-                recipe_text += f"• {ingredient['amount']} {ingredient['unit']} {ingredient['name']}\n"
-            elif ingredient.get('amount'):
-                recipe_text += f"• {ingredient['amount']} {ingredient['name']}\n"
+        for ingredient in recipe.ingredients or ():
+            if ingredient.amount and ingredient.unit:
+                recipe_text += f"• {ingredient.amount} {ingredient.unit} {ingredient.name}\n"
+            elif ingredient.amount:
+                recipe_text += f"• {ingredient.amount} {ingredient.name}\n"
             else:
-                recipe_text += f"• {ingredient['name']}\n"
+                recipe_text += f"• {ingredient.name}\n"
 
         recipe_text += f"""
     📋 **Инструкция:**
-    {recipe['instructions']}
+    {recipe.instructions}
 
     """
 
-        if recipe.get('video'):
-            recipe_text += f"📺 **Видеорецепт:** {recipe['video']}\n\n"
+        if recipe.video:
+            recipe_text += f"📺 **Видеорецепт:** {recipe.video}\n\n"
 
         # Проверяем, находится ли рецепт в избранном
-        is_in_favorites = self.db.is_recipe_favorite(user_id, recipe['id'])
+        is_in_favorites = await self.db.is_recipe_favorite(user_id, recipe.id)
 
         # Выбираем клавиатуру
         if is_search:
             user_state = self.user_states.get(user_id, {})
             current_page = user_state.get('current_page', 0)
             total_pages = len(user_state.get('search_results', [])) or 1
-            keyboard = self.keyboards.get_search_results_navigation(current_page, total_pages, recipe['id'])
+            keyboard = self.keyboards.get_search_results_navigation(
+                current_page, total_pages, recipe.id, loading=user_state.get('search_loading', False)
+            )
         elif is_favorite:
             rating = 0
             favorites = self.user_states.get(user_id, {}).get('favorites', [])
             for fav in favorites:
-                if fav['id'] == recipe['id']:
-                    rating = fav.get('rating', 0)
+                if fav.id == recipe.id:
+                    rating = fav.rating
                     break
-            keyboard = self.keyboards.get_favorite_recipe_actions(recipe['id'], rating)
+            keyboard = self.keyboards.get_favorite_recipe_actions(recipe.id, rating)
         else:
-            keyboard = self.keyboards.get_recipe_actions(recipe['id'], is_in_favorites)
+            keyboard = self.keyboards.get_recipe_actions(recipe.id, is_in_favorites)
 
         # Ограничиваем длину подписи
         if len(recipe_text) > 1000:
@@ -174,12 +298,12 @@ class RecipeBot:
         else:
             recipe_caption = recipe_text
 
-        # Отправляем фото с подписью
-        if recipe.get('image'):
+        # Отправляем фото с подписью; отправленное сообщение возвращаем для последующих правок
+        if recipe.image and self.api.image_status(recipe.image) is not False:
             try:
-                await context.bot.send_photo(
+                return await context.bot.send_photo(
                     chat_id=update.effective_chat.id,
-                    photo=recipe['image'],
+                    photo=recipe.image,
                     caption=recipe_caption,
                     reply_markup=keyboard,
                     parse_mode='HTML'
@@ -191,26 +315,26 @@ class RecipeBot:
                     "🖼️ Фото недоступно, но вот рецепт:",
                     parse_mode='HTML'
                 )
-                await update.message.reply_text(
+                return await update.message.reply_text(
                     recipe_text,
                     reply_markup=keyboard,
                     parse_mode='HTML'
                 )
         else:
-            await update.message.reply_text(
+            return await update.message.reply_text(
                 recipe_text,
                 reply_markup=keyboard,
                 parse_mode='HTML'
             )
 
     def _format_recipe_caption(self, recipe):
-        caption = f"🍽️ **{recipe['name']}**\n\n"
+        caption = f"🍽️ **{recipe.name}**\n\n"
         
         caption += "**📝 Ингредиенты:**\n"
-        for ingr in recipe['ingredients'][:8]:
-            name = ingr.get('name', 'неизвестно')
-            amount = ingr.get('amount', '')
-            unit = ingr.get('unit', '')
+        for ingr in recipe.ingredients[:8]:
+            name = ingr.name or 'неизвестно'
+            amount = ingr.amount
+            unit = ingr.unit
             if amount and unit:
                 caption += f"• {amount} {unit} {name}\n"
             elif amount:
@@ -218,12 +342,12 @@ class RecipeBot:
             else:
                 caption += f"• {name}\n"
         
-        if len(recipe['ingredients']) > 8:
+        if len(recipe.ingredients) > 8:
             caption += "• и ещё...\n"
         
-        caption += f"\n**📋 Инструкция:**\n{recipe['instructions'][:300]}...\n"
+        caption += f"\n**📋 Инструкция:**\n{recipe.instructions[:300]}...\n"
         
-        if recipe.get('video'):
+        if recipe.video:
             caption += "\n📺 Нажмите 'Видеорецепт' для просмотра"
         
         return caption[:1000] + "..." if len(caption) > 1000 else caption
@@ -249,7 +373,8 @@ class RecipeBot:
     async def show_favorites(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать избранные рецепты — с навигацией"""
         user_id = update.effective_user.id
-        favorites = self.db.get_favorite_recipes(user_id)
+        # Загружаем только первую страницу и общее число рецептов
+        favorites, keys, total = await self.db.get_favorites_page(user_id)
 
         if not favorites:
             await update.message.reply_text(
@@ -258,51 +383,55 @@ class RecipeBot:
             )
             return
 
-        # Сохраняем в состояние
+        # Сохраняем в состояние показанную страницу и ее ключи для перехода к соседним
         if user_id not in self.user_states:
             self.user_states[user_id] = {}
         self.user_states[user_id]['favorites'] = favorites
+        self.user_states[user_id]['fav_keys'] = keys
+        self.user_states[user_id]['fav_total'] = total
         self.user_states[user_id]['fav_page'] = 0  # ← начинаем с 0
 
         # Показываем первый рецепт с навигацией
         await self.show_favorite_with_navigation(update, context, 0)
     
     async def show_favorite_with_navigation(self, update: Update, context: ContextTypes.DEFAULT_TYPE, page: int):
-        """Показать избранный рецепт с навигацией"""
+        """Показать избранный рецепт с навигацией (страница уже загружена в состояние)"""
         user_id = update.effective_user.id
-        favorites = self.user_states.get(user_id, {}).get('favorites', [])
+        user_state = self.user_states.get(user_id, {})
+        favorites = user_state.get('favorites', [])
 
         if not favorites:
             await update.message.reply_text("Нет избранных рецептов.")
             return
 
-        if page < 0 or page >= len(favorites):
+        total = user_state.get('fav_total', len(favorites))
+        if page < 0 or page >= total:
             return
 
         # Обновляем текущую страницу
-        self.user_states[user_id]['fav_page'] = page
-        recipe = favorites[page]
+        user_state['fav_page'] = page
+        recipe = favorites[0]
 
         # Формируем подпись
-        caption = f"[{page + 1}/{len(favorites)}] 🍽️ **{recipe['name']}**\n\n"
-        caption += f"⭐ Рейтинг: {recipe.get('rating', 0)}\n\n"
-        caption += f"📝 Ингредиентов: {len(recipe['ingredients'])}\n"
+        caption = f"[{page + 1}/{total}] 🍽️ **{recipe.name}**\n\n"
+        caption += f"⭐ Рейтинг: {recipe.rating}\n\n"
+        caption += f"📝 Ингредиентов: {len(recipe.ingredients)}\n"
         caption += "Нажмите 'Подробнее' для просмотра."
 
         # Клавиатура: навигация + действия
         keyboard = self.keyboards.get_favorites_navigation(
             current_page=page,
-            total_pages=len(favorites),
-            recipe_id=recipe['id']
+            total_pages=total,
+            recipe_id=recipe.id
         )
 
 
         # Отправляем фото
-        if recipe.get('image'):
+        if recipe.image:
             try:
                 await context.bot.send_photo(
                     chat_id=update.effective_chat.id,
-                    photo=recipe['image'],
+                    photo=recipe.image,
                     caption=caption,
                     reply_markup=keyboard,
                     parse_mode='HTML'
@@ -317,7 +446,7 @@ class RecipeBot:
         """Показать случайный рецепт"""
         await update.message.reply_text("🎲 Ищу случайный рецепт...")
         
-        recipe = self.api.get_random_recipe()
+        recipe = await self.api.get_random_recipe()
         
         if not recipe:
             await update.message.reply_text(
@@ -331,23 +460,22 @@ class RecipeBot:
     async def show_favorite_detail(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe_id: str):
         """Показать полную информацию о рецепте из избранного"""
         user_id = update.effective_user.id
-        favorites = self.user_states.get(user_id, {}).get('favorites', [])
-        
-        recipe = next((r for r in favorites if r['id'] == recipe_id), None)
+        # В памяти только текущая страница избранного, а кнопка может быть со старой карточки
+        recipe = await self.db.get_favorite_recipe(user_id, recipe_id)
         if not recipe:
             await update.callback_query.answer("❌ Рецепт не найден.")
             return
 
         # Формируем подпись
         caption = f"""
-    🍽️ **{recipe['name']}**
+    🍽️ **{recipe.name}**
 
     📝 **Ингредиенты:**
     """
-        for ingr in recipe['ingredients'][:8]:
-            name = ingr.get('name', '')
-            amount = ingr.get('amount', '')
-            unit = ingr.get('unit', '')
+        for ingr in recipe.ingredients[:8]:
+            name = ingr.name
+            amount = ingr.amount
+            unit = ingr.unit
             if amount and unit:
                 caption += f"• {amount} {unit} {name}\n"
             elif amount:
@@ -355,23 +483,23 @@ class RecipeBot:
             else:
                 caption += f"• {name}\n"
 
-        if len(recipe['ingredients']) > 8:
+        if len(recipe.ingredients) > 8:
             caption += "• и ещё...\n"
 
         caption += f"""
     📋 **Инструкция:**
-    {recipe['instructions'][:300]}...
+    {recipe.instructions[:300]}...
 
     """
-        if recipe.get('video'):
-            caption += f"📺 **Видеорецепт:** {recipe['video']}\n"
+        if recipe.video:
+            caption += f"📺 **Видеорецепт:** {recipe.video}\n"
 
         # Обрезаем подпись
         if len(caption) > 1024:
             caption = caption[:1000] + "...\n\n(Описание сокращено)"
 
         # Клавиатура
-        keyboard = self.keyboards.get_favorite_recipe_actions(recipe_id, recipe.get('rating', 0))
+        keyboard = self.keyboards.get_favorite_recipe_actions(recipe_id, recipe.rating)
 
         try:
             await update.callback_query.edit_message_caption(
@@ -445,18 +573,29 @@ class RecipeBot:
             recipe_id = data.split(":")[1]
             await self.show_favorite_detail(update, context, recipe_id)
     
+    async def _find_recipe_source(self, user_id, recipe_id):
+        """Источник рецепта из результатов поиска или избранного пользователя (по умолчанию TheMealDB)"""
+        for recipe in self.user_states.get(user_id, {}).get('search_results', []):
+            if recipe.id == recipe_id and recipe.source:
+                return recipe.source
+        # Избранное берем из базы: в памяти только текущая страница
+        recipe = await self.db.get_favorite_recipe(user_id, recipe_id)
+        if recipe and recipe.source:
+            return recipe.source
+        return 'TheMealDB'
+    
     async def add_to_favorites(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe_id):
         user_id = update.effective_user.id
-        recipe = self.api.get_recipe_by_id(recipe_id)
+        recipe = await self.api.get_recipe_by_id(recipe_id, await self._find_recipe_source(user_id, recipe_id))
         if not recipe:
             await update.callback_query.answer("❌ Рецепт не найден.")
             return
 
-        if self.db.is_recipe_favorite(user_id, recipe_id):
+        if await self.db.is_recipe_favorite(user_id, recipe_id):
             await update.callback_query.answer("Уже в избранном!")
             return
 
-        if self.db.add_favorite_recipe(user_id, recipe):
+        if await self.db.add_favorite_recipe(user_id, recipe):
             await update.callback_query.edit_message_caption(
                 caption="✅ Добавлено в избранное! Оцените блюдо:",
                 reply_markup=self.keyboards.get_rating_keyboard(recipe_id),
@@ -468,7 +607,7 @@ class RecipeBot:
     async def remove_from_favorites(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe_id):
         """Удалить рецепт из избранного"""
         user_id = update.effective_user.id
-        success = self.db.remove_favorite_recipe(user_id, recipe_id)
+        success = await self.db.remove_favorite_recipe(user_id, recipe_id)
 
         if success:
             try:
@@ -483,17 +622,17 @@ class RecipeBot:
     
     async def rate_recipe(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe_id, rating):
         user_id = update.effective_user.id
-        success = self.db.update_recipe_rating(user_id, recipe_id, rating)
+        success = await self.db.update_recipe_rating(user_id, recipe_id, rating)
         
         if success:
             # Получаем обновлённый рецепт
-            recipe = self.api.get_recipe_by_id(recipe_id)
+            recipe = await self.api.get_recipe_by_id(recipe_id, await self._find_recipe_source(user_id, recipe_id))
             if not recipe:
                 await update.callback_query.answer("❌ Рецепт не найден.")
                 return
 
-            # Обновляем рейтинг в объекте
-            recipe['rating'] = rating
+            # Рецепт неизменяем — берем вариант с новым рейтингом
+            recipe = recipe.replace(rating=rating)
 
             # Формируем подпись
             caption = f"⭐ Вы оценили рецепт на {rating} звёзд!\n\n{self._format_recipe_caption(recipe)}"
@@ -522,9 +661,10 @@ class RecipeBot:
             logger.error(f"Ошибка: {e}")
 
     async def show_video(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe_id):
-        recipe = self.api.get_recipe_by_id(recipe_id)
-        if recipe and recipe.get('video'):
-            video_link = recipe['video']
+        user_id = update.effective_user.id
+        recipe = await self.api.get_recipe_by_id(recipe_id, await self._find_recipe_source(user_id, recipe_id))
+        if recipe and recipe.video:
+            video_link = recipe.video
             try:
                 await update.callback_query.edit_message_caption(
                     caption=f"📺 **Видеорецепт:**\n{video_link}",
@@ -543,21 +683,35 @@ class RecipeBot:
         
         if 0 <= page < len(search_results):
             user_state['current_page'] = page
-            recipe = search_results[page]
+            recipe = await self._hydrate_search_result(search_results, page)
             
             await self.update_recipe_message(update, context, recipe, is_search=True)
+            self._schedule_prefetch(user_id)
     
     async def navigate_favorites(self, update: Update, context: ContextTypes.DEFAULT_TYPE, page):
         """Навигация по избранным рецептам"""
         user_id = update.effective_user.id
         user_state = self.user_states.get(user_id, {})
-        favorites = user_state.get('favorites', [])
-        
-        if 0 <= page < len(favorites):
-            user_state['fav_page'] = page
-            recipe = favorites[page]
-            
-            await self.show_favorite_with_navigation(update, context, page)
+        keys = user_state.get('fav_keys', [])
+        current_page = user_state.get('fav_page', 0)
+        if not keys:
+            return
+
+        # Соседняя страница запрашивается по ключу показанной, без OFFSET и всего списка
+        if page == current_page + 1:
+            favorites, keys, total = await self.db.get_favorites_page(user_id, after=keys[-1])
+        elif page == current_page - 1:
+            favorites, keys, total = await self.db.get_favorites_page(user_id, before=keys[0])
+        else:
+            return
+        if not favorites:
+            return
+
+        user_state['favorites'] = favorites
+        user_state['fav_keys'] = keys
+        # Список мог измениться с прошлой страницы — номер не выходит за новое число рецептов
+        user_state['fav_total'] = max(total, page + 1)
+        await self.show_favorite_with_navigation(update, context, page)
     
     async def update_recipe_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE, recipe, is_search=False, is_favorite=False):
         """Обновить сообщение с рецептом (универсально)"""
@@ -565,36 +719,57 @@ class RecipeBot:
 
         # Формируем текст
         recipe_text = f"""
-    🍽️ **{recipe['name']}**
+    🍽️ **{recipe.name}**
 
     📝 **Ингредиенты:**
     """
-        for ingredient in recipe['ingredients']:
-            if ingredient.get('amount') and ingredient.get('unit'):
-                recipe_text += f"• {ingredient['amount']} {ingredient['unit']} {ingredient['name']}\n"
-            elif ingredient.get('amount'):
-                recipe_text += f"• {ingredient['amount']} {ingredient['name']}\n"
+        for ingredient in recipe.ingredients or ():
+            if ingredient.amount and ingredient.unit:
+                recipe_text += f"• {ingredient.amount} {ingredient.unit} {ingredient.name}\n"
+            elif ingredient.amount:
+                recipe_text += f"• {ingredient.amount} {ingredient.name}\n"
             else:
-                recipe_text += f"• {ingredient['name']}\n"
+                recipe_text += f"• {ingredient.name}\n"
 
         recipe_text += f"""
     📋 **Инструкция:**
-    {recipe['instructions']}
+    {recipe.instructions}
 
     """
-        if recipe.get('video'):
-            recipe_text += f"📺 **Видеорецепт:** {recipe['video']}\n\n"
+        if recipe.video:
+            recipe_text += f"📺 **Видеорецепт:** {recipe.video}\n\n"
 
         # Обрезаем подпись
         caption = recipe_text[:1000] + "..." if len(recipe_text) > 1000 else recipe_text
 
         # Клавиатура
-        if is_favorite:
-            rating = recipe.get('rating', 0)
-            keyboard = self.keyboards.get_favorite_recipe_actions(recipe['id'], rating)
+        if is_search:
+            user_state = self.user_states.get(user_id, {})
+            keyboard = self.keyboards.get_search_results_navigation(
+                user_state.get('current_page', 0),
+                len(user_state.get('search_results', [])) or 1,
+                recipe.id,
+                loading=user_state.get('search_loading', False)
+            )
+        elif is_favorite:
+            rating = recipe.rating
+            keyboard = self.keyboards.get_favorite_recipe_actions(recipe.id, rating)
         else:
-            is_in_fav = self.db.is_recipe_favorite(user_id, recipe['id'])
-            keyboard = self.keyboards.get_recipe_actions(recipe['id'], is_in_fav)
+            is_in_fav = await self.db.is_recipe_favorite(user_id, recipe.id)
+            keyboard = self.keyboards.get_recipe_actions(recipe.id, is_in_fav)
+
+        # В выдаче поиска меняем и фото, если ссылка на него не признана битой
+        if is_search and recipe.image and self.api.image_status(recipe.image) is not False:
+            try:
+                await update.callback_query.edit_message_media(
+                    media=InputMediaPhoto(media=recipe.image, caption=caption, parse_mode='HTML'),
+                    reply_markup=keyboard
+                )
+                return
+            except Exception as e:
+                if "message is not modified" in str(e):
+                    return
+                logger.error(f"Ошибка при замене фото: {e}")
 
         # Попробуем сначала изменить подпись
         try:
@@ -622,6 +797,7 @@ class RecipeBot:
         """Вернуться к поиску — удаляем и отправляем текст"""
         query = update.callback_query
         await query.answer()
+        self._leave_search_results(update.effective_user.id)
 
         try:
             await query.delete_message()
@@ -647,6 +823,7 @@ class RecipeBot:
         """Вернуться в главное меню — безопасно: удаляем и отправляем заново"""
         query = update.callback_query
         await query.answer()
+        self._leave_search_results(update.effective_user.id)
 
         try:
             # Сначала удаляем текущее сообщение (фото с подписью)
@@ -675,6 +852,7 @@ class RecipeBot:
     
     async def new_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Новый поиск"""
+        self._leave_search_results(update.effective_user.id)
         await update.callback_query.edit_message_text(
             "Введите название блюда или ингредиент для поиска:",
             reply_markup=self.keyboards.get_cancel_keyboard()
@@ -689,6 +867,34 @@ class RecipeBot:
         )
         return ConversationHandler.END
     
+    async def post_init(self, application: Application):
+        """Запуск фоновых задач после инициализации бота"""
+        self._catalog_task = asyncio.create_task(self.api.run_catalog_refresh())
+        if self.db.db.legacy_pending:
+            self._migration_task = asyncio.create_task(self.db.migrate_legacy_favorites())
+    
+    async def shutdown(self, application: Application):
+        """Освобождение ресурсов при остановке бота"""
+        if self._catalog_task is not None:
+            self._catalog_task.cancel()
+        if self._migration_task is not None:
+            self._migration_task.cancel()
+        for user_id in set(self._search_tasks) | set(self._prefetch_tasks):
+            self._leave_search_results(user_id)
+        logger.info(f"Статистика HTTP-соединений: {self.api.http.get_stats()}")
+        logger.info(f"Статистика кэша рецептов: {self.api.recipe_cache.stats()}")
+        logger.info(f"Статистика кэша переведенных рецептов: {self.api.hydrated_cache.stats()}")
+        logger.info(f"Статистика кэша поиска: {self.api.search_cache.stats()}")
+        logger.info(f"Статистика кэша переводов: {self.api.translator.cache.stats()}")
+        logger.info(f"Сэкономлено вызовов переводчика: {self.api.translator.stats()}")
+        logger.info(f"Статистика словаря ингредиентов: {self.api.glossary.stats()}")
+        logger.info(f"Статистика объединения запросов: {self.api.flights.stats()}")
+        logger.info(f"Состояние внешних сервисов: {self.api.get_upstream_status()}")
+        logger.info(f"Бюджет Spoonacular: {self.api.spoonacular_budget.stats()}")
+        logger.info(f"Статистика очереди записей в базу: {self.db.stats()}")
+        await self.api.aclose()
+        await self.db.aclose()
+    
     def run(self):
         """Запуск бота"""
         if not TELEGRAM_TOKEN:
@@ -696,7 +902,7 @@ class RecipeBot:
             return
         
         # Создаем приложение
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
+        application = Application.builder().token(TELEGRAM_TOKEN).post_init(self.post_init).post_shutdown(self.shutdown).concurrent_updates(True).build()
         
         # Создаем ConversationHandler только для поиска
         conv_handler = ConversationHandler(
@@ -0,0 +1,106 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def estimate_size(obj: Any) -> int:
+    """Приблизительный размер объекта в байтах вместе с вложенными dict/list/str и полями __slots__"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in obj)
+    else:
+        # Объекты на __slots__ (models.Recipe): getsizeof не учитывает значения полей
+        for field in getattr(type(obj), '__slots__', ()):
+            size += estimate_size(getattr(obj, field, None))
+    return size
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с TTL и ограничением по числу записей и объёму.
+
+    Устаревшие записи не отдаются обычным get(), но хранятся до вытеснения;
+    при переполнении вытесняются давно не использованные. Счётчики попаданий
+    и промахов доступны через stats().
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = estimate_size) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data = OrderedDict()  # {key: (expires_at, size, value)}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None, allow_expired: bool = False) -> Any:
+        """Значение по ключу; allow_expired=True отдает и устаревшую запись (режим деградации)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                if not allow_expired:
+                    # Устаревшая запись остается до вытеснения: она еще пригодится, если источник упадет
+                    self.misses += 1
+                    return default
+                self.stale_hits += 1
+                return value
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Запись больше всего кэша — не кэшируем
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
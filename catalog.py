@@ -0,0 +1,210 @@
+import logging
+import re
+import sqlite3
+import string
+import time
+
+from config import CATALOG_DATABASE_NAME, CATALOG_MAX_AGE
+from models import Recipe, dump_ingredients_json
+
+logger = logging.getLogger(__name__)
+
+# TheMealDB отдает полный каталог по первой букве названия блюда (search.php?f=)
+CATALOG_LETTERS = string.ascii_lowercase
+
+
+class MealCatalog:
+    """Локальное зеркало каталога TheMealDB в SQLite с полнотекстовым индексом FTS5.
+
+    Рецепты хранятся уже в общем формате (models.Recipe). Синхронизация идет по буквам:
+    для каждой буквы запоминается время последнего обновления, поэтому каталог
+    можно освежать частями, начиная с самых старых букв.
+    """
+
+    def __init__(self, db_name=CATALOG_DATABASE_NAME, max_age=CATALOG_MAX_AGE):
+        self.db_name = db_name
+        self.max_age = max_age
+        self._letter_synced_at = {}  # {letter: unix time}
+        self.init_database()
+
+    def init_database(self):
+        """Создание таблиц каталога и загрузка состояния синхронизации"""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                conn.executescript('''
+                    CREATE TABLE IF NOT EXISTS meals (
+                        id TEXT PRIMARY KEY,
+                        letter TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        category TEXT,
+                        area TEXT,
+                        image TEXT,
+                        instructions TEXT,
+                        ingredients TEXT,
+                        video TEXT,
+                        synced_at REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_meals_letter ON meals(letter);
+
+                    CREATE VIRTUAL TABLE IF NOT EXISTS meals_fts USING fts5(
+                        id UNINDEXED, name, category, ingredients
+                    );
+
+                    CREATE TABLE IF NOT EXISTS sync_state (
+                        letter TEXT PRIMARY KEY,
+                        synced_at REAL NOT NULL,
+                        meal_count INTEGER NOT NULL
+                    );
+                ''')
+                rows = conn.execute('SELECT letter, synced_at FROM sync_state').fetchall()
+            self._letter_synced_at = dict(rows)
+            logger.info(f"Каталог TheMealDB: синхронизировано букв {len(rows)}/{len(CATALOG_LETTERS)}")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации каталога: {e}")
+
+    def has_data(self):
+        """В каталоге есть хотя бы одна синхронизированная буква"""
+        return bool(self._letter_synced_at)
+
+    def is_fresh(self):
+        """Каталог полон и не старше max_age — ему можно доверять вместо удаленного API"""
+        if len(self._letter_synced_at) < len(CATALOG_LETTERS):
+            return False
+        return min(self._letter_synced_at.values()) >= time.time() - self.max_age
+
+    def letters_to_refresh(self, refresh_interval):
+        """Буквы, которые пора обновить: сначала ни разу не синхронизированные, затем самые старые"""
+        threshold = time.time() - refresh_interval
+        never = [letter for letter in CATALOG_LETTERS if letter not in self._letter_synced_at]
+        stale = sorted(
+            (letter for letter, synced_at in self._letter_synced_at.items() if synced_at < threshold),
+            key=self._letter_synced_at.get
+        )
+        return never + stale
+
+    def replace_letter(self, letter, entries):
+        """Замена всех блюд на букву свежими данными.
+
+        entries — список (recipe, category, area), где recipe — models.Recipe.
+        Блюда, пропавшие из выдачи TheMealDB, удаляются.
+        """
+        now = time.time()
+        ids = [recipe.id for recipe, _, _ in entries]
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                placeholders = ','.join('?' * len(ids))
+                removed = conn.execute(
+                    f'SELECT id FROM meals WHERE letter = ? AND id NOT IN ({placeholders})',
+                    (letter, *ids)
+                ).fetchall()
+                for (meal_id,) in removed:
+                    self._delete(conn, meal_id)
+                for recipe, category, area in entries:
+                    self._upsert(conn, recipe, category, area, now)
+                conn.execute(
+                    'INSERT OR REPLACE INTO sync_state (letter, synced_at, meal_count) VALUES (?, ?, ?)',
+                    (letter, now, len(entries))
+                )
+                conn.commit()
+            self._letter_synced_at[letter] = now
+            logger.info(f"Каталог: буква '{letter}' — {len(entries)} блюд, удалено {len(removed)}")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении каталога (буква '{letter}'): {e}")
+            return False
+
+    def upsert(self, recipe, category='', area=''):
+        """Добавление или обновление одного блюда (например, после lookup по ID)"""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                self._upsert(conn, recipe, category, area, time.time())
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении блюда {recipe.id} в каталог: {e}")
+
+    def _upsert(self, conn, recipe, category, area, synced_at):
+        self._delete(conn, recipe.id)
+        conn.execute('''
+            INSERT INTO meals (id, letter, name, category, area, image, instructions,
+                               ingredients, video, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            recipe.id,
+            recipe.name[:1].lower(),
+            recipe.name,
+            category,
+            area,
+            recipe.image,
+            recipe.instructions,
+            dump_ingredients_json(recipe.ingredients),
+            recipe.video,
+            synced_at
+        ))
+        conn.execute(
+            'INSERT INTO meals_fts (id, name, category, ingredients) VALUES (?, ?, ?, ?)',
+            (recipe.id, recipe.name, category, ' '.join(ing.name for ing in recipe.ingredients or ()))
+        )
+
+    def _delete(self, conn, meal_id):
+        conn.execute('DELETE FROM meals WHERE id = ?', (meal_id,))
+        conn.execute('DELETE FROM meals_fts WHERE id = ?', (meal_id,))
+
+    def search(self, query, limit=25):
+        """Полнотекстовый поиск по названиям, категориям и ингредиентам"""
+        tokens = re.findall(r'\w+', query.lower())
+        if not tokens:
+            return []
+        # Каждое слово — префиксный терм, все слова обязательны; совпадение в названии весит больше
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                rows = conn.execute('''
+                    SELECT m.id, m.name, m.image, m.instructions, m.ingredients, m.video
+                    FROM meals_fts
+                    JOIN meals m ON m.id = meals_fts.id
+                    WHERE meals_fts MATCH ?
+                    ORDER BY bm25(meals_fts, 0.0, 10.0, 2.0, 1.0)
+                    LIMIT ?
+                ''', (match, limit)).fetchall()
+            return [Recipe.from_row(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Ошибка при поиске в каталоге: {e}")
+            return []
+
+    def get(self, recipe_id):
+        """Блюдо по ID или None"""
+        return self._fetch_one(
+            'SELECT id, name, image, instructions, ingredients, video FROM meals WHERE id = ?',
+            (str(recipe_id),)
+        )
+
+    def random(self):
+        """Случайное блюдо из каталога или None"""
+        return self._fetch_one(
+            'SELECT id, name, image, instructions, ingredients, video FROM meals ORDER BY RANDOM() LIMIT 1'
+        )
+
+    def _fetch_one(self, sql, params=()):
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                row = conn.execute(sql, params).fetchone()
+            return Recipe.from_row(row) if row else None
+        except Exception as e:
+            logger.error(f"Ошибка при чтении каталога: {e}")
+            return None
+
+
+if __name__ == "__main__":
+    # Полная синхронизация каталога: python catalog.py
+    import asyncio
+    from api_client import RecipeAPI
+
+    async def _sync():
+        api = RecipeAPI()
+        try:
+            synced = await api.sync_catalog()
+            print(f"✅ Синхронизировано букв: {synced}, каталог актуален: {api.catalog.is_fresh()}")
+        finally:
+            await api.aclose()
+
+    asyncio.run(_sync())
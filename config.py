@@ -12,7 +12,86 @@ THEMEALDB_API_URL = "https://www.themealdb.com/api/json/v1/1"
 
 # Database
 DATABASE_NAME = "recipes.db"
+DATABASE_POOL_SIZE = 4  # долгоживущих соединений с recipes.db
+SQLITE_SYNCHRONOUS = 'NORMAL'  # в режиме WAL fsync только на checkpoint, транзакции не теряются при сбое процесса
+SQLITE_CACHE_SIZE_KB = 8 * 1024  # кэш страниц на соединение
+SQLITE_MMAP_SIZE = 64 * 1024 * 1024  # байт файла базы, читаемых через mmap
+SQLITE_BUSY_TIMEOUT = 5.0  # секунд ожидания блокировки базы или свободного соединения
+SQLITE_STATEMENT_CACHE = 64  # скомпилированных запросов на соединение
+DB_WRITE_QUEUE_LIMIT = 100  # несохраненных изменений избранного, дальше обработчики ждут записи пачки
+DB_WRITE_QUEUE_TIMEOUT = 5.0  # секунд ожидания записи пачки, потом изменение отклоняется
+WRITE_BEHIND_INTERVAL = 0.5  # секунд между групповыми записями изменений избранного
+WRITE_BEHIND_BATCH_SIZE = 50  # изменений, при которых пачка пишется не дожидаясь интервала
+WRITE_BEHIND_MAX_ATTEMPTS = 3  # неудачных записей одного изменения избранного, после которых оно отбрасывается
+FAVORITES_MIGRATION_BATCH = 500  # строк старой таблицы избранного за одну транзакцию переноса
+FAVORITES_MIGRATION_PAUSE = 0.05  # секунд между порциями, чтобы не занимать писателя
 
 # Bot settings
 MAX_RECIPES_PER_SEARCH = 5
 MAX_FAVORITES_PER_USER = 50
+FAVORITES_PAGE_SIZE = 1  # рецептов избранного на одну карточку навигации
+
+# HTTP client settings
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))  # соединений на один хост
+HTTP_KEEPALIVE_EXPIRY = 30.0  # секунд простоя до закрытия keep-alive соединения
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', '1') == '1'
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+
+# Search settings
+SEARCH_DEADLINE = float(os.getenv('SEARCH_DEADLINE', '6'))  # общий дедлайн опроса источников, секунд
+
+# Cache settings
+RECIPE_CACHE_TTL = 3600  # секунд
+RECIPE_CACHE_MAX_ENTRIES = 1000
+RECIPE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+SEARCH_CACHE_TTL = 1800  # секунд для непустой выдачи
+SEARCH_CACHE_NEGATIVE_TTL = 300  # секунд для запросов без результатов
+SEARCH_CACHE_MAX_ENTRIES = 500
+
+# Translation memory
+TRANSLATION_CACHE_DATABASE_NAME = "translations.db"
+TRANSLATION_CACHE_MAX_ENTRIES = 5000  # переводов в памяти, остальные читаются из SQLite
+TRANSLATION_BATCH_MAX_CHARS = 4500  # символов в одном запросе к Google Translate (лимит 5000)
+TRANSLATION_CHUNK_CHARS = 1000  # длинные тексты (инструкции) переводятся частями не длиннее
+TRANSLATION_CONCURRENCY = 4  # одновременных запросов к переводчику
+TRANSLATION_CALL_TIMEOUT = 10.0  # секунд на один вызов переводчика вместе с повторами
+
+# Translation backend: google, argos (локальная модель), offline (словарь) или stub (заглушка для бенчмарков)
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'google')
+TRANSLATION_STUB_LATENCY = float(os.getenv('TRANSLATION_STUB_LATENCY', '0.3'))  # секунд на запрос к заглушке
+
+# Ingredient glossary (собирается командой python glossary.py)
+GLOSSARY_FILE = "ingredient_glossary.json"
+
+# Search results prefetch
+PREFETCH_PAGES_AHEAD = 1  # сколько следующих страниц выдачи готовить заранее
+PREFETCH_MAX_PER_USER = 2  # одновременных фоновых подготовок страниц на пользователя
+IMAGE_CHECK_TIMEOUT = 3.0  # секунд на HEAD-проверку ссылки на фото
+IMAGE_CHECK_TTL = 6 * 3600  # секунд храним результат проверки фото
+
+# Local TheMealDB catalog
+CATALOG_ENABLED = os.getenv('CATALOG_ENABLED', '1') == '1'
+CATALOG_DATABASE_NAME = "themealdb_catalog.db"
+CATALOG_MAX_AGE = 7 * 24 * 3600  # старше — поиск уходит в удаленный API
+CATALOG_REFRESH_INTERVAL = 24 * 3600  # как часто обновлять каждую букву
+CATALOG_REFRESH_CHECK_INTERVAL = 600  # период фоновой проверки, секунд
+CATALOG_LETTERS_PER_REFRESH = 3  # букв за одну фоновую итерацию
+
+# Upstream resilience: таймауты и повторы для каждого внешнего сервиса
+UPSTREAM_SETTINGS = {
+    'themealdb': {'connect_timeout': 3.0, 'read_timeout': 5.0, 'max_retries': 2},
+    'spoonacular': {'connect_timeout': 3.0, 'read_timeout': 8.0, 'max_retries': 1},
+    'translate': {'connect_timeout': 3.0, 'read_timeout': 5.0, 'max_retries': 1},
+}
+RETRY_BACKOFF_BASE = 0.2  # секунд, удваивается с каждой попыткой
+RETRY_BACKOFF_MAX = 2.0
+BREAKER_FAILURE_THRESHOLD = 5  # ошибок подряд до открытия circuit breaker
+BREAKER_RECOVERY_TIMEOUT = 30.0  # секунд до пробного запроса
+
+# Spoonacular quota
+SPOONACULAR_DAILY_POINTS = float(os.getenv('SPOONACULAR_DAILY_POINTS', '150'))  # бесплатный тариф
+SPOONACULAR_POINTS_RESERVE = 2.0  # не тратим последние очки, чтобы не упереться в 402
+SPOONACULAR_RATE_LIMIT = 1.0  # запросов в секунду
+SPOONACULAR_RATE_BURST = 2
+SPOONACULAR_RATE_WAIT = 1.0  # сколько ждать токен, прежде чем пропустить Spoonacular
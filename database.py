@@ -1,109 +1,173 @@
-import sqlite3
-import json
 import logging
 
+from config import DATABASE_NAME, FAVORITES_MIGRATION_BATCH, FAVORITES_PAGE_SIZE
+from models import Recipe, dump_ingredients_json
+from sqlite_pool import SQLitePool
+
 logger = logging.getLogger(__name__)
 
+# Источник рецептов, перенесенных из старой таблицы favorite_recipes: там он не хранился
+LEGACY_SOURCE = ''
+
+# Колонки рецепта в порядке Recipe.from_row, затем rating, added_date, source
+_FAVORITE_COLUMNS = '''
+    r.recipe_id, r.name, r.image, r.instructions, r.ingredients, r.video, f.rating, f.added_date, r.source
+'''
+_LEGACY_COLUMNS = '''
+    recipe_id, recipe_name, recipe_image, recipe_instructions, recipe_ingredients, recipe_video,
+    rating, added_date, '' AS source
+'''
+# Ключ страницы избранного: (rating, added_date, recipe_key) в порядке показа;
+# у строк старой таблицы вместо recipe_key — отрицательный id, чтобы ключи не совпадали
+_PAGE_ORDER = 'rating {0}, added_date {0}, recipe_key {0}'
+
+
 class Database:
-    def __init__(self):
-        self.db_name = "recipes.db"  # Убедись, что DATABASE_NAME = "recipes.db"
+    """Избранное пользователей в нормализованной схеме.
+
+    recipes — одна копия рецепта на (source, recipe_id), общая для всех пользователей;
+    favorites — легкие связи (user_id, recipe_key, rating, added_date). Старая таблица
+    favorite_recipes переносится порциями (migrate_legacy_batch), пока бот работает:
+    до конца переноса чтения и изменения учитывают обе таблицы, а каждая строка в любой
+    момент лежит ровно в одной из них.
+    """
+
+    def __init__(self, db_name=DATABASE_NAME, pool=None):
+        self.db_name = db_name
+        # Долгоживущие соединения вместо sqlite3.connect на каждый вызов
+        self.pool = pool if pool is not None else SQLitePool(db_name)
+        self.legacy_pending = False
         self.init_database()
 
+    def close(self):
+        self.pool.close()
+
     def init_database(self):
         """Инициализация базы данных и создание таблиц"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
 
-                # Таблица для избранных рецептов
+                # Общее хранилище рецептов
                 cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS favorite_recipes (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER NOT NULL,
+                    CREATE TABLE IF NOT EXISTS recipes (
+                        recipe_key INTEGER PRIMARY KEY,
+                        source TEXT NOT NULL,
                         recipe_id TEXT NOT NULL,
-                        recipe_name TEXT NOT NULL,
-                        recipe_image TEXT,
-                        recipe_instructions TEXT,
-                        recipe_ingredients TEXT,
-                        recipe_video TEXT,
+                        name TEXT NOT NULL,
+                        image TEXT,
+                        instructions TEXT,
+                        ingredients TEXT,
+                        video TEXT,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE(source, recipe_id)
+                    )
+                ''')
+                # Кнопки бота передают только recipe_id
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipes_recipe_id ON recipes (recipe_id)')
+
+                # Избранное: связь пользователя с рецептом
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS favorites (
+                        user_id INTEGER NOT NULL,
+                        recipe_key INTEGER NOT NULL REFERENCES recipes (recipe_key),
                         rating INTEGER DEFAULT 0,
                         added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(user_id, recipe_id)
+                        PRIMARY KEY (user_id, recipe_key)
                     )
                 ''')
+                # Проверка, остались ли у рецепта ссылки, при удалении из избранного
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_recipe_key ON favorites (recipe_key)')
+                # Покрывающий индекс для страниц избранного в порядке показа и подсчета
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_favorites_user_order
+                    ON favorites (user_id, rating DESC, added_date DESC, recipe_key DESC)
+                ''')
 
-                conn.commit()
+                has_legacy = cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'favorite_recipes'"
+                ).fetchone() is not None
+                if has_legacy:
+                    # Пустую старую таблицу (перенос завершился до перезапуска) удаляем
+                    self.legacy_pending = cursor.execute('SELECT 1 FROM favorite_recipes LIMIT 1').fetchone() is not None
+                    if not self.legacy_pending:
+                        cursor.execute('DROP TABLE favorite_recipes')
                 logger.info("База данных инициализирована.")
         except Exception as e:
             logger.error(f"Ошибка при инициализации базы данных: {e}")
+        if self.legacy_pending:
+            logger.info("Найдена старая таблица favorite_recipes, избранное будет перенесено в фоне")
 
-    def add_favorite_recipe(self, user_id, recipe_data):
-        """Добавление рецепта в избранное"""
+    def add_favorite_recipe(self, user_id, recipe):
+        """Добавление рецепта (models.Recipe) в избранное"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-
-                # Преобразуем ингредиенты в JSON с поддержкой кириллицы
-                ingredients_json = json.dumps(recipe_data.get('ingredients', []), ensure_ascii=False)
-
-                cursor.execute('''
-                    INSERT OR REPLACE INTO favorite_recipes 
-                    (user_id, recipe_id, recipe_name, recipe_image, recipe_instructions, 
-                     recipe_ingredients, recipe_video, rating)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    user_id,
-                    recipe_data['id'],
-                    recipe_data['name'],
-                    recipe_data.get('image', ''),
-                    recipe_data.get('instructions', ''),
-                    ingredients_json,
-                    recipe_data.get('video', ''),
-                    0  # Новый рецепт — рейтинг 0
-                ))
-
-                conn.commit()
-                logger.info(f"Рецепт {recipe_data['id']} добавлен в избранное для пользователя {user_id}")
+            with self.pool.connection() as conn:
+                self._insert_favorite(conn.cursor(), user_id, recipe)
+                logger.info(f"Рецепт {recipe.id} добавлен в избранное для пользователя {user_id}")
                 return True
         except Exception as e:
             logger.error(f"Ошибка при добавлении рецепта в избранное: {e}")
             return False
 
+    def _insert_favorite(self, cursor, user_id, recipe, rating=0):
+        # Рецепт сохраняется один раз на источник; повторное добавление обновляет его текст
+        cursor.execute('''
+            INSERT INTO recipes (source, recipe_id, name, image, instructions, ingredients, video)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (source, recipe_id) DO UPDATE SET
+                name = excluded.name,
+                image = excluded.image,
+                instructions = excluded.instructions,
+                ingredients = excluded.ingredients,
+                video = excluded.video,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (
+            recipe.source or LEGACY_SOURCE,
+            recipe.id,
+            recipe.name,
+            recipe.image,
+            recipe.instructions,
+            dump_ingredients_json(recipe.ingredients),
+            recipe.video,
+        ))
+        recipe_key = cursor.execute(
+            'SELECT recipe_key FROM recipes WHERE source = ? AND recipe_id = ?',
+            (recipe.source or LEGACY_SOURCE, recipe.id)
+        ).fetchone()[0]
+
+        # Новый рецепт — рейтинг 0 (или оценка, поставленная до записи в базу)
+        cursor.execute('''
+            INSERT OR REPLACE INTO favorites (user_id, recipe_key, rating)
+            VALUES (?, ?, ?)
+        ''', (user_id, recipe_key, rating))
+        if self.legacy_pending:
+            cursor.execute(
+                'DELETE FROM favorite_recipes WHERE user_id = ? AND recipe_id = ?', (user_id, recipe.id)
+            )
+
     def get_favorite_recipes(self, user_id):
         """Получение избранных рецептов пользователя, отсортированных по рейтингу"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute('''
-                    SELECT recipe_id, recipe_name, recipe_image, recipe_instructions, 
-                           recipe_ingredients, recipe_video, rating, added_date
-                    FROM favorite_recipes 
-                    WHERE user_id = ?
-                    ORDER BY rating DESC, added_date DESC
-                ''', (user_id,))
+                query = f'''
+                    SELECT {_FAVORITE_COLUMNS}, f.recipe_key AS recipe_key
+                    FROM favorites f JOIN recipes r ON r.recipe_key = f.recipe_key
+                    WHERE f.user_id = ?
+                '''
+                params = (user_id,)
+                if self.legacy_pending:
+                    query += f' UNION ALL SELECT {_LEGACY_COLUMNS}, -id FROM favorite_recipes WHERE user_id = ?'
+                    params = (user_id, user_id)
+                # Тот же порядок, что и у страниц get_favorites_page
+                cursor.execute(query + f' ORDER BY {_PAGE_ORDER.format("DESC")}', params)
 
                 recipes = []
                 for row in cursor.fetchall():
                     try:
-                        # Парсим ингредиенты с защитой от ошибок
-                        try:
-                            ingredients = json.loads(row[4]) if row[4] else []
-                        except (json.JSONDecodeError, TypeError):
-                            logger.warning(f"Некорректный JSON в ingredients для рецепта {row[0]}")
-                            ingredients = []
-
-                        recipe = {
-                            'id': row[0],
-                            'name': row[1],
-                            'image': row[2],
-                            'instructions': row[3],
-                            'ingredients': ingredients,
-                            'video': row[5],
-                            'rating': row[6],
-                            'added_date': row[7]
-                        }
-                        recipes.append(recipe)
+                        # Битый JSON ингредиентов дает пустой список
+                        recipes.append(Recipe.from_row(row, source=row[8], rating=row[6], added_date=row[7]))
                     except Exception as e:
                         logger.error(f"Ошибка при обработке строки рецепта {row[0]}: {e}")
                         continue  # Пропускаем битые записи
@@ -114,20 +178,104 @@ class Database:
             logger.error(f"Ошибка при получении избранных рецептов: {e}")
             return []
 
-    def update_recipe_rating(self, user_id, recipe_id, rating):
-        """Обновление рейтинга рецепта"""
+    def get_favorite_recipe(self, user_id, recipe_id):
+        """Рецепт из избранного пользователя (с источником и рейтингом) или None"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
 
-                cursor.execute('''
-                    UPDATE favorite_recipes 
-                    SET rating = ?
-                    WHERE user_id = ? AND recipe_id = ?
-                ''', (rating, user_id, recipe_id))
+                row = cursor.execute(f'''
+                    SELECT {_FAVORITE_COLUMNS}
+                    FROM favorites f JOIN recipes r ON r.recipe_key = f.recipe_key
+                    WHERE f.user_id = ? AND r.recipe_id = ?
+                    ORDER BY f.added_date DESC
+                    LIMIT 1
+                ''', (user_id, recipe_id)).fetchone()
+                if row is None and self.legacy_pending:
+                    row = cursor.execute(f'''
+                        SELECT {_LEGACY_COLUMNS} FROM favorite_recipes WHERE user_id = ? AND recipe_id = ? LIMIT 1
+                    ''', (user_id, recipe_id)).fetchone()
+                if row is None:
+                    return None
+                return Recipe.from_row(row, source=row[8], rating=row[6], added_date=row[7])
+        except Exception as e:
+            logger.error(f"Ошибка при получении рецепта {recipe_id} из избранного: {e}")
+            return None
+
+    def get_favorites_page(self, user_id, after=None, before=None, limit=FAVORITES_PAGE_SIZE):
+        """Страница избранного по ключу (keyset) вместо загрузки всего списка.
+
+        after — ключ последнего показанного рецепта: страница начинается сразу за ним;
+        before — ключ первого показанного: страница заканчивается перед ним; без них —
+        первая страница. Возвращает (recipes, keys, total): рецепты страницы в порядке
+        показа, их ключи для следующего запроса и общее число избранных рецептов.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                # Строки страницы и общее число читаются из одного снимка базы (WAL):
+                # запись или перенос между запросами не рассогласует их
+                cursor.execute('BEGIN')
+
+                if self.legacy_pending:
+                    # Во время переноса страница строится по объединению обеих таблиц без индекса
+                    source = f'''
+                        SELECT * FROM (
+                            SELECT {_FAVORITE_COLUMNS}, f.recipe_key AS recipe_key
+                            FROM favorites f JOIN recipes r ON r.recipe_key = f.recipe_key
+                            WHERE f.user_id = ?
+                            UNION ALL
+                            SELECT {_LEGACY_COLUMNS}, -id AS recipe_key FROM favorite_recipes WHERE user_id = ?
+                        ) WHERE 1
+                    '''
+                    params = [user_id, user_id]
+                    key_columns = '(rating, added_date, recipe_key)'
+                    order = _PAGE_ORDER
+                else:
+                    source = f'''
+                        SELECT {_FAVORITE_COLUMNS}, f.recipe_key
+                        FROM favorites f JOIN recipes r ON r.recipe_key = f.recipe_key
+                        WHERE f.user_id = ?
+                    '''
+                    params = [user_id]
+                    key_columns = '(f.rating, f.added_date, f.recipe_key)'
+                    order = 'f.' + _PAGE_ORDER.replace(', ', ', f.')
+
+                if before is not None:
+                    # Предыдущая страница: идем от ключа в обратном порядке и разворачиваем
+                    query = f'{source} AND {key_columns} > (?, ?, ?) ORDER BY {order.format("ASC")} LIMIT ?'
+                    rows = cursor.execute(query, (*params, *before, limit)).fetchall()[::-1]
+                elif after is not None:
+                    query = f'{source} AND {key_columns} < (?, ?, ?) ORDER BY {order.format("DESC")} LIMIT ?'
+                    rows = cursor.execute(query, (*params, *after, limit)).fetchall()
+                else:
+                    query = f'{source} ORDER BY {order.format("DESC")} LIMIT ?'
+                    rows = cursor.execute(query, (*params, limit)).fetchall()
+
+                total = cursor.execute('SELECT COUNT(*) FROM favorites WHERE user_id = ?', (user_id,)).fetchone()[0]
+                if self.legacy_pending:
+                    total += cursor.execute(
+                        'SELECT COUNT(*) FROM favorite_recipes WHERE user_id = ?', (user_id,)
+                    ).fetchone()[0]
 
-                conn.commit()
-                if cursor.rowcount > 0:
+                recipes, keys = [], []
+                for row in rows:
+                    try:
+                        recipes.append(Recipe.from_row(row, source=row[8], rating=row[6], added_date=row[7]))
+                        keys.append((row[6], row[7], row[9]))
+                    except Exception as e:
+                        logger.error(f"Ошибка при обработке строки рецепта {row[0]}: {e}")
+                        continue  # Пропускаем битые записи
+                return recipes, keys, total
+        except Exception as e:
+            logger.error(f"Ошибка при получении страницы избранного: {e}")
+            return [], [], 0
+
+    def update_recipe_rating(self, user_id, recipe_id, rating):
+        """Обновление рейтинга рецепта"""
+        try:
+            with self.pool.connection() as conn:
+                if self._update_rating(conn.cursor(), user_id, recipe_id, rating) > 0:
                     logger.info(f"Рецепт {recipe_id} оценён на {rating} звёзд пользователем {user_id}")
                     return True
                 else:
@@ -137,19 +285,25 @@ class Database:
             logger.error(f"Ошибка при обновлении рейтинга: {e}")
             return False
 
+    def _update_rating(self, cursor, user_id, recipe_id, rating):
+        cursor.execute('''
+            UPDATE favorites
+            SET rating = ?
+            WHERE user_id = ? AND recipe_key IN (SELECT recipe_key FROM recipes WHERE recipe_id = ?)
+        ''', (rating, user_id, recipe_id))
+        updated = cursor.rowcount
+        if self.legacy_pending:
+            cursor.execute('''
+                UPDATE favorite_recipes SET rating = ? WHERE user_id = ? AND recipe_id = ?
+            ''', (rating, user_id, recipe_id))
+            updated += cursor.rowcount
+        return updated
+
     def remove_favorite_recipe(self, user_id, recipe_id):
         """Удаление рецепта из избранного"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute('''
-                    DELETE FROM favorite_recipes 
-                    WHERE user_id = ? AND recipe_id = ?
-                ''', (user_id, recipe_id))
-
-                conn.commit()
-                if cursor.rowcount > 0:
+            with self.pool.connection() as conn:
+                if self._delete_favorite(conn.cursor(), user_id, recipe_id) > 0:
                     logger.info(f"Рецепт {recipe_id} удалён из избранного для пользователя {user_id}")
                     return True
                 else:
@@ -159,19 +313,127 @@ class Database:
             logger.error(f"Ошибка при удалении рецепта: {e}")
             return False
 
+    def _delete_favorite(self, cursor, user_id, recipe_id):
+        recipe_keys = [row[0] for row in cursor.execute(
+            'SELECT recipe_key FROM recipes WHERE recipe_id = ?', (recipe_id,)
+        ).fetchall()]
+        removed = 0
+        for recipe_key in recipe_keys:
+            cursor.execute(
+                'DELETE FROM favorites WHERE user_id = ? AND recipe_key = ?', (user_id, recipe_key)
+            )
+            removed += cursor.rowcount
+            # Рецепт, который больше никто не хранит, удаляется из общего хранилища
+            cursor.execute('''
+                DELETE FROM recipes
+                WHERE recipe_key = ? AND NOT EXISTS (SELECT 1 FROM favorites WHERE recipe_key = ?)
+            ''', (recipe_key, recipe_key))
+        if self.legacy_pending:
+            cursor.execute(
+                'DELETE FROM favorite_recipes WHERE user_id = ? AND recipe_id = ?', (user_id, recipe_id)
+            )
+            removed += cursor.rowcount
+        return removed
+
+    def apply_changes(self, changes):
+        """Групповая запись изменений избранного одной транзакцией (write-behind).
+
+        changes — список (user_id, recipe_id, op, recipe, rating), op: 'add', 'rate' или 'remove'.
+        При ошибке откатывается вся пачка и возвращается False.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                for user_id, recipe_id, op, recipe, rating in changes:
+                    if op == 'add':
+                        self._insert_favorite(cursor, user_id, recipe, rating)
+                    elif op == 'rate':
+                        self._update_rating(cursor, user_id, recipe_id, rating)
+                    else:
+                        self._delete_favorite(cursor, user_id, recipe_id)
+                logger.info(f"Записано изменений избранного одной транзакцией: {len(changes)}")
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при групповой записи избранного: {e}")
+            return False
+
     def is_recipe_favorite(self, user_id, recipe_id):
         """Проверка, находится ли рецепт в избранном"""
         try:
-            with sqlite3.connect(self.db_name) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute('''
-                    SELECT 1 FROM favorite_recipes 
-                    WHERE user_id = ? AND recipe_id = ?
+                    SELECT 1 FROM recipes r JOIN favorites f ON f.recipe_key = r.recipe_key
+                    WHERE r.recipe_id = ? AND f.user_id = ?
                     LIMIT 1
-                ''', (user_id, recipe_id))
-
-                return cursor.fetchone() is not None
+                ''', (recipe_id, user_id))
+                if cursor.fetchone() is not None:
+                    return True
+                if self.legacy_pending:
+                    cursor.execute('''
+                        SELECT 1 FROM favorite_recipes WHERE user_id = ? AND recipe_id = ? LIMIT 1
+                    ''', (user_id, recipe_id))
+                    return cursor.fetchone() is not None
+                return False
         except Exception as e:
             logger.error(f"Ошибка при проверке избранного: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def migrate_legacy_batch(self, batch_size=FAVORITES_MIGRATION_BATCH):
+        """Перенос порции строк favorite_recipes в recipes/favorites одной транзакцией.
+
+        Возвращает число перенесенных строк. Опустевшая старая таблица удаляется при следующем
+        запуске: параллельные чтения могут еще обращаться к ней.
+        Рецепт из старой таблицы привязывается к уже сохраненному рецепту с тем же recipe_id,
+        иначе сохраняется с источником LEGACY_SOURCE.
+        """
+        if not self.legacy_pending:
+            return 0
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                rows = cursor.execute('''
+                    SELECT id, user_id, recipe_id, recipe_name, recipe_image, recipe_instructions,
+                           recipe_ingredients, recipe_video, rating, added_date
+                    FROM favorite_recipes ORDER BY id LIMIT ?
+                ''', (batch_size,)).fetchall()
+                if not rows:
+                    self.legacy_pending = False
+                    logger.info("Перенос избранного в новую схему завершен")
+                    return 0
+
+                for _, user_id, recipe_id, name, image, instructions, ingredients, video, rating, added_date in rows:
+                    existing = cursor.execute(
+                        'SELECT recipe_key FROM recipes WHERE recipe_id = ? ORDER BY source = ? LIMIT 1',
+                        (recipe_id, LEGACY_SOURCE)
+                    ).fetchone()
+                    if existing is not None:
+                        recipe_key = existing[0]
+                    else:
+                        cursor.execute('''
+                            INSERT INTO recipes (source, recipe_id, name, image, instructions, ingredients, video)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ''', (LEGACY_SOURCE, recipe_id, name, image, instructions, ingredients, video))
+                        recipe_key = cursor.lastrowid
+                    # Если пользователь уже добавил рецепт заново, новая запись важнее
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO favorites (user_id, recipe_key, rating, added_date)
+                        VALUES (?, ?, ?, ?)
+                    ''', (user_id, recipe_key, rating, added_date))
+                cursor.execute('DELETE FROM favorite_recipes WHERE id <= ?', (rows[-1][0],))
+                logger.info(f"Перенесено {len(rows)} строк избранного в новую схему")
+                return len(rows)
+        except Exception as e:
+            logger.error(f"Ошибка при переносе избранного: {e}")
+            return 0
+
+    def migrate_legacy_favorites(self, batch_size=FAVORITES_MIGRATION_BATCH):
+        """Перенос всей старой таблицы порциями; возвращает число перенесенных строк"""
+        total = 0
+        while self.legacy_pending:
+            moved = self.migrate_legacy_batch(batch_size)
+            if moved == 0 and self.legacy_pending:
+                break  # ошибка переноса уже записана в лог
+            total += moved
+        return total
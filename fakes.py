@@ -0,0 +1,11 @@
+"""
+Общие тестовые заглушки
+"""
+
+from translation_backends import TranslationBackend
+
+class EchoBackend(TranslationBackend):
+    """Переводчик без сети: возвращает текст как есть"""
+
+    def translate(self, text, source, target):
+        return text
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from config import GLOSSARY_FILE
+
+logger = logging.getLogger(__name__)
+
+# Версия формата файла словаря; файл другой версии игнорируется
+GLOSSARY_FORMAT_VERSION = 1
+
+# Базовый словарь: самые частые ингредиенты TheMealDB. Работает и без собранного файла,
+# собранный словарь (python glossary.py) дополняет и уточняет его.
+BASE_INGREDIENTS = {
+    'almonds': 'миндаль', 'apple': 'яблоко', 'aubergine': 'баклажан', 'avocado': 'авокадо',
+    'bacon': 'бекон', 'baking powder': 'разрыхлитель', 'banana': 'банан', 'basil': 'базилик',
+    'bay leaf': 'лавровый лист', 'bay leaves': 'лавровый лист', 'beef': 'говядина',
+    'beef stock': 'говяжий бульон', 'beetroot': 'свекла', 'black pepper': 'черный перец',
+    'bread': 'хлеб', 'breadcrumbs': 'панировочные сухари', 'broccoli': 'брокколи',
+    'brown sugar': 'коричневый сахар', 'butter': 'сливочное масло', 'cabbage': 'капуста',
+    'cardamom': 'кардамон', 'carrot': 'морковь', 'carrots': 'морковь', 'caster sugar': 'сахар',
+    'cayenne pepper': 'кайенский перец', 'celery': 'сельдерей', 'cheddar cheese': 'сыр чеддер',
+    'cheese': 'сыр', 'chicken': 'курица', 'chicken breast': 'куриная грудка',
+    'chicken breasts': 'куриная грудка', 'chicken stock': 'куриный бульон',
+    'chicken thighs': 'куриные бедра', 'chickpeas': 'нут', 'chilli': 'перец чили',
+    'chilli powder': 'молотый перец чили', 'chopped tomatoes': 'томаты в собственном соку',
+    'cinnamon': 'корица', 'cloves': 'гвоздика', 'cocoa': 'какао', 'coconut milk': 'кокосовое молоко',
+    'coriander': 'кинза', 'cream': 'сливки', 'cucumber': 'огурец', 'cumin': 'зира',
+    'dark chocolate': 'темный шоколад', 'dill': 'укроп', 'double cream': 'жирные сливки',
+    'egg': 'яйцо', 'egg white': 'яичный белок', 'egg yolks': 'яичные желтки', 'eggs': 'яйца',
+    'fish sauce': 'рыбный соус', 'flour': 'мука', 'garam masala': 'гарам масала', 'garlic': 'чеснок',
+    'garlic clove': 'зубчик чеснока', 'ginger': 'имбирь', 'green chilli': 'зеленый перец чили',
+    'green pepper': 'зеленый перец', 'honey': 'мед', 'icing sugar': 'сахарная пудра',
+    'lamb': 'баранина', 'leek': 'лук-порей', 'lemon': 'лимон', 'lemon juice': 'лимонный сок',
+    'lentils': 'чечевица', 'lettuce': 'салат латук', 'lime': 'лайм', 'mayonnaise': 'майонез',
+    'milk': 'молоко', 'minced beef': 'говяжий фарш', 'mint': 'мята', 'mozzarella': 'моцарелла',
+    'mushrooms': 'грибы', 'mustard': 'горчица', 'noodles': 'лапша', 'nutmeg': 'мускатный орех',
+    'oats': 'овсяные хлопья', 'olive oil': 'оливковое масло', 'onion': 'лук', 'onions': 'лук',
+    'orange': 'апельсин', 'oregano': 'орегано', 'paprika': 'паприка', 'parmesan': 'пармезан',
+    'parsley': 'петрушка', 'pasta': 'паста', 'peanuts': 'арахис', 'peas': 'горошек',
+    'pepper': 'перец', 'plain flour': 'мука', 'pork': 'свинина', 'potatoes': 'картофель',
+    'prawns': 'креветки', 'pumpkin': 'тыква', 'raisins': 'изюм', 'red onions': 'красный лук',
+    'red pepper': 'красный перец', 'red wine': 'красное вино', 'rice': 'рис', 'rosemary': 'розмарин',
+    'salmon': 'лосось', 'salt': 'соль', 'sausages': 'колбаски', 'sea salt': 'морская соль',
+    'sesame oil': 'кунжутное масло', 'sesame seed': 'кунжут', 'sour cream': 'сметана',
+    'soy sauce': 'соевый соус', 'spaghetti': 'спагетти', 'spinach': 'шпинат',
+    'spring onions': 'зеленый лук', 'strawberries': 'клубника', 'sugar': 'сахар',
+    'sweetcorn': 'кукуруза', 'thyme': 'тимьян', 'tomato': 'помидор', 'tomato puree': 'томатная паста',
+    'tomatoes': 'помидоры', 'tuna': 'тунец', 'turmeric': 'куркума', 'unsalted butter': 'несоленое сливочное масло',
+    'vanilla extract': 'ванильный экстракт', 'vegetable oil': 'растительное масло',
+    'vegetable stock': 'овощной бульон', 'vinegar': 'уксус', 'walnuts': 'грецкие орехи',
+    'water': 'вода', 'white wine': 'белое вино', 'worcestershire sauce': 'вустерширский соус',
+    'yogurt': 'йогурт', 'zucchini': 'цукини',
+}
+
+# Частые слова русских запросов → поисковые термины TheMealDB/Spoonacular
+QUERY_TERMS = {
+    'курица': 'chicken', 'курицы': 'chicken', 'куриный': 'chicken', 'куриные': 'chicken',
+    'говядина': 'beef', 'говядины': 'beef', 'свинина': 'pork', 'свинины': 'pork',
+    'баранина': 'lamb', 'рыба': 'fish', 'рыбы': 'fish', 'лосось': 'salmon', 'тунец': 'tuna',
+    'креветки': 'prawns', 'паста': 'pasta', 'макароны': 'pasta', 'спагетти': 'spaghetti',
+    'лапша': 'noodles', 'пицца': 'pizza', 'суп': 'soup', 'салат': 'salad', 'торт': 'cake',
+    'пирог': 'pie', 'пирожное': 'cake', 'хлеб': 'bread', 'рис': 'rice', 'плов': 'pilaf',
+    'картофель': 'potato', 'картошка': 'potato', 'яйца': 'egg', 'яйцо': 'egg', 'омлет': 'omelette',
+    'сыр': 'cheese', 'грибы': 'mushroom', 'грибной': 'mushroom', 'овощи': 'vegetable',
+    'овощной': 'vegetable', 'десерт': 'dessert', 'завтрак': 'breakfast', 'карри': 'curry',
+    'бургер': 'burger', 'стейк': 'steak', 'блины': 'pancakes', 'печенье': 'cookies',
+    'шоколад': 'chocolate', 'шоколадный': 'chocolate', 'тыква': 'pumpkin', 'фасоль': 'beans',
+    'чечевица': 'lentil', 'тако': 'tacos', 'лазанья': 'lasagne', 'ризотто': 'risotto',
+    'рагу': 'stew', 'жаркое': 'roast', 'гуляш': 'goulash', 'борщ': 'borscht',
+}
+
+
+def normalize_term(text: str) -> str:
+    """Ключ словаря: нижний регистр, ё→е, одиночные пробелы, без краевой пунктуации"""
+    return ' '.join(text.lower().replace('ё', 'е').split()).strip('.,!?;:"\'()')
+
+
+class Glossary:
+    """Словарь en↔ru для ингредиентов и частых слов запросов.
+
+    Перевод по словарю не ходит в сеть, поэтому ингредиенты и типичные русские
+    запросы обходят онлайн-переводчик. Счетчики попаданий — в stats().
+    """
+
+    def __init__(self, en_ru: Dict[str, str], ru_en: Dict[str, str], revision: int = 0) -> None:
+        self.en_ru = {normalize_term(k): v for k, v in en_ru.items()}
+        self.ru_en = {normalize_term(k): v for k, v in ru_en.items()}
+        self.revision = revision
+        self._max_phrase = max((len(key.split()) for key in self.ru_en), default=1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str = GLOSSARY_FILE) -> 'Glossary':
+        """Базовый словарь, дополненный собранным файлом, если он есть и подходящей версии"""
+        en_ru = dict(BASE_INGREDIENTS)
+        revision = 0
+        if os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != GLOSSARY_FORMAT_VERSION:
+                    logger.warning(f"Словарь {path}: версия формата {data.get('version')} не поддерживается")
+                else:
+                    en_ru.update(data.get('en_ru', {}))
+                    revision = data.get('revision', 0)
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке словаря {path}: {e}")
+
+        # Обратный словарь: русские названия ингредиентов и слова запросов → английский;
+        # из синонимов ("sugar", "caster sugar") остается самый короткий английский термин
+        ru_en = {}
+        for en, ru in sorted(en_ru.items(), key=lambda item: -len(item[0])):
+            ru_en[ru] = en
+        ru_en.update(QUERY_TERMS)
+        glossary = cls(en_ru, ru_en, revision)
+        logger.info(f"Словарь ингредиентов: {len(glossary.en_ru)} en→ru, {len(glossary.ru_en)} ru→en, ревизия {revision}")
+        return glossary
+
+    def to_russian(self, name: str) -> Optional[str]:
+        """Русское название ингредиента или None, если его нет в словаре"""
+        translated = self.en_ru.get(normalize_term(name))
+        self._count(translated is not None)
+        if translated is not None and name[:1].isupper():
+            translated = translated[:1].upper() + translated[1:]
+        return translated
+
+    def translate_query(self, query: str) -> Optional[str]:
+        """Английский поисковый запрос, если все слова запроса есть в словаре, иначе None.
+
+        Слова сопоставляются жадно, начиная с самых длинных фраз ("оливковое масло").
+        """
+        words = normalize_term(query).split()
+        if not words:
+            return None
+        result = []
+        i = 0
+        while i < len(words):
+            for length in range(min(self._max_phrase, len(words) - i), 0, -1):
+                term = self.ru_en.get(' '.join(words[i:i + length]))
+                if term is not None:
+                    result.append(term)
+                    i += length
+                    break
+            else:
+                self._count(False)
+                return None
+        self._count(True)
+        return ' '.join(result)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'revision': self.revision,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+async def build_glossary(path: str = GLOSSARY_FILE) -> int:
+    """Сборка словаря по полному списку ингредиентов TheMealDB (list.php?i=list).
+
+    Новые названия переводятся пакетами через TranslatorService; ревизия файла
+    увеличивается на единицу. Возвращает число ингредиентов в словаре.
+    """
+    import asyncio
+    from api_client import RecipeAPI
+
+    api = RecipeAPI()
+    try:
+        names = await api.list_ingredient_names()
+
+        previous = {}
+        revision = 0
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                old = json.load(f)
+            if old.get('version') == GLOSSARY_FORMAT_VERSION:
+                previous = old.get('en_ru', {})
+                revision = old.get('revision', 0)
+
+        en_ru = {}
+        unknown = []
+        for name in names:
+            key = normalize_term(name)
+            known = previous.get(key) or BASE_INGREDIENTS.get(key)
+            if known:
+                en_ru[key] = known
+            else:
+                unknown.append(name)
+
+        translated = await asyncio.to_thread(api.translator.english_to_russian_batch, unknown)
+        for name, russian in zip(unknown, translated):
+            # Непереведенное (совпало с исходником) в словарь не попадает
+            if normalize_term(russian) != normalize_term(name):
+                en_ru[normalize_term(name)] = normalize_term(russian)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': GLOSSARY_FORMAT_VERSION,
+                'revision': revision + 1,
+                'built_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'source': 'themealdb list.php?i=list',
+                'en_ru': dict(sorted(en_ru.items())),
+            }, f, ensure_ascii=False, indent=1)
+        return len(en_ru)
+    finally:
+        await api.aclose()
+
+
+if __name__ == "__main__":
+    # Сборка словаря ингредиентов: python glossary.py
+    import asyncio
+
+    count = asyncio.run(build_glossary())
+    print(f"✅ Словарь ингредиентов собран: {count} названий → {GLOSSARY_FILE}")
@@ -0,0 +1,93 @@
+import importlib.util
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import (
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_POOL_SIZE,
+    HTTP_READ_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClientPool:
+    """Долгоживущие httpx-клиенты: отдельный пул keep-alive соединений на каждый хост.
+
+    Соединения с themealdb.com и api.spoonacular.com переиспользуются между
+    запросами, поэтому TCP+TLS рукопожатие выполняется один раз на соединение,
+    а не на каждый поиск.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, http2: bool = HTTP2_ENABLED,
+                 connect_timeout: float = HTTP_CONNECT_TIMEOUT, read_timeout: float = HTTP_READ_TIMEOUT,
+                 keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY) -> None:
+        if http2 and importlib.util.find_spec('h2') is None:
+            logger.warning("⚠️ Пакет h2 не установлен, HTTP/2 отключен")
+            http2 = False
+
+        self.http2 = http2
+        self._limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._clients = {}  # {host: httpx.AsyncClient}
+        self._stats = {}  # {host: {'requests': 0, 'new_connections': 0}}
+
+    def _client_for(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(http2=self.http2, limits=self._limits, timeout=self._timeout)
+            self._clients[host] = client
+            self._stats.setdefault(host, {'requests': 0, 'new_connections': 0})
+        return client
+
+    async def get(self, url: str, params=None, headers=None, timeout=None) -> httpx.Response:
+        """GET-запрос через пул соединений хоста"""
+        return await self._request('GET', url, params, headers, timeout)
+
+    async def head(self, url: str, headers=None, timeout=None) -> httpx.Response:
+        """HEAD-запрос через пул соединений хоста (проверка ссылок без загрузки тела)"""
+        return await self._request('HEAD', url, None, headers, timeout, follow_redirects=True)
+
+    async def _request(self, method: str, url: str, params, headers, timeout, **extra) -> httpx.Response:
+        host = urlsplit(url).netloc
+        client = self._client_for(host)
+        stats = self._stats[host]
+        stats['requests'] += 1
+
+        async def trace(event_name, info):
+            # Новое TCP-соединение открывается только при промахе мимо пула
+            if event_name == 'connection.connect_tcp.complete':
+                stats['new_connections'] += 1
+
+        kwargs = {'params': params, 'headers': headers, 'extensions': {'trace': trace}, **extra}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        return await client.request(method, url, **kwargs)
+
+    def get_stats(self) -> dict:
+        """Статистика переиспользования соединений по хостам"""
+        result = {}
+        for host, stats in self._stats.items():
+            requests = stats['requests']
+            reused = max(requests - stats['new_connections'], 0)
+            result[host] = {
+                'requests': requests,
+                'new_connections': stats['new_connections'],
+                'reused_connections': reused,
+                'reuse_ratio': reused / requests if requests else 0.0,
+            }
+        return result
+
+    async def aclose(self) -> None:
+        """Закрытие всех клиентов и их соединений"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -59,17 +59,20 @@ class Keyboards:
         return InlineKeyboardMarkup(keyboard)
     
     @staticmethod
-    def get_search_results_navigation(current_page, total_pages, recipe_id):
+    def get_search_results_navigation(current_page, total_pages, recipe_id, loading=False):
+        """Навигация по результатам поиска; loading — результаты еще догружаются"""
         keyboard = []
         nav_row = []
         
         if current_page > 0:
             nav_row.append(InlineKeyboardButton("⬅️", callback_data=f"prev_page:{current_page}"))
         
-        nav_row.append(InlineKeyboardButton(f"{current_page + 1}/{total_pages}", callback_data="page_info"))
+        # Пока поиск идет, общее число страниц еще растет
+        page_label = f"{current_page + 1}/{total_pages}{'…' if loading else ''}"
+        nav_row.append(InlineKeyboardButton(page_label, callback_data="page_info"))
         
         if current_page < total_pages - 1:
-            nav_row.append(InlineKeyboardButton("➡️", callback_data=f"next_page:{current_page + 1}"))
+            nav_row.append(InlineKeyboardButton("➡️", callback_data=f"next_page:{current_page}"))
         
         keyboard.append(nav_row)
         
@@ -91,7 +94,7 @@ class Keyboards:
         nav_row.append(InlineKeyboardButton(f"{current_page + 1}/{total_pages}", callback_data="fav_page_info"))
         
         if current_page < total_pages - 1:
-            nav_row.append(InlineKeyboardButton("➡️", callback_data=f"next_fav_page:{current_page + 1}"))
+            nav_row.append(InlineKeyboardButton("➡️", callback_data=f"next_fav_page:{current_page}"))
         
         keyboard.append(nav_row)
         
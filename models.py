@@ -0,0 +1,171 @@
+import json
+import logging
+from typing import Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Frozen:
+    """Неизменяемый объект на __slots__: без __dict__, изменения — только через replace()"""
+
+    __slots__ = ()
+
+    def __init__(self, **values: Any) -> None:
+        for field in self.__slots__:
+            object.__setattr__(self, field, values[field])
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} неизменяем, используйте replace()")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} неизменяем")
+
+    def replace(self, **changes: Any):
+        """Копия с измененными полями; остальные поля разделяются с исходным объектом"""
+        values = {field: getattr(self, field) for field in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self) -> int:
+        return hash(self._values())
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Ingredient(_Frozen):
+    """Ингредиент рецепта; amount — число (Spoonacular) или строка с мерой (TheMealDB)"""
+
+    __slots__ = ('name', 'amount', 'unit')
+
+    def __init__(self, name: str, amount: Any = '', unit: str = '') -> None:
+        super().__init__(name=name, amount=amount, unit=unit)
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'amount': self.amount, 'unit': self.unit}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Ingredient':
+        return cls(data.get('name', ''), data.get('amount', ''), data.get('unit', ''))
+
+
+class Recipe(_Frozen):
+    """Рецепт в общем для всех источников формате.
+
+    ingredients=None означает краткую карточку из выдачи поиска: без инструкций
+    и ингредиентов, полный рецепт загружается отдельно (RecipeAPI.hydrate_recipe).
+    rating и added_date заполнены только у рецептов из избранного.
+    """
+
+    __slots__ = ('id', 'name', 'image', 'instructions', 'ingredients', 'video', 'source', 'rating', 'added_date')
+
+    def __init__(self, id: str, name: str, image: str = '', instructions: str = '',
+                 ingredients: Optional[Iterable[Ingredient]] = (), video: str = '',
+                 source: str = 'TheMealDB', rating: int = 0, added_date: Optional[str] = None) -> None:
+        super().__init__(
+            id=str(id),
+            name=name,
+            image=image or '',
+            instructions=instructions or '',
+            ingredients=None if ingredients is None else tuple(ingredients),
+            video=video or '',
+            source=source,
+            rating=rating or 0,
+            added_date=added_date,
+        )
+
+    @property
+    def is_summary(self) -> bool:
+        return self.ingredients is None
+
+    def summary(self) -> 'Recipe':
+        """Краткая карточка для выдачи поиска"""
+        return Recipe(self.id, self.name, self.image, ingredients=None, source=self.source)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'image': self.image,
+            'instructions': self.instructions,
+            'ingredients': [ingredient.to_dict() for ingredient in self.ingredients or ()],
+            'video': self.video,
+            'source': self.source,
+        }
+
+    @classmethod
+    def from_themealdb(cls, meal: dict) -> 'Recipe':
+        """Разбор блюда из ответа TheMealDB (search.php, lookup.php, random.php)"""
+        ingredients = []
+        for i in range(1, 21):  # TheMealDB может иметь до 20 ингредиентов
+            name = meal.get(f'strIngredient{i}')
+            measure = meal.get(f'strMeasure{i}')
+            if name and name.strip():
+                ingredients.append(Ingredient(name.strip(), measure.strip() if measure else ''))
+
+        return cls(
+            id=meal['idMeal'],
+            name=meal['strMeal'],
+            image=meal.get('strMealThumb'),
+            instructions=meal.get('strInstructions'),
+            ingredients=ingredients,
+            video=meal.get('strYoutube'),
+            source='TheMealDB',
+        )
+
+    @classmethod
+    def from_spoonacular(cls, data: dict) -> 'Recipe':
+        """Разбор рецепта Spoonacular (complexSearch с addRecipeInformation или /information)"""
+        ingredients = [
+            Ingredient(ingredient.get('name', ''), ingredient.get('amount', ''), ingredient.get('unit', ''))
+            for ingredient in data.get('extendedIngredients') or []
+        ]
+        return cls(
+            id=data['id'],
+            name=data['title'],
+            image=data.get('image'),
+            instructions=data.get('instructions'),
+            ingredients=ingredients,
+            video='',  # Spoonacular не предоставляет видео
+            source='Spoonacular',
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple, source: str = 'TheMealDB', rating: int = 0,
+                 added_date: Optional[str] = None) -> 'Recipe':
+        """Рецепт из строки SQLite: (id, name, image, instructions, ingredients_json, video)"""
+        return cls(
+            id=row[0],
+            name=row[1],
+            image=row[2],
+            instructions=row[3],
+            ingredients=parse_ingredients_json(row[4], row[0]),
+            video=row[5],
+            source=source,
+            rating=rating,
+            added_date=added_date,
+        )
+
+
+def parse_ingredients_json(raw: Optional[str], recipe_id: Any = None) -> Tuple[Ingredient, ...]:
+    """Ингредиенты из JSON-колонки SQLite; битый JSON дает пустой список"""
+    try:
+        items = json.loads(raw) if raw else []
+    except (json.JSONDecodeError, TypeError):
+        logger.warning(f"Некорректный JSON в ingredients для рецепта {recipe_id}")
+        return ()
+    return tuple(Ingredient.from_dict(item) for item in items)
+
+
+def dump_ingredients_json(ingredients: Optional[Iterable[Ingredient]]) -> str:
+    """JSON-колонка ingredients с поддержкой кириллицы"""
+    return json.dumps([ingredient.to_dict() for ingredient in ingredients or ()], ensure_ascii=False)
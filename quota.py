@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import (
+    MAX_RECIPES_PER_SEARCH,
+    SPOONACULAR_DAILY_POINTS,
+    SPOONACULAR_POINTS_RESERVE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedError(Exception):
+    """Запрос не отправлен: token bucket не выдал токен вовремя"""
+
+
+class TokenBucket:
+    """Token bucket: не больше rate запросов в секунду с допустимым всплеском capacity"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    async def acquire(self, timeout: float) -> bool:
+        """Ждать токен не дольше timeout секунд; False — лимит не позволил"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.try_acquire():
+                return True
+            with self._lock:
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class SpoonacularBudget:
+    """Учет дневных очков Spoonacular и выбор параметров поиска под остаток бюджета.
+
+    Пока ответов нет, расход оценивается по прайсу Spoonacular; заголовки
+    X-API-Quota-Used / X-API-Quota-Left из ответов заменяют оценку точными числами.
+    Бюджет сбрасывается в полночь UTC, как и квота Spoonacular.
+    """
+
+    # Прайс: complexSearch — 1 очко + 0.01 за рецепт, каждый флаг — еще 0.025 за рецепт
+    SEARCH_BASE_POINTS = 1.0
+    SEARCH_POINTS_PER_RESULT = 0.01
+    FLAG_POINTS_PER_RESULT = 0.025
+    INFORMATION_POINTS = 1.0
+
+    def __init__(self, daily_points: float = SPOONACULAR_DAILY_POINTS,
+                 reserve: float = SPOONACULAR_POINTS_RESERVE) -> None:
+        self.daily_points = daily_points
+        self.reserve = reserve
+        self._day = self._today()
+        self._used = 0.0
+        self._exhausted = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    def _roll_day(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0.0
+            self._exhausted = False
+
+    @property
+    def remaining(self) -> float:
+        with self._lock:
+            self._roll_day()
+            if self._exhausted:
+                return 0.0
+            return max(self.daily_points - self._used, 0.0)
+
+    def can_afford(self, points: float) -> bool:
+        """Хватит ли очков на запрос с учетом неприкосновенного резерва (до ответа 402)"""
+        return self.remaining - points >= self.reserve
+
+    def search_cost(self, number: int, add_information: bool, fill_ingredients: bool) -> float:
+        flags = int(add_information) + int(fill_ingredients)
+        return self.SEARCH_BASE_POINTS + number * (self.SEARCH_POINTS_PER_RESULT + flags * self.FLAG_POINTS_PER_RESULT)
+
+    def plan_search(self, wanted: int = MAX_RECIPES_PER_SEARCH) -> Optional[dict]:
+        """Параметры complexSearch под остаток бюджета или None, если Spoonacular лучше не трогать.
+
+        Запрашиваем не больше, чем реально покажем; по мере истощения бюджета
+        уменьшаем number и отключаем дорогие флаги.
+        """
+        share = self.remaining / self.daily_points if self.daily_points else 0.0
+        number, add_information, fill_ingredients = wanted, True, True
+        if share < 0.5:
+            number = max(1, wanted // 2)
+        if share < 0.2:
+            fill_ingredients = False
+        if share < 0.1:
+            # Без флагов complexSearch отдает только id, название и фото — краткие карточки
+            add_information = False
+
+        cost = self.search_cost(number, add_information, fill_ingredients)
+        if not self.can_afford(cost):
+            logger.warning(f"💸 Spoonacular: осталось {self.remaining:.2f} очков, поиск пропущен")
+            return None
+        return {
+            'number': number,
+            'addRecipeInformation': add_information,
+            'fillIngredients': fill_ingredients,
+            'cost': cost,
+        }
+
+    def record(self, points: float, headers=None) -> None:
+        """Учет расхода: по заголовкам квоты, если они есть, иначе по оценке"""
+        with self._lock:
+            self._roll_day()
+            used = headers.get('X-API-Quota-Used') if headers is not None else None
+            left = headers.get('X-API-Quota-Left') if headers is not None else None
+            try:
+                if used is not None:
+                    self._used = float(used)
+                    if left is not None:
+                        self.daily_points = float(used) + float(left)
+                    return
+            except ValueError:
+                pass
+            self._used += points
+
+    def exhaust(self) -> None:
+        """Spoonacular ответил 402 — до конца суток больше не обращаемся"""
+        with self._lock:
+            self._roll_day()
+            self._exhausted = True
+        logger.warning("💸 Spoonacular: дневная квота исчерпана (402)")
+
+    def stats(self) -> dict:
+        remaining = self.remaining
+        return {
+            'day': str(self._day),
+            'used': round(self._used, 3),
+            'remaining': round(remaining, 3),
+            'daily_points': self.daily_points,
+            'exhausted': self._exhausted,
+        }
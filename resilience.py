@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RECOVERY_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонен без обращения к сервису: circuit breaker открыт"""
+
+
+class CircuitBreaker:
+    """Circuit breaker: после серии ошибок перестает пускать запросы к сервису.
+
+    closed — запросы идут как обычно; open — сразу отказ до истечения recovery_timeout;
+    half_open — пропускается один пробный запрос, его исход закрывает или снова открывает breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    return False
+                self._set_state(HALF_OPEN)
+            # half_open: одновременно идет только один пробный запрос
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    self._set_state(OPEN)
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _set_state(self, state: str) -> None:
+        logger.warning(f"🔌 Circuit breaker '{self.name}': {self._state} → {state}")
+        self._state = state
+
+    def snapshot(self) -> dict:
+        return {
+            'state': self.state,
+            'failures': self._failures,
+            'rejected': self.rejected,
+        }
+
+
+class Upstream:
+    """Политика вызовов одного внешнего сервиса: таймауты, повторы с backoff и jitter, circuit breaker.
+
+    retryable(exc) решает, стоит ли повторять вызов и считать ли ошибку признаком
+    нездоровья сервиса; остальные ошибки (например, 404) пробрасываются сразу.
+    """
+
+    # Общий пул для синхронных вызовов, которые сами не умеют таймауты
+    _sync_executor = None
+    _sync_executor_lock = threading.Lock()
+
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float, max_retries: int,
+                 backoff_base: float = RETRY_BACKOFF_BASE, backoff_max: float = RETRY_BACKOFF_MAX) -> None:
+        self.name = name
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(name)
+
+    def available(self) -> bool:
+        """Сервис не считается упавшим (breaker не открыт)"""
+        return self.breaker.state != OPEN
+
+    def _backoff(self, attempt: int) -> float:
+        # Экспоненциальная задержка с "полным" jitter, чтобы повторы разных чатов не шли залпом
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def call(self, func: Callable[[], Awaitable[Any]],
+                   retryable: Callable[[Exception], bool] = lambda e: True,
+                   before_attempt: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """Асинхронный вызов с повторами и circuit breaker.
+
+        before_attempt выполняется перед каждой попыткой до circuit breaker: его ошибка
+        (например, локальный лимит частоты) пробрасывается, не занимая пробный слот
+        и не считаясь ответом сервиса.
+        """
+        attempt = 0
+        while True:
+            if before_attempt is not None:
+                await before_attempt()
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"{self.name}: circuit breaker открыт")
+            try:
+                result = await func()
+            except asyncio.CancelledError:
+                # Отмененный пробный запрос не должен навсегда занять слот half_open
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not retryable(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not self.available():
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"🔁 {self.name}: {type(e).__name__}, повтор {attempt}/{self.max_retries} через {delay:.2f}с")
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def call_sync(self, func: Callable[[], Any],
+                  retryable: Callable[[Exception], bool] = lambda e: True) -> Any:
+        """Синхронный вызов с общим таймаутом, повторами и circuit breaker.
+
+        Функция выполняется в служебном пуле потоков: зависший вызов не держит
+        вызывающего дольше connect_timeout + read_timeout.
+        """
+        timeout = self.connect_timeout + self.read_timeout
+        attempt = 0
+        while True:
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(f"{self.name}: circuit breaker открыт")
+            try:
+                result = self._get_sync_executor().submit(func).result(timeout=timeout)
+            except Exception as e:
+                if not retryable(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or not self.available():
+                    raise
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"🔁 {self.name}: {type(e).__name__}, повтор {attempt}/{self.max_retries} через {delay:.2f}с")
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    @classmethod
+    def _get_sync_executor(cls) -> ThreadPoolExecutor:
+        with cls._sync_executor_lock:
+            if cls._sync_executor is None:
+                cls._sync_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='upstream')
+            return cls._sync_executor
@@ -0,0 +1,98 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+
+class Broadcast:
+    """Поток результатов одного вызова, который читают сразу несколько подписчиков.
+
+    Каждый подписчик получает все опубликованные элементы с начала, в том же порядке.
+    complete=False после закрытия означает, что производитель не довел работу до конца.
+    """
+
+    def __init__(self) -> None:
+        self.items = []
+        self.closed = False
+        self.complete = True
+        self.task = None  # задача-производитель
+        self._changed = asyncio.Event()
+
+    def publish(self, item: Any) -> None:
+        self.items.append(item)
+        self._notify()
+
+    def close(self, complete: bool = True) -> None:
+        if not self.closed:
+            self.closed = True
+            self.complete = complete
+            self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.closed:
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных вызовов в один.
+
+    Пока вызов с ключом key выполняется, остальные вызывающие с тем же ключом
+    не запускают свой, а ждут результат уже идущего. Отмена одного из ожидающих
+    не отменяет общий вызов для остальных.
+    """
+
+    def __init__(self) -> None:
+        self._inflight = {}  # {key: asyncio.Task}
+        self._streams = {}  # {key: Broadcast}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stream(self, key: Hashable, producer: Callable[[Broadcast], Awaitable[None]]) -> Broadcast:
+        """Потоковый вариант do(): producer публикует результаты в Broadcast по мере готовности.
+
+        Подписчики, пришедшие позже, получают уже опубликованное и дальше читают вместе со всеми.
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is not None:
+            self.coalesced += 1
+            return broadcast
+
+        self.calls += 1
+        broadcast = Broadcast()
+        self._streams[key] = broadcast
+
+        def on_done(task):
+            self._streams.pop(key, None)
+            # Упавший или отмененный производитель не должен оставить подписчиков ждать вечно
+            broadcast.close(complete=not task.cancelled() and task.exception() is None)
+
+        broadcast.task = asyncio.ensure_future(producer(broadcast))
+        broadcast.task.add_done_callback(on_done)
+        return broadcast
+
+    def stats(self) -> dict:
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'inflight': len(self._inflight) + len(self._streams),
+        }
@@ -0,0 +1,88 @@
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from config import (
+    DATABASE_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+    SQLITE_STATEMENT_CACHE,
+    SQLITE_SYNCHRONOUS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SQLitePool:
+    """Небольшой пул долгоживущих соединений SQLite.
+
+    Соединения открываются один раз и настраиваются прагмами: WAL (читатели
+    не ждут писателя), synchronous=NORMAL (fsync только на checkpoint), кэш
+    страниц и mmap. Скомпилированные запросы хранятся в кэше каждого соединения
+    (cached_statements), поэтому одинаковый SQL не разбирается заново.
+    """
+
+    def __init__(self, db_name: str, size: int = DATABASE_POOL_SIZE) -> None:
+        self.db_name = db_name
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=SQLITE_BUSY_TIMEOUT,
+            check_same_thread=False,  # соединение переходит между потоками, но используется одним за раз
+            cached_statements=SQLITE_STATEMENT_CACHE,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError(f"Пул {self.db_name} закрыт")
+            if len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                return conn
+        # Все соединения заняты — ждем освободившееся
+        return self._idle.get(timeout=SQLITE_BUSY_TIMEOUT)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Соединение из пула: commit при успехе, rollback при исключении"""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        """Закрытие всех свободных соединений; занятые закрываются при возврате"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        logger.info(f"Соединения с {self.db_name} закрыты")
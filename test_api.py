@@ -3,85 +3,116 @@
 Тестирование API рецептов
 """
 
+import asyncio
+import os
+import tempfile
+
 from api_client import RecipeAPI
+from catalog import MealCatalog
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+def _make_api(tmp):
+    """RecipeAPI с локальными базами во временном каталоге"""
+    return RecipeAPI(MealCatalog(os.path.join(tmp, 'themealdb_catalog.db')),
+                     TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db'))))
 
 def test_themedb_api():
     """Тестирование TheMealDB API"""
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_test_themedb_api(tmp))
+
+async def _test_themedb_api(tmp):
     print("🔍 Тестирование TheMealDB API...")
     
-    api = RecipeAPI()
+    api = _make_api(tmp)
     
     # Тест поиска рецептов
     test_queries = ["pasta", "chicken", "beef", "fish", "salad", "cake", "bread", "soup"]
     
     for query in test_queries:
         print(f"\n1. Поиск рецептов '{query}':")
-        recipes = api.search_recipes_themedb(query)
+        recipes = await api.search_recipes_themedb(query)
         if recipes:
             print(f"✅ Найдено {len(recipes)} рецептов")
             for i, recipe in enumerate(recipes[:3], 1):
-                print(f"   {i}. {recipe['name']}")
+                print(f"   {i}. {recipe.name}")
         else:
             print("❌ Рецепты не найдены")
     
     # Тест случайного рецепта
     print("\n2. Случайный рецепт:")
-    random_recipe = api.get_random_recipe()
+    random_recipe = await api.get_random_recipe()
     if random_recipe:
-        print(f"✅ Случайный рецепт: {random_recipe['name']}")
-        print(f"   Ингредиентов: {len(random_recipe['ingredients'])}")
-        if random_recipe.get('video'):
-            print(f"   Видеорецепт: {random_recipe['video']}")
+        print(f"✅ Случайный рецепт: {random_recipe.name}")
+        print(f"   Ингредиентов: {len(random_recipe.ingredients)}")
+        if random_recipe.video:
+            print(f"   Видеорецепт: {random_recipe.video}")
     else:
         print("❌ Не удалось получить случайный рецепт")
     
     # Тест получения рецепта по ID
-    print(f"\n3. Получение рецепта по ID {random_recipe['id']}:")
-    recipe_by_id = api.get_recipe_by_id(random_recipe['id'])
+    print(f"\n3. Получение рецепта по ID {random_recipe.id}:")
+    recipe_by_id = await api.get_recipe_by_id(random_recipe.id)
     if recipe_by_id:
-        print(f"✅ Рецепт найден: {recipe_by_id['name']}")
+        print(f"✅ Рецепт найден: {recipe_by_id.name}")
     else:
         print("❌ Рецепт не найден")
+    
+    # Все запросы шли через один пул соединений
+    print(f"\n4. Переиспользование соединений: {api.http.get_stats()}")
+    await api.aclose()
 
 def test_spoonacular_api():
     """Тестирование Spoonacular API"""
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_test_spoonacular_api(tmp))
+
+async def _test_spoonacular_api(tmp):
     print("\n🔍 Тестирование Spoonacular API...")
     
-    api = RecipeAPI()
+    api = _make_api(tmp)
     
     if not api.spoonacular_api_key:
         print("⚠️  Spoonacular API ключ не установлен")
+        await api.aclose()
         return
     
     # Тест поиска рецептов
     print("\n1. Поиск рецептов 'chicken':")
-    recipes = api.search_recipes_spoonacular("chicken")
+    recipes = await api.search_recipes_spoonacular("chicken")
     if recipes:
         print(f"✅ Найдено {len(recipes)} рецептов")
         for i, recipe in enumerate(recipes[:3], 1):
-            print(f"   {i}. {recipe['name']}")
+            print(f"   {i}. {recipe.name}")
     else:
         print("❌ Рецепты не найдены")
+    await api.aclose()
 
 def test_combined_search():
     """Тестирование объединенного поиска"""
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_test_combined_search(tmp))
+
+async def _test_combined_search(tmp):
     print("\n🔍 Тестирование объединенного поиска...")
     
-    api = RecipeAPI()
+    api = _make_api(tmp)
     
     print("\n1. Поиск 'pizza':")
-    recipes = api.search_recipes("pizza")
+    recipes = await api.search_recipes("pizza")
     if recipes:
         print(f"✅ Найдено {len(recipes)} рецептов")
         sources = {}
         for recipe in recipes:
-            source = recipe.get('source', 'Unknown')
+            source = recipe.source or 'Unknown'
             sources[source] = sources.get(source, 0) + 1
         
         for source, count in sources.items():
             print(f"   {source}: {count} рецептов")
     else:
         print("❌ Рецепты не найдены")
+    await api.aclose()
 
 if __name__ == "__main__":
     print("🧪 Тестирование API рецептов\n")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Тестирование асинхронного доступа к базе избранного
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import async_database
+from async_database import AsyncDatabase
+from database import Database
+from models import Recipe
+
+def test_read_your_writes():
+    """Чтение пользователя видит все его изменения, даже еще не записанные в базу"""
+    print("🔍 Тестирование порядка операций пользователя...")
+
+    async def scenario(db):
+        recipe = Recipe('52772', "Борщ", ingredients=[])
+        # Изменения и чтения запускаются одновременно, но выполняются в порядке вызова
+        added, is_favorite, rated, favorites = await asyncio.gather(
+            db.add_favorite_recipe(1, recipe),
+            db.is_recipe_favorite(1, '52772'),
+            db.update_recipe_rating(1, '52772', 4),
+            db.get_favorite_recipes(1),
+        )
+        assert added and is_favorite and rated
+        assert [(recipe.id, recipe.rating) for recipe in favorites] == [('52772', 4)]
+        assert await db.update_recipe_rating(1, '52772', 5)
+        assert (await db.get_favorite_recipe(1, '52772')).rating == 5
+        assert await db.remove_favorite_recipe(1, '52772')
+        assert not await db.is_recipe_favorite(1, '52772')
+        assert not await db.update_recipe_rating(1, '52772', 5)
+        assert await db.get_favorites_page(1) == ([], [], 0)
+        await db.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(AsyncDatabase(Database(os.path.join(tmp, 'recipes.db')))))
+
+def test_reads_do_not_wait_for_writes():
+    """Медленная запись пачки не задерживает чтения и цикл событий"""
+    print("\n🔍 Тестирование неблокирующих чтений...")
+
+    class SlowDatabase(Database):
+        def apply_changes(self, changes):
+            time.sleep(0.5)  # долгий fsync или ожидание блокировки
+            return super().apply_changes(changes)
+
+    async def scenario(db):
+        assert await db.add_favorite_recipe(1, Recipe('1', "Плов", ingredients=[]))
+        flush = asyncio.create_task(db.flush())
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        assert not await db.is_recipe_favorite(2, '1')
+        assert await db.is_recipe_favorite(1, '1')  # пачка еще пишется
+        elapsed = time.monotonic() - started
+        print(f"   Чтения во время записи: {elapsed * 1000:.1f} мс")
+        assert elapsed < 0.3
+        await flush
+        await db.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(AsyncDatabase(SlowDatabase(os.path.join(tmp, 'recipes.db')))))
+
+def test_write_behind_merges_changes():
+    """Серия оценок одного рецепта сливается в одно изменение, пачки пишутся одной транзакцией"""
+    print("\n🔍 Тестирование групповой записи...")
+
+    class CountingDatabase(Database):
+        batches = []
+
+        def apply_changes(self, changes):
+            CountingDatabase.batches.append(len(changes))
+            return super().apply_changes(changes)
+
+    async def scenario(db):
+        for recipe_id in ('1', '2', '3'):
+            await db.add_favorite_recipe(1, Recipe(recipe_id, "Плов", ingredients=[]))
+        for rating in (1, 2, 3, 4, 5, 3):  # пользователь перебирает звезды
+            assert await db.update_recipe_rating(1, '2', rating)
+        await asyncio.sleep(0.3)  # запись по таймеру
+        assert CountingDatabase.batches == [3]
+
+        # Дальше таймер не срабатывает: остаток запишет только остановка
+        async_database.WRITE_BEHIND_INTERVAL = 10
+        await asyncio.sleep(0.15)
+
+        for rating in (1, 2, 5):
+            assert await db.update_recipe_rating(1, '3', rating)
+        assert await db.remove_favorite_recipe(1, '1')
+        print(f"   {db.stats()}")
+        await db.aclose()  # остаток записывается при остановке
+
+    interval = async_database.WRITE_BEHIND_INTERVAL
+    async_database.WRITE_BEHIND_INTERVAL = 0.1
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, 'recipes.db')
+            asyncio.run(scenario(AsyncDatabase(CountingDatabase(db_name))))
+            assert CountingDatabase.batches == [3, 2]
+
+            db = Database(db_name)
+            try:
+                assert [(recipe.id, recipe.rating) for recipe in db.get_favorite_recipes(1)] == [('3', 5), ('2', 3)]
+            finally:
+                db.close()
+    finally:
+        async_database.WRITE_BEHIND_INTERVAL = interval
+
+def test_failed_batch_is_retried():
+    """Откатившаяся пачка возвращается в очередь и не теряет более новые изменения"""
+    print("\n🔍 Тестирование повторной записи пачки...")
+
+    class FlakyDatabase(Database):
+        failures = 1
+
+        def apply_changes(self, changes):
+            if FlakyDatabase.failures:
+                FlakyDatabase.failures -= 1
+                return False
+            return super().apply_changes(changes)
+
+    async def scenario(db):
+        await db.add_favorite_recipe(1, Recipe('1', "Плов", ingredients=[]))
+        await db.flush()
+        assert db.stats()['failed_batches'] == 1 and await db.is_recipe_favorite(1, '1')
+        assert await db.update_recipe_rating(1, '1', 4)
+        await db.flush()
+        assert [(recipe.id, recipe.rating) for recipe in await db.get_favorite_recipes(1)] == [('1', 4)]
+        await db.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(AsyncDatabase(FlakyDatabase(os.path.join(tmp, 'recipes.db')))))
+
+def test_bad_change_is_dropped():
+    """Изменение, которое не записывается, не держит изменения других пользователей и отбрасывается"""
+    print("\n🔍 Тестирование сломанного изменения в пачке...")
+
+    async def scenario(db):
+        await db.add_favorite_recipe(1, Recipe('bad', None, ingredients=[]))  # name NOT NULL в базе
+        await db.add_favorite_recipe(2, Recipe('2', "Плов", ingredients=[]))
+        await db.flush()
+        assert [recipe.id for recipe in (await db.get_favorites_page(2))[0]] == ['2']
+        assert db.stats()['failed_batches'] == 1 and db.stats()['pending_changes'] == 1
+
+        for _ in range(async_database.WRITE_BEHIND_MAX_ATTEMPTS - 1):
+            await db.flush()
+        print(f"   {db.stats()}")
+        assert db.stats()['dropped_changes'] == 1 and db.stats()['pending_changes'] == 0
+        assert not await db.is_recipe_favorite(1, 'bad')
+        await db.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(AsyncDatabase(Database(os.path.join(tmp, 'recipes.db')))))
+
+def test_backpressure():
+    """Переполненная очередь изменений задерживает, а затем отклоняет новые изменения"""
+    print("\n🔍 Тестирование ограничения очереди записей...")
+
+    release = threading.Event()
+
+    class BlockedDatabase(Database):
+        def apply_changes(self, changes):
+            release.wait(2)
+            return super().apply_changes(changes)
+
+    async def scenario(db):
+        recipe = Recipe('1', "Плов", ingredients=[])
+        assert await db.add_favorite_recipe(0, recipe) and await db.add_favorite_recipe(1, recipe)
+        flush = asyncio.create_task(db.flush())  # пачка из двух изменений повисла на записи
+        await asyncio.sleep(0.05)
+        assert await db.add_favorite_recipe(2, recipe) and await db.add_favorite_recipe(3, recipe)
+        assert not await db.add_favorite_recipe(4, recipe)
+        assert await db.update_recipe_rating(3, '1', 5)  # изменение уже ожидающей записи сливается
+        print(f"   {db.stats()}")
+        assert db.stats()['rejected_writes'] == 1
+        release.set()
+        await flush
+        await db.flush()
+        assert [await asyncio.to_thread(db.db.is_recipe_favorite, user_id, '1') for user_id in range(5)] == \
+            [True, True, True, True, False]
+        await db.aclose()
+
+    limit, timeout = async_database.DB_WRITE_QUEUE_LIMIT, async_database.DB_WRITE_QUEUE_TIMEOUT
+    async_database.DB_WRITE_QUEUE_LIMIT, async_database.DB_WRITE_QUEUE_TIMEOUT = 2, 0.1
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(scenario(AsyncDatabase(BlockedDatabase(os.path.join(tmp, 'recipes.db')))))
+    finally:
+        async_database.DB_WRITE_QUEUE_LIMIT, async_database.DB_WRITE_QUEUE_TIMEOUT = limit, timeout
+
+if __name__ == "__main__":
+    try:
+        test_read_your_writes()
+        test_reads_do_not_wait_for_writes()
+        test_write_behind_merges_changes()
+        test_failed_batch_is_retried()
+        test_bad_change_is_dropped()
+        test_backpressure()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -4,13 +4,24 @@
 """
 
 from api_client import RecipeAPI
+from catalog import MealCatalog
+from translation_cache import TranslationCache
+from translator import TranslatorService
+import asyncio
 import json
+import os
+import tempfile
 
 def test_bot_search():
     """Тестирование поиска рецептов как в боте"""
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(_test_bot_search(tmp))
+
+async def _test_bot_search(tmp):
     print("🔍 Тестирование поиска рецептов в боте...")
     
-    api = RecipeAPI()
+    api = RecipeAPI(MealCatalog(os.path.join(tmp, 'themealdb_catalog.db')),
+                    TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db'))))
     
     # Тестовые запросы
     test_queries = [
@@ -29,30 +40,31 @@ def test_bot_search():
         print(f"\n🔍 Поиск: '{query}'")
         
         # Поиск через TheMealDB
-        themedb_recipes = api.search_recipes_themedb(query)
+        themedb_recipes = await api.search_recipes_themedb(query)
         print(f"   TheMealDB: {len(themedb_recipes)} рецептов")
         
         # Поиск через объединенный метод
-        all_recipes = api.search_recipes(query)
+        all_recipes = await api.search_recipes(query)
         print(f"   Всего: {len(all_recipes)} рецептов")
         
         if all_recipes:
             print("   Первые 3 рецепта:")
             for i, recipe in enumerate(all_recipes[:3], 1):
-                print(f"     {i}. {recipe['name']} (ID: {recipe['id']}, Источник: {recipe['source']})")
+                print(f"     {i}. {recipe.name} (ID: {recipe.id}, Источник: {recipe.source})")
         else:
             print("   ❌ Рецепты не найдены")
     
     # Тест с пустым запросом
     print(f"\n🔍 Тест с пустым запросом:")
-    empty_result = api.search_recipes("")
+    empty_result = await api.search_recipes("")
     print(f"   Результат: {len(empty_result)} рецептов")
     
     # Тест с очень длинным запросом
     print(f"\n🔍 Тест с длинным запросом:")
     long_query = "очень длинный запрос для поиска рецептов с множеством слов"
-    long_result = api.search_recipes(long_query)
+    long_result = await api.search_recipes(long_query)
     print(f"   Результат: {len(long_result)} рецептов")
+    await api.aclose()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Тестирование кэша рецептов
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import api_client
+from api_client import RecipeAPI
+from cache import TTLCache
+from catalog import MealCatalog
+from fakes import EchoBackend
+from models import Recipe
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+def test_ttl_cache():
+    """Тестирование TTL/LRU кэша"""
+    print("🔍 Тестирование TTLCache...")
+
+    cache = TTLCache(max_entries=2, ttl=0.2)
+
+    # Вытеснение давно не использованной записи
+    cache.set(('TheMealDB', '1'), {'name': 'Pasta'})
+    cache.set(('TheMealDB', '2'), {'name': 'Soup'})
+    cache.get(('TheMealDB', '1'))
+    cache.set(('Spoonacular', '3'), {'name': 'Cake'})
+    assert cache.get(('TheMealDB', '2')) is None
+    assert cache.get(('TheMealDB', '1')) == {'name': 'Pasta'}
+    print(f"   LRU: {cache.stats()}")
+
+    # Истечение TTL
+    time.sleep(0.25)
+    assert cache.get(('TheMealDB', '1')) is None
+    stats = cache.stats()
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['evictions'] == 1
+    print(f"   TTL: {stats}")
+
+def test_ttl_cache_max_bytes():
+    """Тестирование ограничения кэша по объёму"""
+    print("\n🔍 Тестирование ограничения по объёму...")
+
+    cache = TTLCache(max_entries=100, ttl=60, max_bytes=2000)
+    for i in range(10):
+        cache.set(i, 'x' * 500)
+
+    stats = cache.stats()
+    assert stats['bytes'] <= 2000
+    assert cache.get(9) is not None
+    assert cache.get(0) is None
+    print(f"   Записей: {stats['entries']}, байт: {stats['bytes']}")
+
+def test_search_cache():
+    """Кэш выдачи: нормализация запроса, TTL, короткий TTL пустой выдачи и устаревшая выдача при сбое"""
+    print("\n🔍 Тестирование кэша поиска...")
+
+    searches = []
+    broken = []
+
+    async def search_themedb(query):
+        query = query.strip().lower()
+        searches.append(query)
+        if broken:
+            raise ConnectionError("TheMealDB недоступен")
+        return [Recipe('1', "Chicken soup", ingredients=[])] if query == 'chicken' else []
+
+    async def scenario(api):
+        api.spoonacular_api_key = None
+        api._search_themedb = search_themedb
+
+        assert [recipe.id for recipe in await api.search_recipes("Chicken ")] == ['1']
+        assert [recipe.id for recipe in await api.search_recipes("chicken")] == ['1']
+        assert await api.search_recipes("nothing") == []
+        assert await api.search_recipes("nothing") == []
+        assert searches == ['chicken', 'nothing']
+
+        # Пустая выдача живет меньше непустой
+        await asyncio.sleep(0.1)
+        assert await api.search_recipes("nothing") == []
+        assert await api.search_recipes("chicken")
+        assert searches == ['chicken', 'nothing', 'nothing']
+
+        # Источник упал: отдаем устаревшую выдачу вместо пустой
+        await asyncio.sleep(0.25)
+        broken.append(True)
+        assert [recipe.id for recipe in await api.search_recipes("chicken")] == ['1']
+        assert searches[-1] == 'chicken'
+
+        # Источник помечен упавшим: устаревшая выдача без обращения к нему
+        breaker = api.upstreams['themealdb'].breaker
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        calls = len(searches)
+        assert [recipe.id for recipe in await api.search_recipes("chicken")] == ['1']
+        assert len(searches) == calls
+        print(f"   {api.search_cache.stats()}")
+        assert api.search_cache.stats()['stale_hits'] >= 2
+
+        api.invalidate_search_cache("chicken")
+        assert api._get_cached_search("chicken", allow_expired=True) is None
+        await api.aclose()
+
+    ttl, negative_ttl = api_client.SEARCH_CACHE_TTL, api_client.SEARCH_CACHE_NEGATIVE_TTL
+    api_client.SEARCH_CACHE_TTL, api_client.SEARCH_CACHE_NEGATIVE_TTL = 0.3, 0.05
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            api = RecipeAPI(MealCatalog(os.path.join(tmp, 'themealdb_catalog.db')),
+                            TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')),
+                                              backend=EchoBackend()))
+            asyncio.run(scenario(api))
+    finally:
+        api_client.SEARCH_CACHE_TTL, api_client.SEARCH_CACHE_NEGATIVE_TTL = ttl, negative_ttl
+
+if __name__ == "__main__":
+    try:
+        test_ttl_cache()
+        test_ttl_cache_max_bytes()
+        test_search_cache()
+        print("\n✅ Тестирование кэша завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Тестирование локального каталога TheMealDB
+"""
+
+import os
+import tempfile
+
+from catalog import CATALOG_LETTERS, MealCatalog
+from models import Ingredient, Recipe
+
+def make_meal(meal_id, name, *ingredients):
+    return Recipe(meal_id, name, f"https://example.com/{meal_id}.jpg", "Cook.",
+                  [Ingredient(ingredient, '1 cup') for ingredient in ingredients])
+
+def test_catalog_search():
+    """Полнотекстовый поиск: префиксы, все слова обязательны, совпадение в названии выше"""
+    print("🔍 Тестирование поиска по каталогу...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = MealCatalog(os.path.join(tmp, 'catalog.db'))
+        assert not catalog.has_data() and catalog.search("chicken") == []
+
+        assert catalog.replace_letter('c', [
+            (make_meal('1', "Chicken Handi", 'Chicken', 'Onion'), 'Chicken', 'Indian'),
+            (make_meal('2', "Creamy Tomato Soup", 'Tomato', 'Cream'), 'Starter', 'British'),
+            (make_meal('3', "Couscous Salad", 'Couscous', 'Chicken stock'), 'Side', 'Moroccan'),
+        ])
+        assert catalog.has_data()
+
+        ids = [recipe.id for recipe in catalog.search("chick")]
+        print(f"   'chick': {ids}")
+        assert ids == ['1', '3']
+        assert [recipe.id for recipe in catalog.search("chicken onion")] == ['1']
+        assert [recipe.id for recipe in catalog.search("starter")] == ['2']  # по категории
+        assert catalog.search("...") == []
+
+        recipe = catalog.get('2')
+        assert recipe.name == "Creamy Tomato Soup"
+        assert recipe.ingredients == (Ingredient('Tomato', '1 cup'), Ingredient('Cream', '1 cup'))
+        assert catalog.get('missing') is None
+        assert catalog.random().id in ('1', '2', '3')
+
+def test_catalog_replace_letter():
+    """Обновление буквы заменяет блюда целиком, а состояние синхронизации переживает перезапуск"""
+    print("\n🔍 Тестирование обновления каталога по буквам...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'catalog.db')
+        catalog = MealCatalog(db_name, max_age=60)
+        catalog.replace_letter('c', [
+            (make_meal('1', "Chicken Handi", 'Chicken'), 'Chicken', 'Indian'),
+            (make_meal('3', "Couscous Salad", 'Couscous'), 'Side', 'Moroccan'),
+        ])
+
+        # Блюдо пропало из выдачи TheMealDB, другое изменилось
+        catalog.replace_letter('c', [(make_meal('1', "Chicken Curry", 'Chicken', 'Curry'), 'Chicken', 'Indian')])
+        assert catalog.get('3') is None and catalog.search("couscous") == []
+        assert [recipe.name for recipe in catalog.search("curry")] == ["Chicken Curry"]
+        assert catalog.search("handi") == []
+
+        # Сначала ни разу не синхронизированные буквы, каталог неполон
+        assert 'c' not in catalog.letters_to_refresh(refresh_interval=3600)
+        assert len(catalog.letters_to_refresh(refresh_interval=3600)) == len(CATALOG_LETTERS) - 1
+        assert not catalog.is_fresh()
+
+        for letter in CATALOG_LETTERS:
+            if letter != 'c':
+                catalog.replace_letter(letter, [])
+        restarted = MealCatalog(db_name, max_age=60)
+        print(f"   Букв к обновлению после полной синхронизации: {len(restarted.letters_to_refresh(3600))}")
+        assert restarted.is_fresh()
+        assert restarted.letters_to_refresh(refresh_interval=3600) == []
+        assert restarted.letters_to_refresh(refresh_interval=0)[-1] == CATALOG_LETTERS[-1]
+
+if __name__ == "__main__":
+    try:
+        test_catalog_search()
+        test_catalog_replace_letter()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
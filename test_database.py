@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Тестирование базы избранного
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from database import Database
+from models import Ingredient, Recipe
+
+def make_recipe(recipe_id, name="Борщ"):
+    return Recipe(recipe_id, name, 'https://example.com/borscht.jpg', "Сварить.",
+                  [Ingredient('Свекла', '2 шт')], 'https://youtu.be/x')
+
+def test_favorites_crud():
+    """Добавление, оценка, чтение и удаление избранного через пул соединений"""
+    print("🔍 Тестирование Database...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'recipes.db'))
+        try:
+            assert db.add_favorite_recipe(1, make_recipe('52772'))
+            assert db.add_favorite_recipe(1, make_recipe('52773', "Плов"))
+            assert db.is_recipe_favorite(1, '52772')
+            assert not db.is_recipe_favorite(2, '52772')
+            assert db.update_recipe_rating(1, '52773', 5)
+            assert not db.update_recipe_rating(1, 'missing', 5)
+
+            favorites = db.get_favorite_recipes(1)
+            print(f"   Избранное: {[(recipe.name, recipe.rating) for recipe in favorites]}")
+            assert [recipe.id for recipe in favorites] == ['52773', '52772']
+            assert favorites[1].ingredients == (Ingredient('Свекла', '2 шт'),)
+
+            assert db.remove_favorite_recipe(1, '52772')
+            assert not db.remove_favorite_recipe(1, '52772')
+            assert [recipe.id for recipe in db.get_favorite_recipes(1)] == ['52773']
+        finally:
+            db.close()
+
+def test_connection_pool():
+    """Соединения переиспользуются, база работает в режиме WAL"""
+    print("\n🔍 Тестирование пула соединений...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'recipes.db'))
+        try:
+            with db.pool.connection() as conn:
+                assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+                assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+            # Параллельные вызовы из нескольких потоков не превышают размер пула
+            def worker(user_id):
+                for i in range(20):
+                    db.add_favorite_recipe(user_id, make_recipe(str(i)))
+                    db.is_recipe_favorite(user_id, str(i))
+
+            threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            print(f"   Открыто соединений: {len(db.pool._all)} из {db.pool.size}")
+            assert len(db.pool._all) <= db.pool.size
+            assert all(len(db.get_favorite_recipes(user_id)) == 20 for user_id in range(8))
+        finally:
+            db.close()
+
+def test_favorites_pages():
+    """Постраничное чтение по ключу: вперед, назад и во время переноса старой таблицы"""
+    print("\n🔍 Тестирование страниц избранного...")
+
+    def walk(db, user_id):
+        ids = []
+        recipes, keys, total = db.get_favorites_page(user_id)
+        while recipes:
+            ids.append(recipes[0].id)
+            following, following_keys, total = db.get_favorites_page(user_id, after=keys[-1])
+            if following:
+                # Шаг назад от следующей страницы возвращает текущую
+                assert db.get_favorites_page(user_id, before=following_keys[0])[0] == recipes
+            recipes, keys = following, following_keys
+        return ids, total
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'recipes.db'))
+        try:
+            for i in range(6):
+                db.add_favorite_recipe(1, make_recipe(str(i)))
+                db.update_recipe_rating(1, str(i), i % 3)
+            ids, total = walk(db, 1)
+            print(f"   Порядок: {ids}")
+            assert ids == [recipe.id for recipe in db.get_favorite_recipes(1)] and total == 6
+            assert db.get_favorites_page(2) == ([], [], 0)
+
+            # Рецепт с любой страницы находится в базе вместе с источником
+            assert db.add_favorite_recipe(1, make_recipe('900').replace(source='Spoonacular'))
+            recipe = db.get_favorite_recipe(1, '900')
+            assert recipe.source == 'Spoonacular' and recipe.ingredients == (Ingredient('Свекла', '2 шт'),)
+            assert db.get_favorite_recipe(1, '5').rating == 2
+            assert db.get_favorite_recipe(2, '900') is None
+        finally:
+            db.close()
+
+        db_name = os.path.join(tmp, 'legacy.db')
+        create_legacy_database(db_name, users=3)
+        db = Database(db_name)
+        try:
+            db.migrate_legacy_batch(batch_size=3)
+            db.update_recipe_rating(1, '52772', 5)
+            ids, total = walk(db, 1)
+            assert ids == ['52772', '52773'] and total == 2
+            assert db.get_favorite_recipe(2, '52773').name == "Плов"
+        finally:
+            db.close()
+
+def test_favorites_page_snapshot():
+    """Страница и общее число избранного читаются из одного снимка базы"""
+    print("\n🔍 Тестирование согласованности страницы избранного...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'recipes.db')
+        db, writer = Database(db_name), Database(db_name)
+        try:
+            db.add_favorite_recipe(1, make_recipe('1'))
+            written = []
+
+            def write_before_count(statement):
+                # Другой процесс добавляет рецепт между запросом страницы и подсчетом
+                if 'COUNT(*)' in statement and not written:
+                    written.append(writer.add_favorite_recipe(1, make_recipe('2')))
+
+            with db.pool.connection() as conn:
+                conn.set_trace_callback(write_before_count)
+            recipes, keys, total = db.get_favorites_page(1, limit=10)
+            assert written == [True]
+            print(f"   На странице: {len(recipes)}, всего: {total}")
+            assert len(recipes) == total == 1
+            assert db.get_favorites_page(1, limit=10)[2] == 2
+        finally:
+            db.close()
+            writer.close()
+
+def create_legacy_database(db_name, users):
+    """База в старом формате: полная копия рецепта в каждой строке favorite_recipes"""
+    with sqlite3.connect(db_name) as conn:
+        conn.execute('''
+            CREATE TABLE favorite_recipes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                recipe_id TEXT NOT NULL,
+                recipe_name TEXT NOT NULL,
+                recipe_image TEXT,
+                recipe_instructions TEXT,
+                recipe_ingredients TEXT,
+                recipe_video TEXT,
+                rating INTEGER DEFAULT 0,
+                added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, recipe_id)
+            )
+        ''')
+        ingredients = json.dumps([{'name': 'Свекла', 'amount': '2 шт', 'unit': ''}], ensure_ascii=False)
+        for user_id in range(users):
+            for recipe_id, name in (('52772', "Борщ"), ('52773', "Плов")):
+                conn.execute(
+                    'INSERT INTO favorite_recipes (user_id, recipe_id, recipe_name, recipe_image, '
+                    'recipe_instructions, recipe_ingredients, recipe_video, rating) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (user_id, recipe_id, name, 'https://example.com/x.jpg', "Сварить.", ingredients, '', user_id % 5)
+                )
+
+def test_online_migration():
+    """Перенос старой таблицы порциями: во время переноса избранное читается и меняется"""
+    print("\n🔍 Тестирование переноса избранного в новую схему...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'recipes.db')
+        create_legacy_database(db_name, users=10)
+        db = Database(db_name)
+        try:
+            assert db.legacy_pending
+            assert db.migrate_legacy_batch(batch_size=7) == 7
+
+            # Пользователь 0 перенесен, пользователь 9 еще в старой таблице
+            assert sorted(recipe.id for recipe in db.get_favorite_recipes(0)) == ['52772', '52773']
+            assert sorted(recipe.id for recipe in db.get_favorite_recipes(9)) == ['52772', '52773']
+            assert db.is_recipe_favorite(9, '52773')
+            assert db.update_recipe_rating(9, '52773', 5)
+            assert db.remove_favorite_recipe(8, '52772')
+            assert db.add_favorite_recipe(8, make_recipe('52772'))
+
+            moved = db.migrate_legacy_favorites(batch_size=5)
+            print(f"   Перенесено строк после первой порции: {moved}")
+            assert not db.legacy_pending
+            favorites = db.get_favorite_recipes(9)
+            assert [(recipe.id, recipe.rating) for recipe in favorites] == [('52773', 5), ('52772', 4)]
+            assert favorites[0].ingredients == (Ingredient('Свекла', '2 шт'),)
+
+            with db.pool.connection() as conn:
+                recipes = conn.execute('SELECT COUNT(*) FROM recipes').fetchone()[0]
+                links = conn.execute('SELECT COUNT(*) FROM favorites').fetchone()[0]
+            # Рецепт пользователя 8, добавленный заново, хранится с источником, остальные — одной копией
+            print(f"   Рецептов: {recipes}, связей: {links}")
+            assert recipes == 3 and links == 20
+        finally:
+            db.close()
+
+        # Пустая старая таблица удаляется при следующем запуске
+        db = Database(db_name)
+        try:
+            with db.pool.connection() as conn:
+                assert conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'favorite_recipes'"
+                ).fetchone() is None
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    try:
+        test_favorites_crud()
+        test_connection_pool()
+        test_online_migration()
+        test_favorites_pages()
+        test_favorites_page_snapshot()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
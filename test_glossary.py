@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Тестирование словаря ингредиентов
+"""
+
+import json
+import os
+import tempfile
+
+from glossary import GLOSSARY_FORMAT_VERSION, Glossary
+
+def test_glossary_lookup():
+    """Тестирование поиска ингредиентов и перевода запросов по словарю"""
+    print("🔍 Тестирование Glossary...")
+
+    glossary = Glossary.load('нет-такого-файла.json')
+    assert glossary.to_russian("Salt") == "Соль"
+    assert glossary.to_russian("  olive   OIL ") == "оливковое масло"
+    assert glossary.to_russian("Unobtanium") is None
+
+    assert glossary.translate_query("Куриный  суп") == "chicken soup"
+    assert glossary.translate_query("оливковое масло") == "olive oil"
+    assert glossary.translate_query("сахар") == "sugar"
+    # Незнакомое слово — весь запрос уходит переводчику
+    assert glossary.translate_query("суп с фрикадельками") is None
+    print(f"   Статистика: {glossary.stats()}")
+
+def test_glossary_file():
+    """Собранный файл дополняет базовый словарь; файл чужой версии игнорируется"""
+    print("\n🔍 Тестирование файла словаря...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'glossary.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': GLOSSARY_FORMAT_VERSION, 'revision': 3, 'en_ru': {'tamarind': 'тамаринд'}}, f)
+        glossary = Glossary.load(path)
+        assert glossary.revision == 3
+        assert glossary.to_russian("Tamarind") == "Тамаринд"
+        assert glossary.translate_query("тамаринд") == "tamarind"
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': GLOSSARY_FORMAT_VERSION + 1, 'en_ru': {'tamarind': 'тамаринд'}}, f)
+        assert Glossary.load(path).to_russian("Tamarind") is None
+        print("   Ревизия и версия формата учитываются")
+
+if __name__ == "__main__":
+    try:
+        test_glossary_lookup()
+        test_glossary_file()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Тестирование фоновой подготовки страниц выдачи
+"""
+
+import asyncio
+import os
+import tempfile
+
+from async_database import AsyncDatabase
+from bot import RecipeBot
+from database import Database
+from models import Recipe
+
+class FakeAPI:
+    """Загрузка полного рецепта и проверка фото без сети"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.hydrated = []
+        self.checked = {}
+        self.cancelled = []
+
+    async def hydrate_recipe(self, recipe_id, source='TheMealDB'):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(recipe_id)
+            raise
+        self.hydrated.append(recipe_id)
+        return Recipe(recipe_id, f"Блюдо {recipe_id}", f"https://example.com/{recipe_id}.jpg", "Сварить.",
+                      [], source=source)
+
+    def image_status(self, url):
+        return self.checked.get(url)
+
+    async def check_image(self, url):
+        self.checked[url] = True
+        return True
+
+def make_results(count):
+    return [Recipe(str(i), f"Dish {i}", f"https://example.com/{i}.jpg", ingredients=None) for i in range(count)]
+
+def test_prefetch_next_page():
+    """Следующая страница загружается и проверяется в фоне, готовая не загружается повторно"""
+    print("🔍 Тестирование подготовки следующей страницы...")
+
+    async def scenario(bot):
+        results = make_results(3)
+        bot.user_states[1] = {'search_results': results, 'current_page': 0}
+        bot._schedule_prefetch(1)
+        await asyncio.gather(*bot._prefetch_tasks[1].values())
+
+        assert bot.api.hydrated == ['1']
+        assert not results[1].is_summary and results[1].name == "Блюдо 1"
+        assert bot.api.image_status(results[1].image) is True
+        assert results[2].is_summary  # дальше PREFETCH_PAGES_AHEAD не заглядываем
+        assert bot._prefetch_tasks[1] == {}
+
+        # Переход на готовую страницу сразу готовит следующую, уже готовая не повторяется
+        bot.user_states[1]['current_page'] = 1
+        bot._schedule_prefetch(1)
+        await asyncio.gather(*bot._prefetch_tasks[1].values())
+        bot.user_states[1]['current_page'] = 0
+        bot._schedule_prefetch(1)
+        print(f"   Загружено в фоне: {bot.api.hydrated}")
+        assert bot.api.hydrated == ['1', '2'] and bot._prefetch_tasks[1] == {}
+        await bot.db.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(RecipeBot(AsyncDatabase(Database(os.path.join(tmp, 'recipes.db'))), FakeAPI())))
+
+def test_prefetch_cancelled():
+    """Подготовка страницы, с которой пользователь ушел, отменяется"""
+    print("\n🔍 Тестирование отмены подготовки...")
+
+    async def scenario(bot):
+        results = make_results(5)
+        bot.user_states[1] = {'search_results': results, 'current_page': 0}
+        bot._schedule_prefetch(1)
+        await asyncio.sleep(0.01)
+        assert list(bot._prefetch_tasks[1]) == [1]
+
+        # Пользователь перескочил дальше: страница 1 больше не нужна
+        bot.user_states[1]['current_page'] = 3
+        bot._schedule_prefetch(1)
+        await asyncio.sleep(0.01)
+        assert bot.api.cancelled == ['1'] and list(bot._prefetch_tasks[1]) == [4]
+
+        # Новый поиск или выход из выдачи останавливает всю подготовку
+        bot._leave_search_results(1)
+        await asyncio.sleep(0.01)
+        print(f"   Отменено: {bot.api.cancelled}")
+        assert bot.api.cancelled == ['1', '4'] and 1 not in bot._prefetch_tasks
+        assert bot.api.hydrated == [] and all(recipe.is_summary for recipe in results)
+        await bot.db.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(RecipeBot(AsyncDatabase(Database(os.path.join(tmp, 'recipes.db'))), FakeAPI(delay=5))))
+
+if __name__ == "__main__":
+    try:
+        test_prefetch_next_page()
+        test_prefetch_cancelled()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
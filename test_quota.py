@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Тестирование бюджета очков Spoonacular
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from api_client import RecipeAPI
+from catalog import MealCatalog
+from quota import SpoonacularBudget, TokenBucket
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+def test_plan_search():
+    """Размер поиска по остатку бюджета, резерв, заголовки квоты и 402"""
+    print("🔍 Тестирование планировщика очков...")
+
+    budget = SpoonacularBudget(daily_points=100, reserve=2)
+    assert budget.plan_search(wanted=10) == {'number': 10, 'addRecipeInformation': True, 'fillIngredients': True,
+                                             'cost': budget.search_cost(10, True, True)}
+
+    budget.record(60)
+    assert budget.plan_search(wanted=10)['number'] == 5  # меньше половины — вдвое меньше выдача
+    budget.record(25)
+    plan = budget.plan_search(wanted=10)
+    assert plan['addRecipeInformation'] and not plan['fillIngredients']
+    budget.record(7)
+    plan = budget.plan_search(wanted=10)
+    assert not plan['addRecipeInformation'] and plan['cost'] == budget.search_cost(5, False, False)
+
+    # Заголовки ответа точнее оценки и задают размер дневной квоты
+    budget.record(1.5, {'X-API-Quota-Used': '148.5', 'X-API-Quota-Left': '1.5'})
+    assert budget.remaining == 1.5 and budget.daily_points == 150
+    assert budget.plan_search(wanted=10) is None  # не трогаем резерв
+
+    fresh = SpoonacularBudget(daily_points=100, reserve=2)
+    fresh.exhaust()
+    print(f"   {fresh.stats()}")
+    assert fresh.remaining == 0 and fresh.plan_search() is None
+
+def test_token_bucket():
+    """Всплеск до capacity, затем не быстрее rate запросов в секунду"""
+    print("\n🔍 Тестирование token bucket...")
+
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    async def scenario():
+        started = time.monotonic()
+        assert await bucket.acquire(timeout=1)
+        waited = time.monotonic() - started
+        print(f"   Ожидание токена: {waited * 1000:.0f} мс")
+        assert 0.03 <= waited < 0.5
+        # Токен не появится за отведенное время — сразу отказ, без ожидания
+        slow = TokenBucket(rate=0.1, capacity=1)
+        assert slow.try_acquire()
+        started = time.monotonic()
+        assert not await slow.acquire(timeout=0.5)
+        assert time.monotonic() - started < 0.1
+
+    asyncio.run(scenario())
+
+def test_search_caches_full_recipes():
+    """Полный поиск кладет рецепты в кэш, урезанный отдает краткие карточки и полный рецепт грузится отдельно"""
+    print("\n🔍 Тестирование рецептов из поиска Spoonacular...")
+
+    class FakeHttp:
+        requests = []
+
+        async def get(self, url, params=None, timeout=None):
+            FakeHttp.requests.append((url, params))
+            full = {'id': 7, 'title': "Soup", 'image': "https://example.com/7.jpg", 'instructions': "Boil.",
+                    'extendedIngredients': [{'name': "water", 'amount': 1, 'unit': "l"}]}
+            if url.endswith('/information'):
+                data = full
+            elif params['addRecipeInformation'] and params['fillIngredients']:
+                data = {'results': [full]}
+            else:
+                data = {'results': [{'id': 7, 'title': "Soup", 'image': "https://example.com/7.jpg"}]}
+            return httpx.Response(200, json=data, request=httpx.Request('GET', url))
+
+        async def aclose(self):
+            pass
+
+    async def scenario(api):
+        api.http = FakeHttp()
+        api.spoonacular_api_key = 'key'
+        api.spoonacular_budget = SpoonacularBudget(daily_points=100, reserve=2)
+
+        # Бюджета хватает: рецепт приходит целиком и открывается без /information
+        recipes = await api._search_spoonacular("soup")
+        assert [recipe.is_summary for recipe in recipes] == [False]
+        assert api.recipe_cache.get(('Spoonacular', '7')) is not None
+        recipe = await api.get_recipe_by_id('7', 'Spoonacular')
+        assert [ing.name for ing in recipe.ingredients] == ["water"]
+        assert len(FakeHttp.requests) == 1
+
+        # Бюджет почти исчерпан: краткие карточки, полный рецепт — через /information
+        api.recipe_cache.clear()
+        FakeHttp.requests.clear()
+        api.spoonacular_budget.record(92)
+        recipes = await api._search_spoonacular("soup")
+        assert [recipe.is_summary for recipe in recipes] == [True]
+        params = FakeHttp.requests[0][1]
+        assert not params['addRecipeInformation'] and not params['fillIngredients']
+        assert api.recipe_cache.get(('Spoonacular', '7')) is None
+
+        recipe = await api.get_recipe_by_id('7', 'Spoonacular')
+        assert not recipe.is_summary and [ing.name for ing in recipe.ingredients] == ["water"]
+        assert FakeHttp.requests[-1][0].endswith('/7/information')
+        print(f"   Запросов при малом бюджете: {[url.rsplit('/', 1)[-1] for url, _ in FakeHttp.requests]}")
+        await api.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(RecipeAPI(MealCatalog(os.path.join(tmp, 'themealdb_catalog.db')),
+                                       TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db'))))))
+
+if __name__ == "__main__":
+    try:
+        test_plan_search()
+        test_token_bucket()
+        test_search_caches_full_recipes()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
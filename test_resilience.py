@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Тестирование повторов и circuit breaker
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+from api_client import RecipeAPI
+from catalog import MealCatalog
+from quota import RateLimitedError, TokenBucket
+from resilience import CircuitBreaker, CircuitOpenError, Upstream
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+def test_circuit_breaker():
+    """Тестирование переходов circuit breaker"""
+    print("🔍 Тестирование CircuitBreaker...")
+
+    breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=0.1)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow_request()
+
+    # После recovery_timeout пропускается ровно один пробный запрос
+    time.sleep(0.15)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    print(f"   Состояние: {breaker.snapshot()}")
+
+def test_upstream_retries():
+    """Тестирование повторов и быстрого отказа при открытом breaker"""
+    print("\n🔍 Тестирование Upstream...")
+
+    upstream = Upstream('test', connect_timeout=1, read_timeout=1, max_retries=2, backoff_base=0.001)
+    upstream.breaker.failure_threshold = 3
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("сбой")
+        return "ok"
+
+    assert asyncio.run(upstream.call(flaky)) == "ok"
+    assert len(calls) == 3
+    print(f"   Успех с {len(calls)}-й попытки")
+
+    async def broken():
+        raise ConnectionError("сбой")
+
+    for _ in range(2):
+        try:
+            asyncio.run(upstream.call(broken))
+        except (ConnectionError, CircuitOpenError):
+            pass
+    assert upstream.breaker.state == 'open'
+
+    try:
+        asyncio.run(upstream.call(flaky))
+        assert False, "ожидался CircuitOpenError"
+    except CircuitOpenError as e:
+        print(f"   Быстрый отказ: {e}")
+
+def test_retries_take_tokens():
+    """Повтор после 429 берет новый токен и не обходит ограничение частоты"""
+    print("\n🔍 Тестирование лимита частоты при повторах...")
+
+    class CountingBucket(TokenBucket):
+        acquired = 0
+
+        async def acquire(self, timeout):
+            CountingBucket.acquired += 1
+            return await super().acquire(timeout)
+
+    class FakeHttp:
+        statuses = [429, 200]
+
+        async def get(self, url, params=None, timeout=None):
+            return httpx.Response(self.statuses.pop(0), json={'results': []}, request=httpx.Request('GET', url))
+
+        async def aclose(self):
+            pass
+
+    async def scenario(api):
+        api.http = FakeHttp()
+        api.spoonacular_limiter = CountingBucket(rate=1000, capacity=2)
+        api.upstreams['spoonacular'].backoff_base = 0.001
+        assert await api._get_spoonacular_json('https://api.spoonacular.com/test', {}, 1.0) == {'results': []}
+        assert CountingBucket.acquired == 2
+        print(f"   Токенов на запрос с повтором: {CountingBucket.acquired}")
+
+        # Токенов нет — повтор не уходит в сеть
+        FakeHttp.statuses = [429, 200]
+        api.spoonacular_limiter = TokenBucket(rate=0.001, capacity=1)
+        try:
+            await api._get_spoonacular_json('https://api.spoonacular.com/test', {}, 1.0)
+            assert False, "ожидался RateLimitedError"
+        except RateLimitedError as e:
+            print(f"   Повтор без токена: {e}")
+        assert FakeHttp.statuses == [200]
+        await api.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(RecipeAPI(MealCatalog(os.path.join(tmp, 'themealdb_catalog.db')),
+                                       TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db'))))))
+
+def test_rate_limit_keeps_breaker():
+    """Отказ локального лимита частоты не закрывает half_open breaker и не занимает пробный слот"""
+    print("\n🔍 Тестирование лимита частоты при half_open breaker...")
+
+    async def no_token():
+        raise RateLimitedError("нет токена")
+
+    async def request():
+        assert False, "запрос не должен уйти в сеть"
+
+    async def scenario():
+        upstream = Upstream('test', connect_timeout=1, read_timeout=1, max_retries=2)
+        upstream.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0.05)
+        upstream.breaker.record_failure()
+        await asyncio.sleep(0.1)
+        assert upstream.breaker.state == 'half_open'
+
+        try:
+            await upstream.call(request, before_attempt=no_token)
+            assert False, "ожидался RateLimitedError"
+        except RateLimitedError:
+            pass
+        print(f"   Состояние: {upstream.breaker.snapshot()}")
+        assert upstream.breaker.snapshot()['failures'] == 1
+        # Пробный слот свободен: следующий запрос пойдет пробой, а не получит отказ
+        assert upstream.breaker.allow_request()
+        assert upstream.breaker.state == 'half_open'
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    try:
+        test_circuit_breaker()
+        test_upstream_retries()
+        test_retries_take_tokens()
+        test_rate_limit_keeps_breaker()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Тестирование потоковой выдачи поиска
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import api_client
+from api_client import RecipeAPI
+from catalog import MealCatalog
+from fakes import EchoBackend
+from models import Recipe
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+def make_api(tmp):
+    """RecipeAPI без сети: источники подменяются в тестах, перевод возвращает текст как есть"""
+    api = RecipeAPI(MealCatalog(os.path.join(tmp, 'themealdb_catalog.db')),
+                    TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')), backend=EchoBackend()))
+    api.spoonacular_api_key = 'key'
+    return api
+
+def make_recipes(source, count):
+    return [Recipe(f"{source}-{i}", f"{source} dish {i}", ingredients=[], source=source) for i in range(count)]
+
+def test_stream_under_deadline():
+    """Первая карточка приходит до ответа медленного источника, опоздавший источник отменяется"""
+    print("🔍 Тестирование потоковой выдачи с дедлайном...")
+
+    cancelled = []
+
+    async def fast_source(query):
+        await asyncio.sleep(0.02)
+        return make_recipes('TheMealDB', 2)
+
+    async def slow_source(query):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+        return make_recipes('Spoonacular', 2)
+
+    async def scenario(api):
+        api._search_themedb = fast_source
+        api._search_spoonacular = slow_source
+
+        started = time.monotonic()
+        arrivals = []
+        async for recipe in api.iter_search_recipes("pasta"):
+            arrivals.append((recipe.id, time.monotonic() - started))
+        print(f"   Карточки: {[(recipe_id, round(at, 2)) for recipe_id, at in arrivals]}")
+        assert [recipe_id for recipe_id, _ in arrivals] == ['TheMealDB-0', 'TheMealDB-1']
+        assert arrivals[0][1] < 0.15  # не ждем дедлайна
+        assert time.monotonic() - started < 1  # и медленный источник тоже
+        assert cancelled == ['pasta']
+        # Выдача, прерванная дедлайном, не кэшируется
+        assert api._get_cached_search("pasta") is None
+        await api.aclose()
+
+    deadline = api_client.SEARCH_DEADLINE
+    api_client.SEARCH_DEADLINE = 0.3
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(scenario(make_api(tmp)))
+    finally:
+        api_client.SEARCH_DEADLINE = deadline
+
+def test_stream_fan_out():
+    """Одинаковые одновременные поиски читают один поток; полная выдача не ждет второй источник"""
+    print("\n🔍 Тестирование общей выдачи для одинаковых поисков...")
+
+    calls = []
+
+    async def full_source(query):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return make_recipes('TheMealDB', api_client.MAX_RECIPES_PER_SEARCH + 2)
+
+    async def slow_source(query):
+        await asyncio.sleep(5)
+        return make_recipes('Spoonacular', 2)
+
+    async def collect(api, query):
+        return [recipe.id async for recipe in api.iter_search_recipes(query)]
+
+    async def scenario(api):
+        api._search_themedb = full_source
+        api._search_spoonacular = slow_source
+
+        started = time.monotonic()
+        first, second = await asyncio.gather(collect(api, "soup"), collect(api, "Soup"))
+        assert calls == ['soup']
+        assert first == second == [f"TheMealDB-{i}" for i in range(api_client.MAX_RECIPES_PER_SEARCH)]
+        assert time.monotonic() - started < 1
+        print(f"   {api.flights.stats()}")
+        # Выдача заполнена первым источником — она полная и кэшируется
+        assert len(api._get_cached_search("soup")) == api_client.MAX_RECIPES_PER_SEARCH
+        await api.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(make_api(tmp)))
+
+def test_stream_spoonacular_after_themealdb():
+    """Быстрый Spoonacular не вытесняет TheMealDB и запрашивается, только если выдача не заполнена"""
+    print("\n🔍 Тестирование порядка опроса источников...")
+
+    events = []
+
+    async def themedb_source(query):
+        events.append('TheMealDB start')
+        await asyncio.sleep(0.05)
+        events.append('TheMealDB done')
+        count = 2 if query == "pasta" else api_client.MAX_RECIPES_PER_SEARCH
+        return make_recipes('TheMealDB', count)
+
+    async def fast_spoonacular(query):
+        events.append('Spoonacular start')
+        return make_recipes('Spoonacular', 2)
+
+    async def collect(api, query):
+        return [recipe.id async for recipe in api.iter_search_recipes(query)]
+
+    async def scenario(api):
+        api._search_themedb = themedb_source
+        api._search_spoonacular = fast_spoonacular
+
+        ids = await collect(api, "pasta")
+        print(f"   Порядок вызовов: {events}")
+        assert events == ['TheMealDB start', 'TheMealDB done', 'Spoonacular start']
+        assert ids == ['TheMealDB-0', 'TheMealDB-1', 'Spoonacular-0', 'Spoonacular-1']
+        assert len(api._get_cached_search("pasta")) == 4
+
+        # TheMealDB заполнил выдачу — Spoonacular не запрашивается
+        events.clear()
+        ids = await collect(api, "soup")
+        assert events == ['TheMealDB start', 'TheMealDB done']
+        assert ids == [f"TheMealDB-{i}" for i in range(api_client.MAX_RECIPES_PER_SEARCH)]
+        await api.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(make_api(tmp)))
+
+if __name__ == "__main__":
+    try:
+        test_stream_under_deadline()
+        test_stream_fan_out()
+        test_stream_spoonacular_after_themealdb()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Тестирование объединения одинаковых запросов
+"""
+
+import asyncio
+
+from singleflight import SingleFlight
+
+def test_do_coalesces_calls():
+    """Одновременные вызовы с одним ключом выполняются один раз, отмена ожидающего не мешает остальным"""
+    print("🔍 Тестирование SingleFlight.do...")
+
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def lookup(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value.upper()
+
+        results = await asyncio.gather(*(flights.do('key', lambda: lookup('pasta')) for _ in range(5)),
+                                       flights.do('other', lambda: lookup('soup')))
+        assert results == ['PASTA'] * 5 + ['SOUP']
+        assert calls == ['pasta', 'soup']
+        print(f"   {flights.stats()}")
+        assert flights.stats() == {'calls': 2, 'coalesced': 4, 'inflight': 0}
+
+        # Отмена одного ожидающего не отменяет общий вызов
+        first = asyncio.create_task(flights.do('key', lambda: lookup('pizza')))
+        second = asyncio.create_task(flights.do('key', lambda: lookup('pizza')))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == 'PIZZA'
+        assert first.cancelled() and calls.count('pizza') == 1
+
+        # Ошибка достается всем ожидающим, а ключ освобождается для следующего вызова
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("сбой")
+
+        results = await asyncio.gather(flights.do('key', broken), flights.do('key', broken), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert await flights.do('key', lambda: lookup('salad')) == 'SALAD'
+
+    asyncio.run(scenario())
+
+def test_stream_fan_out():
+    """Поздний подписчик получает уже опубликованное, сбой или отмена производителя закрывают поток"""
+    print("\n🔍 Тестирование SingleFlight.stream...")
+
+    async def read(broadcast):
+        return [item async for item in broadcast]
+
+    async def scenario():
+        flights = SingleFlight()
+
+        async def produce(broadcast):
+            for item in ('a', 'b', 'c'):
+                broadcast.publish(item)
+                await asyncio.sleep(0.02)
+            broadcast.close()
+
+        early = flights.stream('search', produce)
+        early_reader = asyncio.create_task(read(early))
+        await asyncio.sleep(0.03)
+        late = flights.stream('search', produce)
+        assert late is early and late.items == ['a', 'b']
+        assert await read(late) == ['a', 'b', 'c']
+        assert await early_reader == ['a', 'b', 'c'] and early.complete
+        assert flights.stats()['coalesced'] == 1
+
+        async def broken(broadcast):
+            broadcast.publish('a')
+            raise ConnectionError("сбой")
+
+        failed = flights.stream('broken', broken)
+        assert await read(failed) == ['a'] and not failed.complete
+
+        async def endless(broadcast):
+            while True:
+                await asyncio.sleep(1)
+
+        hanging = flights.stream('endless', endless)
+        reader = asyncio.create_task(read(hanging))
+        await asyncio.sleep(0.01)
+        hanging.task.cancel()
+        assert await asyncio.wait_for(reader, 1) == [] and not hanging.complete
+        print(f"   {flights.stats()}")
+        assert flights.stats()['inflight'] == 0
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    try:
+        test_do_coalesces_calls()
+        test_stream_fan_out()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Тестирование движков перевода
+"""
+
+import os
+import tempfile
+
+from glossary import Glossary
+from translation_backends import BACKENDS, OfflineBackend, StubBackend, TranslationBackend, create_backend, register_backend
+from translation_cache import TranslationCache
+from translator import TranslatorService
+
+def test_registry():
+    """Выбор движка по имени и замена неизвестного или недоступного офлайн-словарем"""
+    print("🔍 Тестирование реестра движков...")
+
+    assert isinstance(create_backend('stub'), StubBackend)
+    assert isinstance(create_backend('no-such-engine'), OfflineBackend)
+
+    class BrokenBackend(TranslationBackend):
+        name = 'broken'
+
+        def available(self):
+            return False
+
+        def translate(self, text, source, target):
+            return text
+
+    class IncompleteBackend(TranslationBackend):
+        name = 'incomplete'
+
+    # Движок без translate() не создается
+    try:
+        IncompleteBackend()
+        assert False, "ожидался TypeError"
+    except TypeError:
+        pass
+
+    register_backend('broken', BrokenBackend)
+    try:
+        assert isinstance(create_backend('broken'), OfflineBackend)
+    finally:
+        BACKENDS.pop('broken')
+    print(f"   Зарегистрированы: {sorted(BACKENDS)}")
+
+def test_stub_backend():
+    """Заглушка детерминирована и сохраняет маркеры пакетного перевода"""
+    print("\n🔍 Тестирование заглушки...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = StubBackend(latency=0.01)
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')), backend=backend)
+        result = service.english_to_russian_batch(["Salt", "Heat the oil.\nStir.", "Onion"])
+        print(f"   {result}, запросов: {backend.requests}")
+        assert result == ["ru:Salt", "ru:Heat the oil.\nru:Stir.", "ru:Onion"]
+        assert backend.requests == 1
+        # Результат заглушки не попадает в память переводов
+        assert service.cache.get('en', 'ru', "Salt") is None
+
+def test_offline_backend():
+    """Офлайн-перевод по словарю: известные строки переводятся, остальные остаются как есть"""
+    print("\n🔍 Тестирование офлайн-движка...")
+
+    glossary = Glossary({'olive oil': 'оливковое масло', 'salt': 'соль'}, {'курица': 'chicken'})
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')),
+                                    backend=OfflineBackend(glossary))
+        result = service.english_to_russian_batch(["Olive oil", "Salt", "Heat the oil."])
+        print(f"   {result}")
+        assert result == ["Оливковое масло", "Соль", "Heat the oil."]
+        assert service.russian_to_english("курица") == "chicken"
+
+if __name__ == "__main__":
+    try:
+        test_registry()
+        test_stub_backend()
+        test_offline_backend()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Тестирование кэша переводов
+"""
+
+import os
+import tempfile
+
+from translation_cache import TranslationCache
+from translation_backends import TranslationBackend
+from translator import TranslatorService
+
+def test_translation_cache():
+    """Тестирование уровней кэша переводов и переживания перезапуска"""
+    print("🔍 Тестирование TranslationCache...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'translations.db')
+        cache = TranslationCache(db_name, max_entries=10)
+        assert cache.get('en', 'ru', 'Salt') is None
+        cache.set('en', 'ru', 'Salt', 'Соль')
+        assert cache.get('en', 'ru', 'Salt') == 'Соль'
+        assert cache.get('ru', 'en', 'Salt') is None  # другое направление — другой ключ
+
+        # Новый экземпляр (перезапуск бота) читает перевод из SQLite
+        restarted = TranslationCache(db_name, max_entries=10)
+        assert restarted.get('en', 'ru', 'Salt') == 'Соль'
+        assert restarted.get('en', 'ru', 'Salt') == 'Соль'
+        stats = restarted.stats()
+        assert stats['disk_hits'] == 1 and stats['memory_hits'] == 1
+        print(f"   Статистика: {stats}")
+
+def test_translator_uses_cache():
+    """Повторный перевод не обращается к движку перевода"""
+    print("\n🔍 Тестирование TranslatorService с кэшем...")
+
+    class FakeTranslator(TranslationBackend):
+        cacheable = True
+        calls = 0
+
+        def translate(self, text, source, target):
+            FakeTranslator.calls += 1
+            return f"ru:{text}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')),
+                                    backend=FakeTranslator())
+        assert service.english_to_russian("Onion") == "ru:Onion"
+        assert service.english_to_russian("Onion") == "ru:Onion"
+        assert FakeTranslator.calls == 1
+        print(f"   Обращений к движку: {FakeTranslator.calls}, {service.cache.stats()}")
+
+if __name__ == "__main__":
+    try:
+        test_translation_cache()
+        test_translator_uses_cache()
+        print("\n✅ Тестирование завершено!")
+    except Exception as e:
+        print(f"\n❌ Ошибка при тестировании: {e}")
+        import traceback
+        traceback.print_exc()
@@ -3,13 +3,20 @@
 Тестирование переводчика
 """
 
-from translator import TranslatorService
+import os
+import tempfile
+import time
+
+from translation_cache import TranslationCache
+from translation_backends import StubBackend, TranslationBackend
+from translator import TranslationExecutor, TranslatorService, skip_reason, split_text
 
 def test_translator():
     """Тестирование переводчика"""
     print("🔍 Тестирование переводчика...")
     
-    translator = TranslatorService()
+    tmp = tempfile.TemporaryDirectory()
+    translator = TranslatorService(TranslationCache(os.path.join(tmp.name, 'translations.db')))
     
     # Тест перевода с русского на английский
     test_queries = [
@@ -45,10 +52,115 @@ def test_translator():
     print(f"\n🔍 Тест с пустым текстом:")
     empty_result = translator.russian_to_english("")
     print(f"   Пустой текст: '{empty_result}'")
+    translator.cache.close()
+    tmp.cleanup()
+
+def test_translate_batch():
+    """Пакетный перевод: один запрос к движку, разбор по маркерам и поштучный откат"""
+    print("\n🔍 Тестирование пакетного перевода...")
+
+    class FakeTranslator(TranslationBackend):
+        cacheable = True
+        requests = []
+
+        def translate(self, text, source, target):
+            FakeTranslator.requests.append(text)
+            # Движок "теряет" маркер третьего элемента, склеивая его с соседом
+            return text.replace("\n[[2]]\n", " ").replace("Salt", "Соль").replace("Onion", "Лук") \
+                .replace("Heat the oil.", "Нагрейте масло.").replace("Butter", "Масло")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')),
+                                    backend=FakeTranslator())
+        texts = ["Salt", "Heat the oil.\nStir.", "Onion", "", "Salt", "Butter"]
+        result = service.english_to_russian_batch(texts)
+        print(f"   {texts} → {result}")
+        assert result == ["Соль", "Нагрейте масло.\nStir.", "Лук", "", "Соль", "Масло"]
+        # Один пакетный запрос и поштучный откат для элемента с потерянным маркером и его соседа
+        assert len(FakeTranslator.requests) == 3
+        print(f"   Запросов к движку: {len(FakeTranslator.requests)}")
+
+def test_translation_executor():
+    """Параллельный запуск: порядок результатов, изоляция ошибок и таймаут на вызов"""
+    print("\n🔍 Тестирование TranslationExecutor...")
+
+    executor = TranslationExecutor(max_workers=3, timeout=0.3)
+
+    def translate(text):
+        if text == "boom":
+            raise RuntimeError("сбой движка")
+        if text == "hang":
+            time.sleep(1)
+        time.sleep(0.1)
+        return text.upper()
+
+    started = time.monotonic()
+    result = executor.map(translate, ["a", "boom", "b", "hang", "c", "d"])
+    elapsed = time.monotonic() - started
+    print(f"   Результат: {result} за {elapsed:.2f}с")
+    assert result == ["A", None, "B", None, "C", "D"]
+    assert elapsed < 0.9  # зависший вызов не ждем дольше таймаута
+
+def test_skip_untranslatable():
+    """Быстрый путь: текст без букв исходного языка не уходит переводчику"""
+    print("\n🔍 Тестирование определения письменности...")
+
+    assert skip_reason("pasta", 'ru') == 'target_script'
+    assert skip_reason("Курица", 'en') == 'target_script'
+    assert skip_reason("1/2 tsp", 'en') is None
+    assert skip_reason("250", 'en') == 'no_letters'
+    assert skip_reason("https://www.youtube.com/watch?v=abc", 'en') == 'no_letters'
+    assert skip_reason("Crème brûlée", 'en') is None
+    assert skip_reason("курица с pasta", 'ru') is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = StubBackend(latency=0)  # заглушка считает каждое обращение к движку
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')), backend=backend)
+        assert service.russian_to_english("pasta") == "pasta"
+        assert service.english_to_russian_batch(["Соль", "200", ""]) == ["Соль", "200", ""]
+        stats = service.stats()
+        print(f"   Сэкономлено: {stats}")
+        assert stats['saved_calls'] == 3 and service.cache.stats()['misses'] == 0
+        assert backend.requests == 0
+
+def test_long_text_chunks():
+    """Длинные инструкции: разбиение по предложениям, параллельные запросы, кэш по частям"""
+    print("\n🔍 Тестирование перевода длинного текста частями...")
+
+    step = "Heat the oil in a large pan and cook the onion gently until soft. "
+    text = (step * 20).strip() + "\n\n" + (step * 20).strip()
+    parts = split_text(text, 1000)
+    assert ''.join(part + separator for part, separator in parts) == text
+    assert len(parts) > 2 and all(len(part) <= 1000 for part, _ in parts)
+
+    class FakeTranslator(TranslationBackend):
+        cacheable = True
+        requests = []
+
+        def translate(self, text, source, target):
+            FakeTranslator.requests.append(text)
+            return text.replace("Heat the oil", "Нагрейте масло")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = TranslatorService(TranslationCache(os.path.join(tmp, 'translations.db')),
+                                    backend=FakeTranslator())
+        result = service.english_to_russian(text)
+        print(f"   {len(text)} символов, {len(parts)} частей, запросов: {len(FakeTranslator.requests)}")
+        assert result == text.replace("Heat the oil", "Нагрейте масло")
+        assert len(FakeTranslator.requests) > 1  # работа разошлась по нескольким запросам
+
+        # Одинаковые части берутся из кэша: повторный перевод не обращается к движку
+        FakeTranslator.requests.clear()
+        assert service.english_to_russian(text) == result
+        assert FakeTranslator.requests == []
 
 if __name__ == "__main__":
     try:
         test_translator()
+        test_translate_batch()
+        test_translation_executor()
+        test_skip_untranslatable()
+        test_long_text_chunks()
         print("\n✅ Тестирование переводчика завершено!")
     except Exception as e:
         print(f"\n❌ Ошибка при тестировании: {e}")
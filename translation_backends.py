@@ -0,0 +1,191 @@
+import abc
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import TRANSLATION_BACKEND, TRANSLATION_STUB_LATENCY
+
+try:
+    from deep_translator import GoogleTranslator
+except Exception:  # Library not installed or other import-time failure
+    GoogleTranslator = None  # type: ignore
+
+try:
+    import argostranslate.translate as argos_translate
+except Exception:  # Локальная модель не установлена
+    argos_translate = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Строки-маркеры пакетного перевода (translator.pack_batch) офлайн-движки возвращают как есть
+_MARKER_LINE_RE = re.compile(r'^\s*\[\[\s*\d+\s*\]\]\s*$')
+
+
+class TranslationBackend(abc.ABC):
+    """Движок перевода для TranslatorService.
+
+    translate() переводит текст целиком (в том числе пакет с маркерами) и при ошибке
+    бросает исключение. remote — вызовы идут в сеть и оборачиваются в Upstream
+    (таймаут, повторы, circuit breaker); cacheable — результат можно сохранять
+    в память переводов наравне с онлайн-переводом. Движок без translate()
+    не создается (TypeError).
+    """
+
+    name = 'base'
+    remote = False
+    cacheable = False
+
+    def available(self) -> bool:
+        return True
+
+    def supports(self, source: str, target: str) -> bool:
+        return (source, target) in (('ru', 'en'), ('en', 'ru'))
+
+    @abc.abstractmethod
+    def translate(self, text: str, source: str, target: str) -> str:
+        """Перевод текста; ошибки движка пробрасываются"""
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate через deep-translator"""
+
+    name = 'google'
+    remote = True
+    cacheable = True
+
+    def __init__(self) -> None:
+        self._translators = {}  # {(source, target): GoogleTranslator}
+        if GoogleTranslator is not None:
+            try:
+                for source, target in (('ru', 'en'), ('en', 'ru')):
+                    self._translators[(source, target)] = GoogleTranslator(source=source, target=target)
+            except Exception as e:
+                logger.error(f"Ошибка при создании GoogleTranslator: {e}")
+                self._translators = {}
+
+    def available(self) -> bool:
+        return bool(self._translators)
+
+    def supports(self, source: str, target: str) -> bool:
+        return (source, target) in self._translators
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        return self._translators[(source, target)].translate(text)
+
+
+class ArgosBackend(TranslationBackend):
+    """Локальная модель Argos Translate, если пакет и языковые модели установлены"""
+
+    name = 'argos'
+    cacheable = True
+
+    def __init__(self) -> None:
+        self._translations = {}  # {(source, target): ITranslation}
+        if argos_translate is None:
+            return
+        try:
+            languages = {language.code: language for language in argos_translate.get_installed_languages()}
+            for source, target in (('ru', 'en'), ('en', 'ru')):
+                if source in languages and target in languages:
+                    translation = languages[source].get_translation(languages[target])
+                    if translation is not None:
+                        self._translations[(source, target)] = translation
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке моделей Argos Translate: {e}")
+            self._translations = {}
+
+    def available(self) -> bool:
+        return bool(self._translations)
+
+    def supports(self, source: str, target: str) -> bool:
+        return (source, target) in self._translations
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        # Маркеры пакета модель может исказить, поэтому переводим построчно
+        translation = self._translations[(source, target)]
+        return _translate_lines(text, translation.translate)
+
+
+class OfflineBackend(TranslationBackend):
+    """Перевод по словарю ингредиентов (glossary.py) без сети.
+
+    Строка переводится, только если целиком есть в словаре; остальные возвращаются
+    без изменений. Результат не сохраняется в память переводов, чтобы не вытеснять
+    будущий онлайн-перевод.
+    """
+
+    name = 'offline'
+
+    def __init__(self, glossary=None) -> None:
+        if glossary is None:
+            from glossary import Glossary
+            glossary = Glossary.load()
+        self.glossary = glossary
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        lookup = self.glossary.to_russian if target == 'ru' else self.glossary.translate_query
+        return _translate_lines(text, lambda line: lookup(line) or line)
+
+
+class StubBackend(TranslationBackend):
+    """Детерминированная заглушка для бенчмарков и тестов: задержка на запрос и префикс языка"""
+
+    name = 'stub'
+
+    def __init__(self, latency: float = TRANSLATION_STUB_LATENCY) -> None:
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        with self._lock:
+            self.requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return _translate_lines(text, lambda line: f"{target}:{line}")
+
+
+def _translate_lines(text: str, translate_line: Callable[[str], str]) -> str:
+    """Построчный перевод: пустые строки и маркеры пакета сохраняются"""
+    lines = []
+    for line in text.split('\n'):
+        if not line.strip() or _MARKER_LINE_RE.match(line):
+            lines.append(line)
+        else:
+            lines.append(translate_line(line))
+    return '\n'.join(lines)
+
+
+# Реестр движков: имя из TRANSLATION_BACKEND → фабрика
+BACKENDS: Dict[str, Callable[[], TranslationBackend]] = {
+    'google': GoogleBackend,
+    'argos': ArgosBackend,
+    'offline': OfflineBackend,
+    'stub': StubBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], TranslationBackend]) -> None:
+    """Регистрация дополнительного движка перевода под именем для TRANSLATION_BACKEND"""
+    BACKENDS[name] = factory
+
+
+def create_backend(name: Optional[str] = None) -> TranslationBackend:
+    """Движок по имени (по умолчанию из конфигурации); недоступный заменяется офлайн-словарем"""
+    name = name or TRANSLATION_BACKEND
+    factory = BACKENDS.get(name)
+    if factory is None:
+        logger.error(f"Неизвестный движок перевода '{name}', используется offline")
+        return OfflineBackend()
+    try:
+        backend = factory()
+    except Exception as e:
+        logger.error(f"Ошибка при создании движка перевода '{name}': {e}")
+        return OfflineBackend()
+    if not backend.available():
+        logger.warning(f"Движок перевода '{name}' недоступен, используется offline")
+        return OfflineBackend()
+    logger.info(f"🌐 Движок перевода: {backend.name}")
+    return backend
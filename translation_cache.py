@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Optional
+
+from cache import TTLCache
+from config import TRANSLATION_CACHE_DATABASE_NAME, TRANSLATION_CACHE_MAX_ENTRIES, TRANSLATION_CONCURRENCY
+from sqlite_pool import SQLitePool
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """Двухуровневая память переводов: LRU в памяти поверх таблицы SQLite.
+
+    Ключ — (исходный язык, целевой язык, sha256 текста). Переводы не устаревают,
+    поэтому переживают перезапуск бота; в памяти держатся только последние
+    max_entries. Счетчики попаданий по уровням доступны через stats().
+    SQLite читается через долгоживущие соединения SQLitePool: по одному
+    на каждый поток переводчика.
+    """
+
+    def __init__(self, db_name: str = TRANSLATION_CACHE_DATABASE_NAME,
+                 max_entries: int = TRANSLATION_CACHE_MAX_ENTRIES) -> None:
+        self.db_name = db_name
+        self.pool = SQLitePool(db_name, TRANSLATION_CONCURRENCY)
+        self._memory = TTLCache(max_entries=max_entries, ttl=float('inf'))
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.init_database()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def init_database(self) -> None:
+        """Создание таблицы переводов"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS translations (
+                        source TEXT NOT NULL,
+                        target TEXT NOT NULL,
+                        text_hash TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        translated TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        PRIMARY KEY (source, target, text_hash)
+                    )
+                ''')
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации кэша переводов: {e}")
+
+    def get(self, source: str, target: str, text: str) -> Optional[str]:
+        """Сохраненный перевод или None"""
+        key = (source, target, text_hash(text))
+        translated = self._memory.get(key)
+        if translated is not None:
+            self._count('memory_hits')
+            return translated
+
+        translated = self._load(key, text)
+        if translated is None:
+            self._count('misses')
+            return None
+        self._count('disk_hits')
+        self._memory.set(key, translated)
+        return translated
+
+    def set(self, source: str, target: str, text: str, translated: str) -> None:
+        key = (source, target, text_hash(text))
+        self._memory.set(key, translated)
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)',
+                    (*key, text, translated, time.time())
+                )
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении перевода: {e}")
+
+    def _load(self, key: tuple, text: str) -> Optional[str]:
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT text, translated FROM translations WHERE source = ? AND target = ? AND text_hash = ?',
+                    key
+                ).fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка при чтении кэша переводов: {e}")
+            return None
+        # Совпадение хэша при другом тексте считаем промахом
+        if row is None or row[0] != text:
+            return None
+        return row[1]
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._memory),
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / total if total else 0.0,
+        }
@@ -1,43 +1,348 @@
-from typing import Optional
+import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-try:
-    from deep_translator import GoogleTranslator
-except Exception:  # Library not installed or other import-time failure
-    GoogleTranslator = None  # type: ignore
+from config import (
+    TRANSLATION_BATCH_MAX_CHARS,
+    TRANSLATION_CALL_TIMEOUT,
+    TRANSLATION_CHUNK_CHARS,
+    TRANSLATION_CONCURRENCY,
+    UPSTREAM_SETTINGS,
+)
+from resilience import Upstream
+from translation_backends import TranslationBackend, create_backend
+from translation_cache import TranslationCache
+
+logger = logging.getLogger(__name__)
+
+
+# Проверка письменности исходного языка: латиница для en, кириллица для ru
+_SCRIPT_CHECKS = {
+    'en': lambda char: char.isascii() or '\u00c0' <= char <= '\u024f',
+    'ru': lambda char: '\u0400' <= char <= '\u04ff',
+}
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+
+
+def skip_reason(text: str, source: str) -> Optional[str]:
+    """Почему текст не нужно отправлять переводчику, или None, если нужно.
+
+    'no_letters' — только числа, знаки и ссылки; 'target_script' — в тексте нет букв
+    исходного языка (уже на языке перевода, например "pasta" при ru→en).
+    """
+    letters = [char for char in _URL_RE.sub('', text) if char.isalpha()]
+    if not letters:
+        return 'no_letters'
+    in_source_script = _SCRIPT_CHECKS.get(source)
+    if in_source_script is not None and not any(in_source_script(char) for char in letters):
+        return 'target_script'
+    return None
+
+
+_PARAGRAPH_SPLIT_RE = re.compile(r'(\s*\n\s*)')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])(\s+)')
+
+
+def _split_keep(text: str, pattern) -> List[Tuple[str, str]]:
+    """Split on a pattern with one capturing group into [(piece, separator after it)]"""
+    pieces = pattern.split(text)
+    return [(pieces[i], pieces[i + 1] if i + 1 < len(pieces) else '') for i in range(0, len(pieces), 2)]
+
+
+def _hard_split(pieces: List[Tuple[str, str]], limit: int):
+    """Cut pieces longer than limit at the last space before it"""
+    for piece, separator in pieces:
+        while len(piece) > limit:
+            cut = piece.rfind(' ', 0, limit)
+            if cut <= 0:
+                yield piece[:limit], ''
+                piece = piece[limit:]
+            else:
+                yield piece[:cut], ' '
+                piece = piece[cut + 1:]
+        yield piece, separator
+
+
+def _join_group(group: List[Tuple[str, str]]) -> Tuple[str, str]:
+    content = ''.join(s + sep for s, sep in group[:-1]) + group[-1][0]
+    return content, group[-1][1]
+
+
+def split_text(text: str, limit: int) -> List[Tuple[str, str]]:
+    """Split a long text into parts of at most limit characters.
+
+    Paragraphs are kept whole when they fit; longer ones are grouped by
+    sentences. Returns [(part, separator)] such that joining part + separator
+    gives the original text back, so translated parts keep the line breaks.
+    """
+    parts = []
+    for paragraph, paragraph_separator in _split_keep(text, _PARAGRAPH_SPLIT_RE):
+        if len(paragraph) <= limit:
+            parts.append((paragraph, paragraph_separator))
+            continue
+        # Абзац длиннее лимита — собираем из предложений части, близкие к лимиту
+        group = []
+        for sentence, separator in _hard_split(_split_keep(paragraph, _SENTENCE_SPLIT_RE), limit):
+            size = sum(len(s) + len(sep) for s, sep in group)
+            if group and size + len(sentence) > limit:
+                parts.append(_join_group(group))
+                group = []
+            group.append((sentence, separator))
+        content, separator = _join_group(group)
+        parts.append((content, separator + paragraph_separator))
+    return parts
+
+
+# Строка-разделитель элементов пакета; номер позволяет сопоставить перевод с исходником
+_BATCH_MARKER = '[[{}]]'
+_BATCH_MARKER_RE = re.compile(r'^\s*\[\[\s*(\d+)\s*\]\]\s*$', re.MULTILINE)
+
+
+def pack_batch(texts: List[str]) -> str:
+    """Склейка строк в один запрос: каждой предшествует строка-маркер с ее номером"""
+    return '\n'.join(f"{_BATCH_MARKER.format(i)}\n{text}" for i, text in enumerate(texts))
+
+
+def unpack_batch(packed: str, count: int) -> Dict[int, str]:
+    """Разбор переведенного пакета: {номер: перевод} только для надежно выделенных элементов.
+
+    Элемент принимается, только если следующий маркер — ровно его номер + 1 (или он последний):
+    при потерянном маркере текст соседа приклеился бы к предыдущему элементу.
+    """
+    result = {}
+    matches = list(_BATCH_MARKER_RE.finditer(packed))
+    for match, following in zip(matches, matches[1:] + [None]):
+        index = int(match.group(1))
+        if following is not None:
+            end, next_index = following.start(), int(following.group(1))
+        else:
+            end, next_index = len(packed), count
+        text = packed[match.end():end].strip()
+        if 0 <= index < count and next_index == index + 1 and index not in result and text:
+            result[index] = text
+    return result
+
+
+class TranslationExecutor:
+    """Bounded parallel runner for independent translation calls.
+
+    map() runs a sync backend on a shared thread pool with at most
+    max_workers calls at once. Each call gets its own timeout counted from
+    when it actually starts. Results come back in input order, and a failed
+    or timed-out item becomes None without affecting the others.
+    """
+
+    def __init__(self, max_workers: int = TRANSLATION_CONCURRENCY,
+                 timeout: float = TRANSLATION_CALL_TIMEOUT) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='translate')
+
+    def map(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+
+        started = {}  # {index: time.monotonic() начала вызова}
+        lock = threading.Lock()
+
+        def run(index, item):
+            with lock:
+                started[index] = time.monotonic()
+            return func(item)
+
+        futures = {self._pool.submit(run, index, item): index for index, item in enumerate(items)}
+        results = [None] * len(items)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=self.timeout / 4, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Перевод элемента {futures[future]} не удался: {e}")
+            # Зависший вызов больше не ждем; его поток освободится по таймауту Upstream
+            now = time.monotonic()
+            with lock:
+                expired = {f for f in pending if now - started.get(futures[f], now) > self.timeout}
+            for future in expired:
+                logger.warning(f"⏱️ Перевод элемента {futures[future]} не уложился в {self.timeout}с")
+                future.cancel()
+            pending -= expired
+        return results
 
 
 class TranslatorService:
-    """Lightweight wrapper around deep-translator with safe fallbacks.
+    """Translation front-end over a pluggable backend with safe fallbacks.
 
     Provides ru→en and en→ru translations with graceful degradation
-    when the translation engine is unavailable or errors occur.
+    when the translation engine is unavailable or errors occur. The
+    engine comes from the translation_backends registry (TRANSLATION_BACKEND:
+    Google, a local model, the offline glossary or a latency stub). Calls
+    to remote engines go through an Upstream policy, so a hung or failing
+    endpoint times out and then trips a circuit breaker instead of
+    stalling every search.
+
+    Text with nothing to translate (numbers, links, or no letters of the
+    source language at all) is returned as is without touching the cache
+    or the network; saved calls are counted in stats().
+
+    Successful translations are remembered in a TranslationCache
+    (in-memory LRU over SQLite), which is checked before any network call.
+    translate_batch() packs many strings into as few engine requests as
+    the size limit allows and sends those requests in parallel through a
+    bounded TranslationExecutor. Texts longer than TRANSLATION_CHUNK_CHARS
+    (recipe instructions) are split at paragraph and sentence boundaries;
+    each part is translated and cached on its own, so shared steps are reused.
     """
 
-    def __init__(self) -> None:
-        self._translator_en = None
-        self._translator_ru = None
-        if GoogleTranslator is not None:
-            try:
-                self._translator_en = GoogleTranslator(source='ru', target='en')
-                self._translator_ru = GoogleTranslator(source='en', target='ru')
-            except Exception:
-                self._translator_en = None
-                self._translator_ru = None
-
-    def _translate(self, text: str, translator) -> Optional[str]:
-        if not text or translator is None:
+    def __init__(self, cache: Optional[TranslationCache] = None,
+                 executor: Optional[TranslationExecutor] = None,
+                 backend: Optional[TranslationBackend] = None) -> None:
+        # Таймаут, повторы и circuit breaker для сетевого движка перевода
+        self.upstream = Upstream('translate', **UPSTREAM_SETTINGS['translate'])
+        self.cache = cache if cache is not None else TranslationCache()
+        self.executor = executor if executor is not None else TranslationExecutor()
+        self.backend = backend if backend is not None else create_backend()
+        self._stats_lock = threading.Lock()
+        self.saved_calls = {'no_letters': 0, 'target_script': 0}
+
+    def _call_backend(self, text: str, source: str, target: str) -> str:
+        if self.backend.remote:
+            return self.upstream.call_sync(lambda: self.backend.translate(text, source, target))
+        return self.backend.translate(text, source, target)
+
+    def _remember(self, source: str, target: str, text: str, translated: str) -> None:
+        if self.backend.cacheable:
+            self.cache.set(source, target, text, translated)
+
+    def _skip(self, text: str, source: str) -> bool:
+        """Fast path: True if text needs no translation; the saved call is counted"""
+        reason = skip_reason(text, source)
+        if reason is None:
+            return False
+        with self._stats_lock:
+            self.saved_calls[reason] += 1
+        return True
+
+    def _translate(self, text: str, source: str, target: str) -> Optional[str]:
+        if not text or self._skip(text, source):
+            return text
+        cached = self.cache.get(source, target, text)
+        if cached is not None:
+            return cached
+
+        if not self.backend.supports(source, target):
             return text
         try:
-            return translator.translate(text)
+            translated = self._call_backend(text, source, target)
         except Exception:
             return None
+        if translated:
+            self._remember(source, target, text, translated)
+        return translated
 
     def russian_to_english(self, text: str) -> str:
-        translated = self._translate(text, self._translator_en)
+        if text and len(text) > TRANSLATION_CHUNK_CHARS:
+            return self.translate_batch([text], 'ru', 'en')[0]
+        translated = self._translate(text, 'ru', 'en')
         return translated if translated is not None else text
 
     def english_to_russian(self, text: str) -> str:
-        translated = self._translate(text, self._translator_ru)
+        if text and len(text) > TRANSLATION_CHUNK_CHARS:
+            return self.english_to_russian_batch([text])[0]
+        translated = self._translate(text, 'en', 'ru')
         return translated if translated is not None else text
 
+    def translate_batch(self, texts: List[str], source: str = 'en', target: str = 'ru') -> List[str]:
+        """Translate many strings with as few engine requests as possible.
+
+        Long texts are split into parts (split_text) that are translated as
+        separate items and joined back in order. Cached and repeated strings
+        are translated once; the rest are packed into requests of up to
+        TRANSLATION_BATCH_MAX_CHARS characters. Items whose marker did not
+        survive the round trip fall back to one-by-one translation; an item
+        that still fails is returned untranslated.
+        """
+        parts_of = {
+            text: split_text(text, TRANSLATION_CHUNK_CHARS)
+            for text in dict.fromkeys(texts) if text and len(text) > TRANSLATION_CHUNK_CHARS
+        }
+        units = []
+        for text in dict.fromkeys(texts):
+            if text in parts_of:
+                units.extend(part for part, _ in parts_of[text])
+            else:
+                units.append(text)
+
+        translations = self._translate_units(units, source, target)
+        for text, parts in parts_of.items():
+            translations[text] = ''.join(translations[part] + separator for part, separator in parts)
+        return [translations[text] for text in texts]
+
+    def _translate_units(self, units: List[str], source: str, target: str) -> Dict[str, str]:
+        translations = {}  # {text: translated}
+        missing = []
+        for text in dict.fromkeys(units):
+            if not text or self._skip(text, source):
+                translations[text] = text
+                continue
+            cached = self.cache.get(source, target, text)
+            if cached is not None:
+                translations[text] = cached
+            else:
+                missing.append(text)
+
+        if self.backend.supports(source, target):
+            # Запросы делаем не крупнее нужного, чтобы большой объем разошелся по всем потокам;
+            # одиночные элементы переводятся обычным путем ниже
+            total = sum(len(text) for text in missing)
+            max_chars = min(TRANSLATION_BATCH_MAX_CHARS,
+                            max(TRANSLATION_CHUNK_CHARS, math.ceil(total / self.executor.max_workers)))
+            chunks = [chunk for chunk in self._batch_chunks(missing, max_chars) if len(chunk) > 1]
+            packed_results = self.executor.map(
+                lambda chunk: self._call_backend(pack_batch(chunk), source, target),
+                chunks
+            )
+            for chunk, packed in zip(chunks, packed_results):
+                for index, translated in unpack_batch(packed or '', len(chunk)).items():
+                    translations[chunk[index]] = translated
+                    self._remember(source, target, chunk[index], translated)
+
+        # Не уцелевшие в пакете элементы — поштучно, тоже параллельно
+        leftovers = [text for text in missing if text not in translations]
+        for text, translated in zip(leftovers, self.executor.map(
+                lambda text: self._translate(text, source, target), leftovers)):
+            translations[text] = translated if translated is not None else text
+        return translations
+
+    def english_to_russian_batch(self, texts: List[str]) -> List[str]:
+        return self.translate_batch(texts, 'en', 'ru')
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            saved = dict(self.saved_calls)
+        return {
+            'backend': self.backend.name,
+            'saved_calls': sum(saved.values()),
+            **{f'saved_{reason}': count for reason, count in saved.items()},
+        }
 
+    @staticmethod
+    def _batch_chunks(texts: List[str], max_chars: int = TRANSLATION_BATCH_MAX_CHARS) -> List[List[str]]:
+        """Split texts into request-sized groups, keeping the original order"""
+        chunks, chunk, size = [], [], 0
+        for text in texts:
+            cost = len(text) + len(_BATCH_MARKER.format(len(chunk))) + 2
+            if chunk and size + cost > max_chars:
+                chunks.append(chunk)
+                chunk, size = [], 0
+                cost = len(text) + len(_BATCH_MARKER.format(0)) + 2
+            chunk.append(text)
+            size += cost
+        if chunk:
+            chunks.append(chunk)
+        return chunks